@@ -0,0 +1 @@
+# Utilidades compartidas por los receptores (part1/part2) y el simulador.
@@ -0,0 +1,190 @@
+# ===== ARQ de repetición selectiva =====
+# Una sesión es un flujo de tramas con 'sid' (id elegido por el emisor) y
+# 'seq' consecutivos desde 0. La sesión no depende de la conexión: a través
+# del proxy las tramas de un emisor pueden llegar por cualquier conexión del
+# pool, y en cualquier orden.
+#
+# Receptor: por sesión, 'cum' = primer seq que falta (todo lo anterior llegó
+# bien) y los seq ya recibidos por encima de cum. Cada ack de una trama con
+# sid agrega:
+#   cum   ack acumulativo
+#   sack  seq recibidos bien por encima de cum (hasta MAX_SACK)
+#   nak   el seq de esta trama si llegó con errores (pedir reenvío ya)
+#   dup   true si el seq ya se había recibido (no se entrega otra vez)
+#
+# Emisor: ventana de 'window' tramas desde la más vieja sin confirmar; cada
+# trama tiene su temporizador (RTO de Jacobson/Karels, con backoff al vencer)
+# y se reenvía al vencer o al recibir su nak. Las cabeceras (sid, seq) no
+# pasan por el canal con ruido: el proxy solo toca frame_bits.
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+MAX_SACK = 64
+MAX_SESSIONS = 4096
+
+class ArqSession:
+    __slots__ = ("cum", "received")
+
+    def __init__(self):
+        self.cum = 0
+        self.received: Set[int] = set()  # seq > cum ya recibidos bien
+
+class ArqSessions:
+    """Estado del receptor para todas las sesiones (las más viejas se olvidan)."""
+
+    def __init__(self, window: int = 1024, max_sessions: int = MAX_SESSIONS):
+        self.window = window
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, ArqSession]" = OrderedDict()
+
+    def session(self, sid: str) -> ArqSession:
+        s = self.sessions.get(sid)
+        if s is None:
+            s = self.sessions[sid] = ArqSession()
+            if len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        else:
+            self.sessions.move_to_end(sid)
+        return s
+
+    def frame(self, sid: str, seq: int, ok: bool) -> dict:
+        """Registra la trama y devuelve los campos ARQ del ack ('status': new/dup/nak/window)."""
+        s = self.session(sid)
+        if seq < s.cum or seq in s.received:
+            status = "dup"
+        elif not ok:
+            status = "nak"
+        elif seq >= s.cum + self.window:
+            status = "window"  # fuera de la ventana de recepción: se ignora
+        else:
+            status = "new"
+            s.received.add(seq)
+            while s.cum in s.received:
+                s.received.discard(s.cum)
+                s.cum += 1
+        out = {"sid": sid, "cum": s.cum, "status": status}
+        if s.received:
+            out["sack"] = sorted(s.received)[:MAX_SACK]
+        if status == "nak":
+            out["nak"] = seq
+        elif status == "dup":
+            out["dup"] = True
+        return out
+
+# ===== Emisor =====
+class RttEstimator:
+    """RTO de Jacobson/Karels: srtt + 4 * rttvar, acotado a [min_rto, max_rto]."""
+
+    def __init__(self, initial: float = 0.5, min_rto: float = 0.02, max_rto: float = 10.0):
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+        self.rto = initial
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+
+    def sample(self, rtt: float) -> None:
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.rto = min(self.max_rto, max(self.min_rto, self.srtt + 4 * self.rttvar))
+
+class _Pending:
+    __slots__ = ("sent", "deadline", "tries", "backoff")
+
+    def __init__(self):
+        self.sent = 0.0
+        self.deadline = 0.0
+        self.tries = 0
+        self.backoff = 1
+
+class SelectiveRepeatSender:
+    """Estado del emisor (sin E/S): qué enviar, cuándo reenviar y qué quedó confirmado.
+
+    El que lo usa llama sent(seq) al escribir una trama, ack(msg) por cada ack
+    recibido y expired() periódicamente; los seq que devuelven hay que reenviarlos."""
+
+    def __init__(self, total: int, window: int = 32, max_tries: int = 0, rtt: Optional[RttEstimator] = None):
+        self.total = total
+        self.window = window
+        self.max_tries = max_tries  # 0 = sin tope
+        self.rtt = rtt or RttEstimator()
+        self.base = 0               # seq más viejo sin resolver
+        self.next_seq = 0
+        self.pending: Dict[int, _Pending] = {}
+        self.acked: Set[int] = set()
+        self.lost: Set[int] = set()
+        self.transmissions = 0
+        self.retransmissions = {"timeout": 0, "nak": 0}
+
+    @property
+    def done(self) -> bool:
+        return self.base >= self.total
+
+    def can_send(self) -> bool:
+        return self.next_seq < self.total and self.next_seq < self.base + self.window
+
+    def take(self) -> int:
+        """Próximo seq nuevo a enviar (llamar solo si can_send())."""
+        seq = self.next_seq
+        self.next_seq += 1
+        self.pending[seq] = _Pending()
+        return seq
+
+    def sent(self, seq: int, now: float) -> None:
+        p = self.pending[seq]
+        p.tries += 1
+        p.sent = now
+        p.deadline = now + self.rtt.rto * p.backoff
+        self.transmissions += 1
+
+    def _resolve(self, seq: int, now: Optional[float]) -> None:
+        p = self.pending.pop(seq, None)
+        if p is None:
+            return
+        if now is not None:
+            self.acked.add(seq)
+            if p.tries == 1:
+                self.rtt.sample(now - p.sent)  # Karn: solo tramas sin reenvío
+        else:
+            self.lost.add(seq)
+        while self.base < self.next_seq and self.base not in self.pending:
+            self.base += 1
+
+    def ack(self, msg: dict, now: float) -> List[int]:
+        """Procesa un ack (campos cum/sack/nak/seq); devuelve los seq a reenviar ya."""
+        cum = msg.get("cum")
+        if isinstance(cum, int):
+            for seq in [s for s in self.pending if s < cum]:
+                self._resolve(seq, now)
+        for seq in msg.get("sack") or ():
+            if seq in self.pending:
+                self._resolve(seq, now)
+        seq = msg.get("seq")
+        if msg.get("verdict") == "ok" and seq in self.pending:
+            self._resolve(seq, now)
+        nak = msg.get("nak")
+        if nak in self.pending and self._retry(nak, "nak"):
+            return [nak]
+        return []
+
+    def _retry(self, seq: int, why: str) -> bool:
+        p = self.pending[seq]
+        if self.max_tries and p.tries >= self.max_tries:
+            self._resolve(seq, None)
+            return False
+        self.retransmissions[why] += 1
+        return True
+
+    def expired(self, now: float) -> List[int]:
+        out = []
+        for seq, p in list(self.pending.items()):
+            if p.tries and p.deadline <= now:
+                p.backoff = min(p.backoff * 2, 64)
+                if self._retry(seq, "timeout"):
+                    out.append(seq)
+        return out
+
+    def next_deadline(self) -> Optional[float]:
+        return min((p.deadline for p in self.pending.values() if p.tries), default=None)
@@ -0,0 +1,156 @@
+# ===== Vector de bits empaquetado =====
+# Bits guardados MSB primero en un bytearray con longitud explicita. Los bits
+# sobrantes del ultimo byte se mantienen en 0 para que to_bytes/popcount/==
+# no dependan de basura. La forma historica '0'/'1' queda solo para el JSON
+# del socket y para imprimir.
+from typing import Iterable, Iterator, Optional, Union
+
+from common.crc32 import pack_bits
+
+class BitVec:
+    __slots__ = ("_buf", "_n")
+
+    def __init__(self, data: bytes = b"", nbits: Optional[int] = None):
+        if nbits is None:
+            nbits = len(data) * 8
+        nbytes = (nbits + 7) // 8
+        if nbits < 0 or nbytes > len(data):
+            raise ValueError("nbits fuera de rango")
+        self._buf = bytearray(data[:nbytes])
+        self._n = nbits
+        self._clear_tail()
+
+    # ----- construccion / conversion -----
+    @classmethod
+    def from_str(cls, bits: str) -> "BitVec":
+        return cls(pack_bits(bits), len(bits))
+
+    @classmethod
+    def from_int(cls, value: int, nbits: int) -> "BitVec":
+        nbytes = (nbits + 7) // 8
+        value &= (1 << nbits) - 1
+        return cls((value << (nbytes * 8 - nbits)).to_bytes(nbytes, "big"), nbits)
+
+    @classmethod
+    def zeros(cls, nbits: int) -> "BitVec":
+        return cls(bytes((nbits + 7) // 8), nbits)
+
+    @classmethod
+    def concat(cls, parts: Iterable["BitVec"]) -> "BitVec":
+        # acumulador de pocos bits que se vuelca por bytes completos: lineal
+        out = bytearray()
+        acc = 0; nacc = 0; total = 0
+        for p in parts:
+            acc = (acc << p._n) | p.to_int()
+            nacc += p._n; total += p._n
+            if nacc >= 64:
+                keep = nacc % 8
+                out += (acc >> keep).to_bytes((nacc - keep) // 8, "big")
+                acc &= (1 << keep) - 1
+                nacc = keep
+        if nacc:
+            nbytes = (nacc + 7) // 8
+            out += (acc << (nbytes * 8 - nacc)).to_bytes(nbytes, "big")
+        return cls(out, total)
+
+    def to_bytes(self) -> bytes:
+        return bytes(self._buf)
+
+    def to_int(self) -> int:
+        return int.from_bytes(self._buf, "big") >> (len(self._buf) * 8 - self._n)
+
+    def to_numpy(self):
+        """Arreglo uint8 de 0/1 (un elemento por bit)."""
+        import numpy as np
+        return np.unpackbits(np.frombuffer(bytes(self._buf), dtype=np.uint8), count=self._n)
+
+    @classmethod
+    def from_numpy(cls, bits) -> "BitVec":
+        import numpy as np
+        bits = np.asarray(bits, dtype=np.uint8).ravel()
+        return cls(np.packbits(bits).tobytes(), int(bits.size))
+
+    def to_str(self) -> str:
+        return format(self.to_int(), f"0{self._n}b") if self._n else ""
+
+    def __str__(self) -> str:
+        return self.to_str()
+
+    def __repr__(self) -> str:
+        s = self.to_str()
+        return f"BitVec('{s if len(s) <= 64 else s[:64] + '...'}', n={self._n})"
+
+    # ----- acceso -----
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, idx: Union[int, slice]):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(self._n)
+            if step != 1:
+                return BitVec.from_str(self.to_str()[idx])
+            if stop <= start:
+                return BitVec()
+            b0, b1 = start // 8, (stop + 7) // 8
+            v = int.from_bytes(self._buf[b0:b1], "big") >> (b1 * 8 - stop)
+            return BitVec.from_int(v, stop - start)
+        if idx < 0:
+            idx += self._n
+        if not 0 <= idx < self._n:
+            raise IndexError("indice de bit fuera de rango")
+        return (self._buf[idx >> 3] >> (7 - (idx & 7))) & 1
+
+    def __iter__(self) -> Iterator[int]:
+        for i in range(self._n):
+            yield (self._buf[i >> 3] >> (7 - (i & 7))) & 1
+
+    def ones(self) -> Iterator[int]:
+        """Indices (0 = primer bit) de los bits en 1, en orden creciente."""
+        v = self.to_int()
+        while v:
+            top = v.bit_length() - 1
+            yield self._n - 1 - top
+            v ^= 1 << top
+
+    # ----- operaciones -----
+    def flip(self, idx: int) -> None:
+        if idx < 0:
+            idx += self._n
+        if not 0 <= idx < self._n:
+            raise IndexError("indice de bit fuera de rango")
+        self._buf[idx >> 3] ^= 0x80 >> (idx & 7)
+
+    def flipped(self, positions: Iterable[int]) -> "BitVec":
+        out = self.copy()
+        for i in positions:
+            out.flip(i)
+        return out
+
+    def copy(self) -> "BitVec":
+        return BitVec(self._buf, self._n)
+
+    def popcount(self) -> int:
+        return int.from_bytes(self._buf, "big").bit_count()
+
+    def __xor__(self, other: "BitVec") -> "BitVec":
+        if self._n != other._n:
+            raise ValueError("XOR entre vectores de distinta longitud")
+        v = int.from_bytes(self._buf, "big") ^ int.from_bytes(other._buf, "big")
+        return BitVec(v.to_bytes(len(self._buf), "big"), self._n)
+
+    def __add__(self, other: "BitVec") -> "BitVec":
+        if self._n % 8 == 0:
+            return BitVec(self._buf + other._buf, self._n + other._n)
+        return BitVec.concat((self, other))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, BitVec):
+            return NotImplemented
+        return self._n == other._n and self._buf == other._buf
+
+    __hash__ = None
+
+    def _clear_tail(self) -> None:
+        extra = len(self._buf) * 8 - self._n
+        if extra:
+            self._buf[-1] &= (0xFF << extra) & 0xFF
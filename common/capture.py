@@ -0,0 +1,156 @@
+# ===== Captura de tramas =====
+# Archivo binario de solo-agregar con cada trama que vio el proxy o el
+# receptor, para repetir la misma carga después (part2/tools/replay.py):
+#
+#   cabecera   "FCAP", versión u8, origen u8 (0 receptor, 1 proxy), 2 bytes libres, creado u64 (ns)
+#   registro   size u32   bytes de la trama
+#              ts   u64   llegada (time.time_ns())
+#              conn u64   conexión: pid << 32 | contador (únicos entre procesos)
+#              nflips u32 posiciones invertidas por el proxy (0 en el receptor)
+#              flags u8   FLAG_BIN, FLAG_DROPPED, FLAG_STREAMED
+#              3 bytes libres
+#              trama      tal como llegó (JSON sin el '\n' final, o binaria completa)
+#              flips      nflips x u32 (índices en frame_bits)
+#
+# Todo little-endian. Cada registro se escribe con un solo write() sobre un
+# archivo abierto con O_APPEND, así que varios procesos (--workers) pueden
+# agregar al mismo archivo sin mezclar registros. Un registro cortado al
+# final (proceso que murió a mitad) se ignora al leer.
+import json
+import mmap
+import os
+import struct
+import time
+from typing import Iterator, NamedTuple, Sequence
+
+import numpy as np
+
+from common.bitvec import BitVec
+from common import wire
+
+MAGIC = b"FCAP"
+VERSION = 1
+HEADER = struct.Struct("<4sBB2xQ")
+RECORD = struct.Struct("<IQQIB3x")
+SOURCES = ("receiver", "proxy")
+FLAG_BIN = 1       # trama binaria (common.wire); si no, línea JSON
+FLAG_DROPPED = 2   # el proxy la descartó (--drop): el receptor nunca la vio
+FLAG_STREAMED = 4  # el receptor la procesó en flujo y no guardó los bytes (trama vacía)
+_O_BINARY = getattr(os, "O_BINARY", 0)  # Windows: sin traducción de '\n'
+
+def create(path: str, source: str) -> None:
+    """Crea el archivo con su cabecera si no existe o está vacío; si ya tiene una, la valida."""
+    with open(path, "a+b") as f:
+        if f.tell() == 0:
+            f.write(HEADER.pack(MAGIC, VERSION, SOURCES.index(source), time.time_ns()))
+        else:
+            f.seek(0)
+            _check_header(f.read(HEADER.size), path)
+
+def _check_header(head: bytes, path: str) -> tuple:
+    if len(head) < HEADER.size:
+        raise ValueError(f"{path}: captura sin cabecera")
+    magic, ver, source, created = HEADER.unpack_from(head)
+    if magic != MAGIC or ver != VERSION or source >= len(SOURCES):
+        raise ValueError(f"{path}: no es una captura válida (versión {ver})")
+    return SOURCES[source], created
+
+class CaptureWriter:
+    """Agrega registros a una captura ya creada (create()); uno por proceso."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | _O_BINARY)
+        self._conns = 0
+        self.frames = 0
+        self.bytes = 0
+
+    def connection(self) -> int:
+        self._conns += 1
+        return (os.getpid() << 32) | self._conns
+
+    def frame(self, conn: int, data: bytes, binary: bool, flips: Sequence[int] = (), flags: int = 0) -> None:
+        if not binary:
+            data = bytes(data).rstrip(b"\r\n")
+        flips = np.asarray(flips, dtype="<u4")
+        flags |= FLAG_BIN if binary else 0
+        rec = RECORD.pack(len(data), time.time_ns(), conn, len(flips), flags) + bytes(data) + flips.tobytes()
+        os.write(self.fd, rec)
+        self.frames += 1
+        self.bytes += len(rec)
+
+    def close(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+class Record(NamedTuple):
+    ts: int           # ns
+    conn: int
+    flags: int
+    data: memoryview  # vista sobre el mmap (sin copiar)
+    flips: np.ndarray
+
+    @property
+    def binary(self) -> bool:
+        return bool(self.flags & FLAG_BIN)
+
+class CaptureReader:
+    """Lee una captura con mmap: los registros son vistas sobre el archivo, sin copiar."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.source, self.created = _check_header(f.read(HEADER.size), path)
+            size = os.fstat(f.fileno()).st_size
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size > HEADER.size else None
+        self.size = size
+
+    def records(self) -> Iterator[Record]:
+        if self.mm is None:
+            return
+        view = memoryview(self.mm)
+        off = HEADER.size
+        end = len(self.mm)
+        while off + RECORD.size <= end:
+            size, ts, conn, nflips, flags = RECORD.unpack_from(self.mm, off)
+            start = off + RECORD.size
+            stop = start + size + 4 * nflips
+            if stop > end:
+                break  # registro cortado
+            flips = np.frombuffer(self.mm, dtype="<u4", count=nflips, offset=start + size)
+            yield Record(ts, conn, flags, view[start:start + size], flips)
+            off = stop
+
+    def close(self) -> None:
+        if self.mm is not None:
+            try:
+                self.mm.close()
+            except BufferError:
+                pass  # todavía hay vistas de registros vivas; se libera con ellas
+            self.mm = None
+
+def apply_flips(rec: Record) -> bytes:
+    """La trama como la reenvió el proxy (con sus flips aplicados)."""
+    if not len(rec.flips):
+        return bytes(rec.data)
+    if rec.binary:
+        buf = bytearray(rec.data)
+        wire.flip_in_place(buf, rec.flips.tolist())
+        return bytes(buf)
+    pkt = json.loads(bytes(rec.data))
+    pkt["frame_bits"] = BitVec.from_str(pkt["frame_bits"]).flipped(rec.flips.tolist()).to_str()
+    return json.dumps(pkt).encode("utf-8")
+
+def summary(reader: CaptureReader) -> dict:
+    frames = 0; nbytes = 0; flips = 0; first = last = None
+    conns = set(); flags = {"bin": 0, "dropped": 0, "streamed": 0}
+    for rec in reader.records():
+        frames += 1; nbytes += len(rec.data); flips += len(rec.flips)
+        conns.add(rec.conn)
+        first = rec.ts if first is None else min(first, rec.ts)
+        last = rec.ts if last is None else max(last, rec.ts)
+        for name, bit in (("bin", FLAG_BIN), ("dropped", FLAG_DROPPED), ("streamed", FLAG_STREAMED)):
+            flags[name] += bool(rec.flags & bit)
+    return {"source": reader.source, "frames": frames, "connections": len(conns), "bytes": nbytes,
+            "flips": flips, "seconds": (last - first) / 1e9 if frames else 0.0, **flags}
@@ -0,0 +1,180 @@
+# ===== Modelos de canal =====
+# Todos se configuran con la BER promedio p (la que se barre en offline o se
+# pasa al proxy con --ber) más parámetros de forma, así que curvas con la
+# misma p comparan errores sueltos contra errores en ráfaga:
+#
+#   bsc                  flips i.i.d. Bernoulli(p) (el canal de siempre)
+#   ge:len=8,eb=0.5      Gilbert–Elliott: estados Bueno/Malo; en Malo cada bit
+#                        falla con prob. eb, en Bueno con eg (default 0). 'len'
+#                        es el largo medio de una racha Mala; la fracción de
+#                        tiempo en Malo sale de p = pi_malo * eb (+ pi_bueno * eg).
+#   burst:len=16         ráfagas de 'len' bits: primer y último bit invertidos,
+#                        los del medio con prob. 1/2 (la definición con la que
+#                        CRC32 detecta toda ráfaga de hasta 32 bits).
+#   erasure              borrados i.i.d.: el bit se pierde y llega como 0; con
+#                        datos equiprobables la BER es p (se borra con prob. 2p).
+#
+# El muestreo es por largo de racha, no por bit: saltos geométricos entre
+# errores (common.noise), largos de estadía geométricos en Gilbert–Elliott y
+# un sorteo por ráfaga. El costo crece con la cantidad de errores y rachas.
+# Una llamada trata 'total' bits como un flujo continuo: en offline las
+# tramas de un lote van seguidas por el canal (el estado de GE pasa de una a
+# la siguiente, empezando en el estado estacionario).
+from typing import Dict, Tuple
+
+import numpy as np
+
+from common.noise import bernoulli_positions
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+class Channel:
+    """Canal con BER promedio p; positions() sortea dónde hay errores."""
+
+    name = ""
+    erases = False  # True: en las posiciones el bit pasa a 0 (en vez de invertirse)
+
+    def __init__(self, p: float):
+        if not 0.0 <= p <= 1.0:
+            raise ValueError(f"BER fuera de [0,1]: {p}")
+        self.p = p
+
+    def positions(self, rng: np.random.Generator, total: int) -> np.ndarray:
+        """Posiciones crecientes (sin repetir) en [0, total)."""
+        raise NotImplementedError
+
+    def describe(self) -> str:
+        return self.name
+
+class BSC(Channel):
+    name = "bsc"
+
+    def positions(self, rng, total):
+        return bernoulli_positions(rng, total, self.p)
+
+class GilbertElliott(Channel):
+    name = "ge"
+
+    def __init__(self, p: float, len: float = 8.0, eb: float = 0.5, eg: float = 0.0):
+        super().__init__(p)
+        if len < 1 or not 0 < eb <= 1 or not 0 <= eg < eb:
+            raise ValueError("ge: se necesita len >= 1 y 0 <= eg < eb <= 1")
+        if p > 0 and not eg <= p <= eb:
+            raise ValueError(f"ge: la BER {p} debe estar entre eg={eg} y eb={eb}")
+        self.len = float(len); self.eb = eb; self.eg = eg
+        self.pi_bad = (p - eg) / (eb - eg) if p > 0 else 0.0
+        self.p_bg = 1.0 / self.len  # Malo -> Bueno
+        self.p_gb = self.pi_bad * self.p_bg / (1.0 - self.pi_bad) if self.pi_bad < 1 else 1.0
+
+    def describe(self):
+        return f"ge:len={self.len:g},eb={self.eb:g},eg={self.eg:g}"
+
+    def _sojourns(self, rng, total):
+        # rachas alternadas Bueno/Malo hasta cubrir 'total'; la primera en el estado estacionario
+        if self.pi_bad >= 1.0:
+            return np.zeros(1, dtype=np.int64), np.array([total], dtype=np.int64), np.ones(1, dtype=bool)
+        if self.pi_bad <= 0.0:
+            return np.zeros(1, dtype=np.int64), np.array([total], dtype=np.int64), np.zeros(1, dtype=bool)
+        bad_first = rng.random() < self.pi_bad
+        pairs = int(total * self.p_gb * (1 - self.pi_bad)) + 8
+        lengths = []
+        covered = 0
+        while covered < total:
+            g = rng.geometric(self.p_gb, size=pairs)
+            b = rng.geometric(self.p_bg, size=pairs)
+            both = np.empty(2 * pairs, dtype=np.int64)
+            both[0::2], both[1::2] = (b, g) if bad_first else (g, b)
+            lengths.append(both)
+            covered += int(both.sum())
+        lengths = np.concatenate(lengths)
+        ends = np.cumsum(lengths)
+        n = int(np.searchsorted(ends, total)) + 1
+        lengths = lengths[:n]; ends = ends[:n]
+        lengths[-1] -= ends[-1] - total
+        starts = ends - lengths
+        bad = np.zeros(n, dtype=bool)
+        bad[0 if bad_first else 1::2] = True
+        return starts, lengths, bad
+
+    def positions(self, rng, total):
+        if total <= 0 or self.p <= 0.0:
+            return _EMPTY
+        starts, lengths, bad = self._sojourns(rng, total)
+        parts = []
+        for sel, e in ((bad, self.eb), (~bad, self.eg)):
+            if e <= 0.0 or not sel.any():
+                continue
+            s, l = starts[sel], lengths[sel]
+            # los bits de todas las rachas de este estado como un solo flujo
+            cum = np.cumsum(l)
+            pos = bernoulli_positions(rng, int(cum[-1]), e)
+            seg = np.searchsorted(cum, pos, side="right")
+            parts.append(s[seg] + pos - (cum[seg] - l[seg]))
+        if not parts:
+            return _EMPTY
+        return np.sort(np.concatenate(parts))
+
+class Burst(Channel):
+    name = "burst"
+
+    def __init__(self, p: float, len: int = 16):
+        super().__init__(p)
+        if int(len) < 1:
+            raise ValueError("burst: len >= 1")
+        self.len = int(len)
+        per_burst = 1.0 if self.len == 1 else (self.len + 2) / 2.0  # flips esperados por ráfaga
+        self.rate = min(1.0, p / per_burst)
+
+    def describe(self):
+        return f"burst:len={self.len}"
+
+    def positions(self, rng, total):
+        starts = bernoulli_positions(rng, total, self.rate)
+        if len(starts) == 0:
+            return _EMPTY
+        L = self.len
+        parts = [starts]
+        if L > 1:
+            parts.append(starts + (L - 1))
+        if L > 2:
+            inner = rng.random((len(starts), L - 2)) < 0.5
+            rows, cols = np.nonzero(inner)
+            parts.append(starts[rows] + 1 + cols)
+        pos = np.concatenate(parts)
+        pos = pos[pos < total]
+        # ráfagas que se pisan: dos flips en el mismo bit se cancelan
+        uniq, counts = np.unique(pos, return_counts=True)
+        return uniq[counts % 2 == 1]
+
+class Erasure(Channel):
+    name = "erasure"
+    erases = True
+
+    def positions(self, rng, total):
+        return bernoulli_positions(rng, total, min(1.0, 2.0 * self.p))
+
+MODELS: Dict[str, type] = {c.name: c for c in (BSC, GilbertElliott, Burst, Erasure)}
+
+def parse_spec(spec: str) -> Tuple[str, Dict[str, float]]:
+    """'ge:len=8,eb=0.5' -> ("ge", {"len": 8.0, "eb": 0.5}); ValueError si no es válido."""
+    name, _, rest = (spec or "bsc").strip().partition(":")
+    name = name.lower()
+    if name not in MODELS:
+        raise ValueError(f"canal desconocido: {name!r} (opciones: {', '.join(MODELS)})")
+    params = {}
+    for item in filter(None, (x.strip() for x in rest.split(","))):
+        key, eq, val = item.partition("=")
+        if not eq:
+            raise ValueError(f"parámetro sin valor en {spec!r}: {item!r}")
+        params[key.strip()] = float(val)
+    return name, params
+
+def make_channel(spec: str, p: float) -> Channel:
+    name, params = parse_spec(spec)
+    try:
+        return MODELS[name](p, **params)
+    except TypeError as e:
+        raise ValueError(f"parámetros inválidos para {name}: {e}") from None
+
+def is_bsc(spec: str) -> bool:
+    return parse_spec(spec) == ("bsc", {})
@@ -0,0 +1,185 @@
+# ===== CRC-32 compartido =====
+# Parametrizacion: poly=0x04C11DB7, init=0xFFFFFFFF, xorout=0xFFFFFFFF,
+# MSB primero, no reflejado (CRC-32/BZIP2). Bit-exacto con el crc32_bits
+# original que recorria la trama bit por bit.
+#
+# Motor: zlib implementa el mismo polinomio en su variante reflejada con
+# tablas precalculadas en C. Invirtiendo los bits de cada byte de entrada
+# (tabla de 256 entradas) y el registro de 32 bits se obtiene la variante
+# no reflejada sin recorrer bits en Python.
+import zlib
+from typing import Optional
+
+POLY = 0x04C11DB7
+MASK32 = 0xFFFFFFFF
+INIT = 0xFFFFFFFF
+XOROUT = 0xFFFFFFFF
+
+# _REV8[b] = b con el orden de sus 8 bits invertido
+_REV8 = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+
+def _rev32(x: int) -> int:
+    return ((_REV8[x & 0xFF] << 24) | (_REV8[(x >> 8) & 0xFF] << 16)
+            | (_REV8[(x >> 16) & 0xFF] << 8) | _REV8[(x >> 24) & 0xFF])
+
+def _update_bits(crc: int, byte: int, nbits: int) -> int:
+    # procesa los nbits mas significativos de 'byte' (cola < 8 bits)
+    for i in range(7, 7 - nbits, -1):
+        fb = ((crc >> 31) & 1) ^ ((byte >> i) & 1)
+        crc = (crc << 1) & MASK32
+        if fb:
+            crc ^= POLY
+    return crc
+
+def crc32_update(crc: int, data: bytes, nbits: Optional[int] = None) -> int:
+    """Avanza el registro (sin xorout) con los primeros nbits de data, MSB primero."""
+    if nbits is None:
+        nbits = len(data) * 8
+    full, tail = divmod(nbits, 8)
+    if full:
+        chunk = data if full == len(data) else data[:full]
+        v = zlib.crc32(bytes(chunk).translate(_REV8), _rev32(crc ^ MASK32))
+        crc = _rev32(v) ^ MASK32
+    if tail:
+        crc = _update_bits(crc, data[full], tail)
+    return crc
+
+def crc32_bytes(data: bytes, nbits: Optional[int] = None) -> int:
+    """CRC32 de los primeros nbits (default: todos) de data empaquetada MSB primero."""
+    return crc32_update(INIT, data, nbits) ^ XOROUT
+
+def pack_bits(bits: str) -> bytes:
+    """'0'/'1' -> bytes MSB primero; el ultimo byte se completa con ceros."""
+    if bits.count("0") + bits.count("1") != len(bits):
+        raise ValueError("Bits inválidos")
+    if not bits:
+        return b""
+    nbytes = (len(bits) + 7) // 8
+    return (int(bits, 2) << (nbytes * 8 - len(bits))).to_bytes(nbytes, "big")
+
+def crc32_bits(bits: str) -> int:
+    """CRC32 de una cadena '0'/'1' (interfaz historica)."""
+    return crc32_bytes(pack_bits(bits), len(bits))
+
+# ===== CRC32 incremental =====
+class CRC32:
+    """CRC32 por trozos: update() con bytes (o sus primeros nbits) o bits '0'/'1',
+    digest() al final. Mismo resultado que crc32_bytes sobre la concatenación."""
+
+    __slots__ = ("_crc", "_acc", "_nacc", "nbits")
+
+    def __init__(self):
+        self._crc = INIT
+        self._acc = 0   # bits pendientes (< 8) que aún no completan un byte
+        self._nacc = 0
+        self.nbits = 0
+
+    def update(self, data: bytes, nbits: Optional[int] = None) -> "CRC32":
+        if nbits is None:
+            nbits = len(data) * 8
+        if nbits <= 0:
+            return self
+        self.nbits += nbits
+        if self._nacc == 0:
+            full, tail = divmod(nbits, 8)
+            self._crc = crc32_update(self._crc, data, full * 8)
+            if tail:
+                self._acc = data[full] >> (8 - tail)
+                self._nacc = tail
+            return self
+        # trozo desalineado: se antepone lo pendiente y se vuelca por bytes completos
+        nbytes = (nbits + 7) // 8
+        v = (self._acc << nbits) | (int.from_bytes(data[:nbytes], "big") >> (nbytes * 8 - nbits))
+        total = nbits + self._nacc
+        full, tail = divmod(total, 8)
+        self._crc = crc32_update(self._crc, (v >> tail).to_bytes(full, "big"))
+        self._acc = v & ((1 << tail) - 1)
+        self._nacc = tail
+        return self
+
+    def update_bits(self, bits: str) -> "CRC32":
+        return self.update(pack_bits(bits), len(bits))
+
+    def digest(self) -> int:
+        crc = self._crc
+        if self._nacc:
+            crc = _update_bits(crc, self._acc << (8 - self._nacc), self._nacc)
+        return crc ^ XOROUT
+
+    def copy(self) -> "CRC32":
+        out = CRC32()
+        out._crc, out._acc, out._nacc, out.nbits = self._crc, self._acc, self._nacc, self.nbits
+        return out
+
+class CRC32Check:
+    """Verifica en flujo una trama datos || CRC32 sin guardarla.
+
+    Con data_bits conocido (msg_ascii_len * 8) los primeros data_bits van al
+    CRC y los 32 siguientes son el CRC recibido; lo que sobre se ignora, como
+    en el receptor. Sin data_bits, los últimos 32 bits de la trama son el CRC:
+    se retienen en una ventana y solo lo anterior entra al CRC. En ambos casos
+    la memoria es constante (más 'keep' bits iniciales para mostrar)."""
+
+    def __init__(self, data_bits: Optional[int] = None, keep: int = 64):
+        self.data_bits = data_bits
+        self.keep = keep
+        self.crc = CRC32()
+        self.nbits = 0            # bits de trama vistos
+        self.head = 0             # primeros bits de datos (hasta 'keep')
+        self.head_bits = 0
+        self._win = 0             # CRC recibido (posicional) o ventana final
+        self._win_bits = 0
+
+    def _feed_data(self, v: int, n: int) -> None:
+        if self.head_bits < self.keep:
+            take = min(n, self.keep - self.head_bits)
+            self.head = (self.head << take) | (v >> (n - take))
+            self.head_bits += take
+        nbytes = (n + 7) // 8
+        self.crc.update((v << (nbytes * 8 - n)).to_bytes(nbytes, "big"), n)
+
+    def update(self, data: bytes, nbits: Optional[int] = None) -> "CRC32Check":
+        if nbits is None:
+            nbits = len(data) * 8
+        if nbits <= 0:
+            return self
+        nbytes = (nbits + 7) // 8
+        v = int.from_bytes(data[:nbytes], "big") >> (nbytes * 8 - nbits)
+        start = self.nbits
+        self.nbits += nbits
+        if self.data_bits is None:
+            # ventana: todo menos los últimos 32 bits vistos entra al CRC
+            v |= self._win << nbits
+            total = nbits + self._win_bits
+            if total > 32:
+                self._feed_data(v >> 32, total - 32)
+                v &= MASK32
+                total = 32
+            self._win, self._win_bits = v, total
+            return self
+        # posicional: [0, data_bits) datos, [data_bits, data_bits+32) CRC, resto se ignora
+        d = max(0, min(nbits, self.data_bits - start))
+        if d:
+            self._feed_data(v >> (nbits - d), d)
+        c = max(0, min(nbits - d, self.data_bits + 32 - start - d))
+        if c:
+            self._win = (self._win << c) | ((v >> (nbits - d - c)) & ((1 << c) - 1))
+            self._win_bits += c
+        return self
+
+    def update_bits(self, bits: str) -> "CRC32Check":
+        return self.update(pack_bits(bits), len(bits))
+
+    @property
+    def complete(self) -> bool:
+        """Se vio la trama entera (datos + 32 bits de CRC)."""
+        return self._win_bits == 32 and (self.data_bits is None or self.nbits >= self.data_bits + 32)
+
+    def received(self) -> Optional[int]:
+        return self._win if self.complete else None
+
+    def calculated(self) -> int:
+        return self.crc.digest()
+
+    def ok(self) -> bool:
+        return self.complete and self._win == self.crc.digest()
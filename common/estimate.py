@@ -0,0 +1,151 @@
+# ===== Estimadores para BER muy baja =====
+# Con p = 1e-6 o menos, Monte Carlo directo casi nunca ve una falla. Dos
+# alternativas, con las mismas columnas que las filas de run_offline:
+#
+# - analytic: Hamming SEC falla un bloque solo si trae 2+ errores, así que
+#   P(bloque ok) >= P(0 errores) + P(1 error) y ok_rate >= ese valor elevado a
+#   la cantidad de bloques (patrones de 2+ errores que por suerte quedan bien
+#   se cuentan como falla). CRC32: ok_rate ~= P(0 errores); se ignoran los
+#   errores no detectados (~2^-32 de las tramas con 4+ errores).
+# - is: muestreo por estratos. ok_rate = sum_w P(W = w) * P(ok | w), con W
+#   binomial(bits de la trama, p). P(ok | 0) = 1, P(ok | 1) se conoce (Hamming
+#   siempre corrige 1 error, CRC siempre lo detecta) y P(ok | w) se simula con
+#   tramas de exactamente w errores (montecarlo.simulate_weight). Como no
+#   depende de p, se simula una vez por (algo, m, k) y sirve para todos los p.
+#   La cola P(W > w_max) que no se simula cuenta como falla en ok_rate y como
+#   ok en la cota superior.
+import math
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from common.hamming import codec_for
+from common.montecarlo import TASK_RUNS, frame_width, run_weight_task, wilson_interval
+
+METHODS = ("analytic", "is")
+MAX_STRATA = 64   # estratos (w = 1..MAX_STRATA) como máximo por punto
+TAIL_REL = 1e-3   # la cola sin simular debe ser < TAIL_REL * P(W >= primer w que puede fallar)
+# P(ok | w) exactas, sin simular
+KNOWN = {("CRC32", 1): 0.0, ("HAMMING", 1): 1.0}
+
+def binom_pmf(n: int, w: int, p: float) -> float:
+    if p <= 0.0:
+        return 1.0 if w == 0 else 0.0
+    if p >= 1.0:
+        return 1.0 if w == n else 0.0
+    if w < 0 or w > n:
+        return 0.0
+    return math.exp(math.lgamma(n + 1) - math.lgamma(w + 1) - math.lgamma(n - w + 1)
+                    + w * math.log(p) + (n - w) * math.log1p(-p))
+
+def binom_tail(n: int, p: float, w0: int) -> float:
+    """P(W >= w0) sumando términos (sin restar de 1: exacto aunque la cola sea ~1e-30)."""
+    if w0 <= 0:
+        return 1.0
+    total = 0.0
+    for w in range(w0, n + 1):
+        t = binom_pmf(n, w, p)
+        total += t
+        if w > n * p and t <= total * 1e-17:
+            break
+    return total
+
+# ===== Cerrado =====
+def analytic(algo: str, m: int, k: int, p: float) -> dict:
+    if algo == "CRC32":
+        n = m + 32
+        fail = -math.expm1(n * math.log1p(-p)) if p < 1 else 1.0
+        return {"ok_rate": 1.0 - fail, "fail_rate": fail, "corrected_avg": 0.0, "uncorrect_avg": 0.0}
+    codec = codec_for(k)
+    n = codec.n
+    blocks = frame_width(algo, m, k) // n
+    block_fail = binom_tail(n, p, 2)
+    fail = -math.expm1(blocks * math.log1p(-block_fail)) if block_fail < 1 else 1.0
+    # corrected_avg: bloques con exactamente 1 error; uncorrect_avg: bloques con 2+ (cota superior)
+    return {"ok_rate": 1.0 - fail, "fail_rate": fail,
+            "corrected_avg": blocks * binom_pmf(n, 1, p), "uncorrect_avg": blocks * block_fail}
+
+# ===== Por estratos =====
+def strata_needed(algo: str, width: int, p: float) -> int:
+    """w_max para que la cola sin simular sea despreciable frente a las fallas posibles."""
+    first = 1 if algo == "CRC32" else 2
+    if p <= 0.0:
+        return 0
+    ref = binom_tail(width, p, first)
+    w = first
+    while w < min(width, MAX_STRATA) and binom_tail(width, p, w + 1) > TAIL_REL * ref:
+        w += 1
+    return min(w, width)
+
+def combine(algo: str, width: int, p: float, strata: Dict[int, dict], runs_per: Dict[int, int], w_max: int,
+            z: float = 1.96) -> dict:
+    """Estimación de un punto a partir de los conteos por w (1..w_max)."""
+    fail = 0.0; fail_lo = 0.0; fail_hi = 0.0; corrected = 0.0; uncorrect = 0.0
+    for w in range(1, w_max + 1):
+        pw = binom_pmf(width, w, p)
+        if (algo, w) in KNOWN:
+            q = KNOWN[(algo, w)]
+            fail += pw * (1 - q); fail_lo += pw * (1 - q); fail_hi += pw * (1 - q)
+            if algo == "HAMMING":
+                corrected += pw  # el único error cae en un bloque y se corrige
+            continue
+        n = runs_per[w]; res = strata[w]
+        lo, hi = wilson_interval(res["ok"], n, z)
+        fail += pw * (1 - res["ok"] / n)
+        fail_lo += pw * (1 - hi)
+        fail_hi += pw * (1 - lo)
+        corrected += pw * res["corrected"] / n
+        uncorrect += pw * res["uncorrect"] / n
+    tail = binom_tail(width, p, w_max + 1)
+    return {"ok_rate": 1.0 - (fail + tail), "fail_rate": fail + tail,
+            "corrected_avg": corrected, "uncorrect_avg": uncorrect,
+            "ok_lo": max(0.0, 1.0 - (fail_hi + tail)), "ok_hi": min(1.0, 1.0 - fail_lo),
+            "strata": w_max, "tail": tail}
+
+def estimate_points(points: Sequence[tuple], method: str, runs: int, seed: Optional[int],
+                    workers: int = 1, z: float = 1.96) -> Iterator[Tuple[tuple, dict]]:
+    """Estimación de cada punto (algo, m, k, p), en el orden dado.
+
+    Con method="is", 'runs' es la cantidad de tramas simuladas por estrato."""
+    if method == "analytic":
+        for pt in points:
+            est = analytic(*pt)
+            est.update(ok_lo=est["ok_rate"], ok_hi=est["ok_rate"], runs=0)
+            yield pt, est
+        return
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    # estratos por (algo, m, k): hasta el mayor w_max que pida alguno de sus p
+    need: Dict[tuple, int] = {}
+    for algo, m, k, p in points:
+        g = (algo, m, k)
+        need[g] = max(need.get(g, 0), strata_needed(algo, frame_width(algo, m, k), p))
+    tasks: List[tuple] = []
+    for (algo, m, k), w_max in need.items():
+        for w in range(1, w_max + 1):
+            if (algo, w) in KNOWN:
+                continue
+            for chunk, start in enumerate(range(0, runs, TASK_RUNS)):
+                tasks.append((algo, m, k, w, min(TASK_RUNS, runs - start), seed, chunk))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results = list(ex.map(run_weight_task, tasks))
+    else:
+        results = [run_weight_task(t) for t in tasks]
+    strata: Dict[tuple, dict] = {}
+    runs_per: Dict[tuple, int] = {}
+    for t, res in zip(tasks, results):
+        key = t[:4]
+        acc = strata.setdefault(key, {"ok": 0, "corrected": 0, "uncorrect": 0})
+        for c in acc:
+            acc[c] += res[c]
+        runs_per[key] = runs_per.get(key, 0) + t[4]
+    for algo, m, k, p in points:
+        width = frame_width(algo, m, k)
+        w_max = strata_needed(algo, width, p)
+        sim = [w for w in range(1, w_max + 1) if (algo, w) not in KNOWN]
+        est = combine(algo, width, p, {w: strata[(algo, m, k, w)] for w in sim},
+                      {w: runs_per[(algo, m, k, w)] for w in sim}, w_max, z)
+        est["runs"] = runs * len(sim)
+        yield (algo, m, k, p), est
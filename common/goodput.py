@@ -0,0 +1,203 @@
+# ===== Goodput: bits útiles por bit transmitido =====
+# ok_rate solo dice qué fracción de tramas llega bien; no cuenta la paridad
+# que cada código agrega. Para una trama de m bits de datos:
+#
+#   tasa de código  R = m / bits en el canal   (m/(m+32) en CRC32, m/(bloques*n) en Hamming)
+#   goodput         G = m * s / (bits en el canal + overhead + espera)
+#
+# con s = P(trama ok). Con retransmisión hasta que llegue bien (o hasta
+# max_tries intentos) cada entrega cuesta en promedio 1/s intentos, y queda
+# la misma fórmula: los intentos extra ya están en s. El modelo de costo
+# decide qué más paga cada intento:
+#
+#   sr    repetición selectiva: solo la trama y 'overhead' bits (cabecera/ack)
+#   sw    stop-and-wait: además espera 'rtt_bits' (ida y vuelta, en bits de canal)
+#   none  sin retransmisión: una trama fallida se pierde (residual_loss = 1 - s)
+#
+# Se supone que la falla se detecta (veredicto en el ack). En Hamming es
+# optimista: un bloque con 2+ errores puede "corregirse" mal sin aviso.
+import json
+import math
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from common.estimate import analytic
+from common.montecarlo import frame_width
+
+ARQ_MODES = ("sr", "sw", "none")
+TABLE_VERSION = 1
+DEFAULT_KLIST = (4, 8, 11, 16, 26, 32, 57, 64)  # candidatos Hamming
+
+class CostModel(NamedTuple):
+    arq: str = "sr"
+    overhead: int = 0     # bits extra por intento (cabecera, ack)
+    rtt_bits: int = 0     # espera por intento en stop-and-wait
+    max_tries: int = 0    # 0 = sin tope (con 'none' siempre es 1)
+
+    def tries(self) -> int:
+        return 1 if self.arq == "none" else self.max_tries
+
+    def cost(self, width: int) -> int:
+        """Bits de canal que ocupa un intento."""
+        return width + self.overhead + (self.rtt_bits if self.arq == "sw" else 0)
+
+def evaluate(algo: str, m: int, k: int, ok_rate: float, model: CostModel = CostModel()) -> dict:
+    """Goodput, intentos esperados y pérdida residual de una configuración."""
+    width = frame_width(algo, m, k)
+    s = ok_rate
+    n = model.tries()
+    if s <= 0.0:
+        attempts = float(n) if n else float("inf")
+        residual = 1.0
+    elif n:
+        residual = (1.0 - s) ** n
+        attempts = (1.0 - residual) / s
+    else:
+        residual = 0.0
+        attempts = 1.0 / s
+    return {"rate": m / width if width else 0.0, "goodput": m * s / model.cost(width) if width else 0.0,
+            "attempts": attempts, "residual_loss": residual}
+
+def recommend(rows: Iterable[dict], max_loss: float = 1.0) -> List[dict]:
+    """Mejor configuración por (m, p) entre filas con goodput (ver simulator.py goodput).
+
+    Gana el mayor goodput entre las que cumplen residual_loss <= max_loss; si
+    ninguna cumple, la de menor pérdida ('meets_loss' = False)."""
+    groups: Dict[tuple, List[dict]] = {}
+    for r in rows:
+        groups.setdefault((int(r["m_bits"]), float(r["p_error"])), []).append(r)
+    table = []
+    for (m, p), cands in sorted(groups.items()):
+        ok = [r for r in cands if r["residual_loss"] <= max_loss]
+        best = max(ok, key=lambda r: r["goodput"]) if ok else min(cands, key=lambda r: r["residual_loss"])
+        table.append({"m": m, "p": p, "algo": best["algo"], "k": int(best["k"]),
+                      "goodput": best["goodput"], "rate": best["rate"], "ok_rate": best["ok_rate"],
+                      "residual_loss": best["residual_loss"], "meets_loss": bool(ok)})
+    return table
+
+# ===== Tabla de recomendaciones =====
+# JSON con el modelo de costo y una entrada por (m, p); el receptor y el
+# proxy la cargan para aconsejar al emisor (lookup()).
+def save_table(path: str, entries: List[dict], model: CostModel, channel: str = "bsc",
+               max_loss: float = 1.0) -> None:
+    doc = {"version": TABLE_VERSION, "channel": channel, "model": model._asdict(),
+           "max_loss": max_loss, "entries": entries}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=1)
+        f.write("\n")
+
+def load_table(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        doc = json.load(f)
+    if doc.get("version") != TABLE_VERSION or not doc.get("entries"):
+        raise ValueError(f"{path}: tabla de goodput inválida (versión {doc.get('version')!r})")
+    return doc
+
+def lookup(table: dict, m: int, ber: float) -> Optional[dict]:
+    """Entrada para el m más cercano (en escala log) y la menor p tabulada >= ber.
+
+    Sin ninguna p >= ber se usa la mayor: el canal es peor que todo lo tabulado."""
+    entries = table["entries"]
+    if not entries:
+        return None
+    sizes = sorted({e["m"] for e in entries})
+    near = min(sizes, key=lambda s: abs(math.log(max(1, s) / max(1, m))))
+    rows = sorted((e for e in entries if e["m"] == near), key=lambda e: e["p"])
+    for e in rows:
+        if e["p"] >= ber:
+            return e
+    return rows[-1]
+
+# ===== Consejo en vivo =====
+# El receptor estima la BER del canal con las últimas tramas de una conexión
+# y aconseja la configuración de mayor goodput para ese nivel de error:
+#   Hamming: cada bloque corregido trae 1 error y uno no corregible al menos
+#            2, sobre bloques * n bits (cota inferior si hay 3+ por bloque).
+#   CRC32:   solo se sabe si la trama llegó bien; con una fracción f de
+#            descartes en tramas de W bits, p = 1 - (1 - f)^(1/W). f se
+#            suaviza ((fallas + 1/2) / (tramas + 1)) para no dar 0 ni 1.
+# Ambas se combinan como errores esperados sobre bits observados. Sin tabla
+# de goodput se usa la fórmula cerrada (common.estimate.analytic) con la p
+# redondeada a una grilla logarítmica, así que el cálculo queda en caché.
+P_GRID = 8  # puntos por década
+
+def _grid(p: float) -> float:
+    return 0.0 if p <= 0.0 else min(0.5, 10 ** (round(math.log10(p) * P_GRID) / P_GRID))
+
+@lru_cache(maxsize=4096)
+def best_config(m: int, p: float, klist: Tuple[int, ...] = DEFAULT_KLIST,
+                model: CostModel = CostModel()) -> dict:
+    """Configuración de mayor goodput para m bits de datos con BER p (fórmula cerrada)."""
+    best = None
+    for algo, k in [("CRC32", 0)] + [("HAMMING", k) for k in klist]:
+        ok = analytic(algo, m, k, p)["ok_rate"] if p > 0 else 1.0
+        g = evaluate(algo, m, k, ok, model)["goodput"]
+        if best is None or g > best["goodput"]:
+            best = {"algo": algo, "k": k, "goodput": g}
+    return best
+
+class LiveAdvisor:
+    """Estimación de BER por ventana deslizante de tramas y consejo (algo, k)."""
+
+    def __init__(self, window: int = 64, every: Optional[int] = None, table: Optional[dict] = None,
+                 klist: Tuple[int, ...] = DEFAULT_KLIST, model: CostModel = CostModel()):
+        self.window = window
+        self.every = every or max(1, window // 4)
+        self.table = table
+        self.klist = tuple(klist)
+        self.model = model
+        self.frames: deque = deque()  # (algo, bits, errores o falla)
+        self.ham_bits = 0; self.ham_err = 0
+        self.crc_bits = 0; self.crc_fail = 0; self.crc_frames = 0
+        self.seen = 0
+        self.current: Optional[Tuple[str, int]] = None
+
+    def _push(self, item) -> None:
+        self.frames.append(item)
+        self._count(item, 1)
+        if len(self.frames) > self.window:
+            self._count(self.frames.popleft(), -1)
+        self.seen += 1
+
+    def _count(self, item, sign: int) -> None:
+        algo, bits, value = item
+        if algo == "HAMMING":
+            self.ham_bits += sign * bits; self.ham_err += sign * value
+        else:
+            self.crc_bits += sign * bits; self.crc_fail += sign * value; self.crc_frames += sign
+
+    def observe_hamming(self, bits: int, corrected: int, uncorrectable: int) -> None:
+        if bits > 0:
+            self._push(("HAMMING", bits, corrected + 2 * uncorrectable))
+
+    def observe_crc(self, bits: int, ok: bool) -> None:
+        if bits > 0:
+            self._push(("CRC32", bits, 0 if ok else 1))
+
+    def ber(self) -> float:
+        errors = float(self.ham_err)
+        bits = self.ham_bits + self.crc_bits
+        if self.crc_frames:
+            # W = largo medio; errores esperados = p * bits = -log(1 - f) * tramas
+            f = (self.crc_fail + 0.5) / (self.crc_frames + 1)
+            errors += -math.log1p(-f) * self.crc_frames
+        return errors / bits if bits else 0.0
+
+    def advice(self, m: int) -> Optional[dict]:
+        """Consejo nuevo para tramas de m bits de datos, o None si no cambió (o aún no toca)."""
+        if m <= 0 or self.seen < self.every or self.seen % self.every:
+            return None
+        p = self.ber()
+        if self.table is not None:
+            best = lookup(self.table, m, p)
+        else:
+            best = best_config(m, _grid(p), self.klist, self.model)
+        choice = (best["algo"], int(best["k"]))
+        if choice == self.current:
+            return None
+        self.current = choice
+        out = {"algo": best["algo"], "ber": float(f"{p:.3g}"), "goodput": round(best["goodput"], 4)}
+        if best["algo"] == "HAMMING":
+            out["k"] = int(best["k"])
+        return out
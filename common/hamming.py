@@ -0,0 +1,132 @@
+# ===== Hamming SEC por lotes (matrices generadora / de verificacion) =====
+# Una trama se ve como una matriz (bloques x n). Los síndromes de todos los
+# bloques salen de un solo producto matricial mod 2 y la corrección de 1 bit
+# es una búsqueda vectorizada síndrome -> columna. Paridad par, posiciones
+# 1-indexadas, paridades en potencias de 2 (igual que sender.cpp).
+from functools import lru_cache
+from typing import Iterable, Iterator, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+def r_for_k(k: int) -> int:
+    r = 0
+    while (k + r + 1) > (1 << r):
+        r += 1
+    return r
+
+def _mod2(x: np.ndarray) -> np.ndarray:
+    return (x.astype(np.int32) & 1).astype(np.uint8)
+
+class BlockDecode(NamedTuple):
+    data: np.ndarray           # (bloques x k) bits de datos tras corregir
+    syndromes: np.ndarray      # (bloques,) síndrome de cada bloque recibido
+    corrected: np.ndarray      # (bloques,) bool: se corrigió 1 bit
+    uncorrectable: np.ndarray  # (bloques,) bool: síndrome fuera de rango
+
+class HammingSEC:
+    def __init__(self, k: int):
+        if k < 1:
+            raise ValueError("k debe ser >= 1")
+        self.k = k
+        self.r = r_for_k(k)
+        self.n = k + self.r
+        pos = np.arange(1, self.n + 1)
+        # H[i, j] = bit i de la posición j+1
+        self.H = ((pos[None, :] >> np.arange(self.r)[:, None]) & 1).astype(np.uint8)
+        self.parity_cols = (1 << np.arange(self.r)) - 1
+        self.data_cols = np.flatnonzero(pos & (pos - 1))
+        # parte de H sobre las columnas de datos: paridades = datos @ P mod 2.
+        # Los productos van en float32 (BLAS): sumas enteras exactas hasta 2^24.
+        self.P = np.ascontiguousarray(self.H[:, self.data_cols].T, dtype=np.float32)
+        self.Ht = np.ascontiguousarray(self.H.T, dtype=np.float32)
+        self.weights = (1 << np.arange(self.r)).astype(np.int64)
+        # síndrome -> columna a invertir (-1: 0 o fuera de rango)
+        self.syn_to_col = np.full(1 << self.r, -1, dtype=np.int64)
+        self.syn_to_col[1:self.n + 1] = np.arange(self.n)
+
+    def encode(self, data: np.ndarray) -> np.ndarray:
+        """(bloques x k) -> (bloques x n)."""
+        data = np.asarray(data, dtype=np.uint8).reshape(-1, self.k)
+        code = np.zeros((data.shape[0], self.n), dtype=np.uint8)
+        code[:, self.data_cols] = data
+        code[:, self.parity_cols] = _mod2(data @ self.P)
+        return code
+
+    def syndromes(self, code: np.ndarray) -> np.ndarray:
+        return _mod2(code @ self.Ht).astype(np.int64) @ self.weights
+
+    def decode(self, code: np.ndarray) -> BlockDecode:
+        """(bloques x n) recibido -> datos corregidos y contadores por bloque."""
+        code = np.array(code, dtype=np.uint8).reshape(-1, self.n)
+        s = self.syndromes(code)
+        col = self.syn_to_col[s]
+        fix = col >= 0
+        rows = np.flatnonzero(fix)
+        code[rows, col[rows]] ^= 1
+        return BlockDecode(code[:, self.data_cols], s, fix, (s != 0) & ~fix)
+
+# ===== Registro de geometrías =====
+# Armar un HammingSEC cuesta más que decodificar una trama corta, y los
+# receptores/simuladores usan siempre unos pocos k: se comparten instancias.
+K_MIN, K_MAX = 3, 64  # rango de k que se intenta al inferir
+# k más grande que se acepta (el de un emisor no se usa sin acotar): las
+# matrices y la tabla de síndromes crecen con k y el caché guarda hasta 64
+K_LIMIT = 1024
+
+@lru_cache(maxsize=64)
+def codec_for(k: int) -> HammingSEC:
+    """HammingSEC(k) compartido (no modificar sus arreglos); k en [1, K_LIMIT]."""
+    if not 1 <= k <= K_LIMIT:
+        raise ValueError(f"k debe estar entre 1 y {K_LIMIT}")
+    return HammingSEC(k)
+
+@lru_cache(maxsize=1024)
+def layouts_for_len(frame_len: int) -> Tuple[Tuple[int, int, int, int], ...]:
+    """(k, r, n, bloques) para cada k en [K_MIN, K_MAX] con n que divide frame_len."""
+    out = []
+    for k in range(K_MIN, K_MAX + 1):
+        r = r_for_k(k)
+        n = k + r
+        if frame_len % n == 0:
+            out.append((k, r, n, frame_len // n))
+    return tuple(out)
+
+# ===== Decodificación en flujo =====
+class StreamDecoder:
+    """Decodifica los bloques de n bits a medida que llegan los bits. Entre
+    trozos solo guarda el resto (< n bits) y los contadores."""
+
+    def __init__(self, k: int):
+        self.codec = codec_for(k)
+        self._rest = np.zeros(0, dtype=np.uint8)
+        self.nbits = 0
+        self.blocks = 0
+        self.corrected = 0
+        self.uncorrectable = 0
+
+    def feed(self, data: bytes, nbits: Optional[int] = None) -> BlockDecode:
+        """Agrega los primeros nbits de data; devuelve los bloques que se completaron."""
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), count=nbits)
+        self.nbits += len(bits)
+        if len(self._rest):
+            bits = np.concatenate([self._rest, bits])
+        full = len(bits) - len(bits) % self.codec.n
+        self._rest = bits[full:].copy()
+        dec = self.codec.decode(bits[:full])
+        self.blocks += len(dec.data)
+        self.corrected += int(dec.corrected.sum())
+        self.uncorrectable += int(dec.uncorrectable.sum())
+        return dec
+
+    @property
+    def pending_bits(self) -> int:
+        """Bits recibidos que aún no completan un bloque (al final: bloque incompleto)."""
+        return len(self._rest)
+
+def decode_stream(chunks: Iterable[Tuple[bytes, Optional[int]]], k: int) -> Iterator[BlockDecode]:
+    """Etapa generadora: (bytes, nbits) por trozo -> bloques decodificados de cada trozo."""
+    dec = StreamDecoder(k)
+    for data, nbits in chunks:
+        out = dec.feed(data, nbits)
+        if len(out.data):
+            yield out
@@ -0,0 +1,294 @@
+# ===== Métricas en proceso (formato de texto de Prometheus) =====
+# Contadores, gauges e histogramas con buckets fijos, sin dependencias.
+# Registrar es barato: cada serie (métrica + valores de etiquetas) es un
+# objeto con sus números; inc()/observe() solo suman (y un bisect en los
+# histogramas), sin locks. Cada serie se actualiza desde un solo hilo; el
+# endpoint HTTP solo lee, así que a lo sumo ve una muestra un instante vieja.
+# Entre procesos: snapshot() copia los valores (se puede enviar por una cola)
+# y merge() deja en un registro con las mismas métricas la suma de varios.
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# segundos: de 10 us a 10 s
+LATENCY_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+def _escape(v) -> str:
+    """Valor de etiqueta según el formato de texto: \\, \" y \\n escapados."""
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class _CounterSeries:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n: float = 1) -> None:
+        self.value += n
+
+class _GaugeSeries(_CounterSeries):
+    __slots__ = ("fn",)
+
+    def __init__(self):
+        super().__init__()
+        self.fn = None
+
+    def set(self, v: float) -> None:
+        self.value = v
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        """El valor se lee al exportar (p.ej. largo de una cola)."""
+        self.fn = fn
+
+    def get(self) -> float:
+        return self.fn() if self.fn is not None else self.value
+
+class _HistogramSeries:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # el último es +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float) -> None:
+        self.counts[bisect_left(self.bounds, v)] += 1
+        self.sum += v
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Cota superior del bucket donde cae el cuantil q (aproximado)."""
+        if not self.count:
+            return 0.0
+        want = q * self.count
+        acc = 0
+        for bound, c in zip(self.bounds, self.counts):
+            acc += c
+            if acc >= want:
+                return bound
+        return float("inf")
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def _new(self):
+        raise NotImplementedError
+
+    def labels(self, *values) -> object:
+        key = tuple(str(v) for v in values)
+        s = self._series.get(key)
+        if s is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: se esperaban etiquetas {self.labelnames}")
+            s = self._series[key] = self._new()
+        return s
+
+    def series(self) -> List[Tuple[Tuple[str, ...], object]]:
+        return list(self._series.items())
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def _dump(self, s):
+        raise NotImplementedError
+
+    def _load(self, s, values: list) -> None:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new(self):
+        return _CounterSeries()
+
+    def inc(self, n: float = 1) -> None:
+        self.labels().inc(n)
+
+    def total(self) -> float:
+        return sum(s.value for _k, s in self.series())
+
+    def _dump(self, s):
+        return s.value
+
+    def _load(self, s, values):
+        s.value = sum(values)
+
+    def render(self) -> List[str]:
+        out = super().render()
+        for key, s in self.series():
+            out.append(f"{self.name}{_labels(self.labelnames, key)} {_fmt(s.value)}")
+        return out
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def _new(self):
+        return _GaugeSeries()
+
+    def set(self, v: float) -> None:
+        self.labels().set(v)
+
+    def set_function(self, fn: Callable[[], float]) -> None:
+        self.labels().set_function(fn)
+
+    def _dump(self, s):
+        return s.get()
+
+    def _load(self, s, values):
+        s.fn = None  # la suma reemplaza a la función local
+        s.value = sum(values)
+
+    def render(self) -> List[str]:
+        out = _Metric.render(self)
+        for key, s in self.series():
+            out.append(f"{self.name}{_labels(self.labelnames, key)} {_fmt(s.get())}")
+        return out
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def _new(self):
+        return _HistogramSeries(self.bounds)
+
+    def observe(self, v: float) -> None:
+        self.labels().observe(v)
+
+    def _dump(self, s):
+        return list(s.counts), s.sum, s.count
+
+    def _load(self, s, values):
+        s.counts = [sum(c) for c in zip(*(v[0] for v in values))]
+        s.sum = sum(v[1] for v in values)
+        s.count = sum(v[2] for v in values)
+
+    def render(self) -> List[str]:
+        out = super().render()
+        for key, s in self.series():
+            acc = 0
+            for bound, c in zip(self.bounds + (float("inf"),), s.counts):
+                acc += c
+                le = f'le="{_fmt(bound)}"'
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {acc}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(s.sum)}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, key)} {s.count}")
+        return out
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def _add(self, m):
+        self.metrics.append(m)
+        return m
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, dict]:
+        """{métrica: {etiquetas: valor}} con tipos simples (se puede enviar a otro proceso)."""
+        return {m.name: {key: m._dump(s) for key, s in m.series()} for m in list(self.metrics)}
+
+    def merge(self, snapshots: Iterable[Dict[str, dict]]) -> None:
+        """Reemplaza los valores por la suma de varios snapshot() (solo métricas ya registradas)."""
+        snapshots = list(snapshots)
+        for m in list(self.metrics):
+            values: Dict[Tuple[str, ...], list] = {}
+            for snap in snapshots:
+                for key, v in snap.get(m.name, {}).items():
+                    values.setdefault(key, []).append(v)
+            for key, vs in values.items():
+                m._load(m.labels(*key), vs)
+
+    def render(self) -> str:
+        lines = []
+        for m in list(self.metrics):
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+# ===== Exposición =====
+def serve_http(registry: Registry, host: str, port: int) -> ThreadingHTTPServer:
+    """GET /metrics en un hilo aparte; devuelve el servidor (shutdown() para cerrarlo)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # sin una línea por scrape en la consola
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+class Periodic(threading.Thread):
+    """Llama fn(segundos desde la llamada anterior) cada 'interval' segundos."""
+
+    def __init__(self, interval: float, fn: Callable[[float], None]):
+        super().__init__(name="metrics-periodic", daemon=True)
+        self.interval = interval
+        self.fn = fn
+        self._halt = threading.Event()
+        self.start()
+
+    def run(self) -> None:
+        last = time.monotonic()
+        while not self._halt.wait(self.interval):
+            now = time.monotonic()
+            self.fn(now - last)
+            last = now
+
+    def stop(self) -> None:
+        self._halt.set()
+
+class RateTracker:
+    """Diferencias de contadores entre dos llamadas (para los resúmenes periódicos)."""
+
+    def __init__(self):
+        self._last: Dict[str, float] = {}
+
+    def delta(self, key: str, value: float) -> float:
+        prev = self._last.get(key, 0)
+        self._last[key] = value
+        return value - prev
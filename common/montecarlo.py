@@ -0,0 +1,314 @@
+# ===== Motor Monte Carlo por lotes (simulaciones offline) =====
+# En vez de una corrida por iteracion, cada bloque de corridas es una matriz
+# (corridas x bits): payloads, errores, codificacion y verificacion se hacen
+# para todas las filas a la vez con numpy. Los errores se sortean por saltos
+# geometricos (common.noise), con costo proporcional a la cantidad de flips.
+#
+# Una fila sin errores siempre se recibe bien (CRC coincide, Hamming no toca
+# nada), asi que solo las filas con al menos un flip se codifican y verifican;
+# en Hamming, igual con los bloques. El resultado es el mismo que simular
+# todo; solo cambia el costo.
+#
+# El canal es un modelo de common.channels (bsc por defecto, o con rafagas);
+# cada lote se le pide como un flujo continuo de corridas x bits.
+import hashlib
+import math
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from common.channels import Channel, is_bsc, make_channel
+from common.crc32 import crc32_bytes
+from common.hamming import codec_for
+
+# celdas (corridas x bits) por lote; acota la memoria de cada paso
+CHUNK_CELLS = 1 << 22
+
+_CRC_SHIFTS = (31 - np.arange(32)).astype(np.uint32)
+
+_BYTE_BITS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).astype(np.uint32)
+
+@lru_cache(maxsize=64)
+def _crc_tables(m: int):
+    # CRC es afin: crc(d) = crc(0^m) ^ XOR de cols[i] para cada bit d_i = 1.
+    # Agrupando por byte: tabla de 256 entradas por posicion de byte.
+    nbytes = (m + 7) // 8
+    base = crc32_bytes(bytes(nbytes), m)
+    cols = np.zeros(nbytes * 8, dtype=np.uint32)
+    for i in range(m):
+        unit = bytearray(nbytes)
+        unit[i >> 3] = 0x80 >> (i & 7)
+        cols[i] = crc32_bytes(bytes(unit), m) ^ base
+    tables = np.bitwise_xor.reduce(_BYTE_BITS[None, :, :] * cols.reshape(nbytes, 1, 8), axis=2)
+    return np.uint32(base), tables
+
+def crc32_rows(data: np.ndarray) -> np.ndarray:
+    """CRC32 de cada fila de una matriz (filas x m) de bits 0/1."""
+    base, tables = _crc_tables(data.shape[1])
+    packed = np.packbits(data, axis=1)
+    crc = np.full(len(data), base, dtype=np.uint32)
+    for j in range(packed.shape[1]):
+        crc ^= tables[j, packed[:, j]]
+    return crc
+
+def _bits32(x: np.ndarray) -> np.ndarray:
+    return ((x[:, None] >> _CRC_SHIFTS) & 1).astype(np.uint8)
+
+def _from_bits32(b: np.ndarray) -> np.ndarray:
+    return np.bitwise_or.reduce(b.astype(np.uint32) << _CRC_SHIFTS, axis=1)
+
+def _chunks(runs: int, width: int):
+    per = max(1, CHUNK_CELLS // max(1, width))
+    done = 0
+    while done < runs:
+        take = min(per, runs - done)
+        yield take
+        done += take
+
+def _payloads(rng: np.random.Generator, rows: int, m: int) -> np.ndarray:
+    # bytes aleatorios desempaquetados: 8 bits por sorteo
+    raw = rng.integers(0, 256, size=(rows, (m + 7) // 8), dtype=np.uint8)
+    return np.unpackbits(raw, axis=1, count=m)
+
+def _error_rows(rng: np.random.Generator, rows: int, width: int, channel: Channel):
+    # el lote entero es un solo flujo de bits: el canal sortea las posiciones
+    # con error y solo se arma la mascara de las filas con alguno
+    pos = channel.positions(rng, rows * width)
+    hit_rows, inv = np.unique(pos // width, return_inverse=True)
+    err = np.zeros((len(hit_rows), width), dtype=np.uint8)
+    err[inv, pos % width] = 1
+    return err
+
+def _corrupt(sent: np.ndarray, err: np.ndarray, erase: bool) -> np.ndarray:
+    # borrado: el bit llega como 0, asi que solo cambian los 1
+    return sent ^ (err & sent) if erase else sent ^ err
+
+def _crc_ok(rng: np.random.Generator, err: np.ndarray, m: int, erase: bool = False) -> int:
+    # filas con errores: cuántas pasan igual la verificación (error no detectado)
+    data = _payloads(rng, len(err), m)
+    frame = np.concatenate([data, _bits32(crc32_rows(data))], axis=1)
+    noisy = _corrupt(frame, err, erase)
+    return int((crc32_rows(noisy[:, :m]) == _from_bits32(noisy[:, m:])).sum())
+
+def simulate_crc(m: int, p: float, runs: int, rng: np.random.Generator,
+                 channel: Optional[Channel] = None) -> dict:
+    channel = channel or make_channel("bsc", p)
+    ok = 0
+    for rows in _chunks(runs, m + 32):
+        err = _error_rows(rng, rows, m + 32, channel)
+        ok += rows - len(err)
+        if len(err) == 0:
+            continue
+        ok += _crc_ok(rng, err, m, channel.erases)
+    return {"ok": ok, "corrected": 0, "uncorrect": 0}
+
+@lru_cache(maxsize=256)
+def _ham_layout(m: int, k: int):
+    codec = codec_for(k)
+    pad = (k - m % k) % k
+    blocks = (m + pad) // k
+    # columnas de datos que cuentan en cada bloque (el padding del ultimo no)
+    valid = np.ones((blocks, k), dtype=bool)
+    if pad:
+        valid[-1, k - pad:] = False
+    return codec, pad, blocks, blocks * codec.n, valid
+
+def _hamming_ok(rng: np.random.Generator, err: np.ndarray, m: int, k: int,
+                erase: bool = False) -> Tuple[int, int, int]:
+    # filas con errores: (filas decodificadas bien, bloques corregidos, bloques no corregibles)
+    codec, pad, blocks, _width, valid = _ham_layout(m, k)
+    data = _payloads(rng, len(err), m)
+    padded = np.concatenate([data, np.zeros((len(err), pad), dtype=np.uint8)], axis=1)
+    data_blocks = padded.reshape(-1, k)
+    err_blocks = err.reshape(-1, codec.n)
+    hit = np.flatnonzero(err_blocks.any(axis=1))
+    dec = codec.decode(_corrupt(codec.encode(data_blocks[hit]), err_blocks[hit], erase))
+    wrong = ((dec.data != data_blocks[hit]) & valid[hit % blocks]).any(axis=1)
+    failed_rows = np.bincount(hit // blocks, weights=dec.uncorrectable | wrong, minlength=len(err))
+    return int((failed_rows == 0).sum()), int(dec.corrected.sum()), int(dec.uncorrectable.sum())
+
+def simulate_hamming(m: int, k: int, p: float, runs: int, rng: np.random.Generator,
+                     channel: Optional[Channel] = None) -> dict:
+    channel = channel or make_channel("bsc", p)
+    width = _ham_layout(m, k)[3]
+    ok = 0; corrected = 0; uncorrect = 0
+    for rows in _chunks(runs, width):
+        err = _error_rows(rng, rows, width, channel)
+        ok += rows - len(err)
+        if len(err) == 0:
+            continue
+        o, c, u = _hamming_ok(rng, err, m, k, channel.erases)
+        ok += o; corrected += c; uncorrect += u
+    return {"ok": ok, "corrected": corrected, "uncorrect": uncorrect}
+
+def frame_width(algo: str, m: int, k: int) -> int:
+    """Bits de la trama que ve el canal."""
+    return m + 32 if algo == "CRC32" else _ham_layout(m, k)[3]
+
+# ===== Corridas con una cantidad fija de errores =====
+# Dado que la trama tiene exactamente w errores, sus posiciones son uniformes
+# (canal BSC), y P(ok | w) no depende de p. common.estimate las combina con la
+# probabilidad binomial de cada w (muestreo por estratos).
+def _weight_rows(rng: np.random.Generator, rows: int, width: int, w: int) -> np.ndarray:
+    if w * 4 <= width:
+        pos = rng.integers(0, width, size=(rows, w))
+        while w > 1:
+            srt = np.sort(pos, axis=1)
+            dup = (srt[:, 1:] == srt[:, :-1]).any(axis=1)
+            if not dup.any():
+                break
+            pos[dup] = rng.integers(0, width, size=(int(dup.sum()), w))  # se vuelven a sortear
+    else:
+        pos = np.argsort(rng.random((rows, width)), axis=1)[:, :w]
+    err = np.zeros((rows, width), dtype=np.uint8)
+    np.put_along_axis(err, pos, 1, axis=1)
+    return err
+
+def simulate_weight(algo: str, m: int, k: int, w: int, runs: int, rng: np.random.Generator) -> dict:
+    width = frame_width(algo, m, k)
+    ok = 0; corrected = 0; uncorrect = 0
+    for rows in _chunks(runs, width):
+        err = _weight_rows(rng, rows, width, w)
+        if algo == "CRC32":
+            ok += _crc_ok(rng, err, m)
+        else:
+            o, c, u = _hamming_ok(rng, err, m, k)
+            ok += o; corrected += c; uncorrect += u
+    return {"ok": ok, "corrected": corrected, "uncorrect": uncorrect}
+
+def run_weight_task(task: tuple) -> dict:
+    algo, m, k, w, runs, seed, chunk = task
+    key = (2 if algo == "CRC32" else 3, m, k, w, chunk)
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=key))
+    return simulate_weight(algo, m, k, w, runs, rng)
+
+# ===== Barrido paralelo =====
+# Cada punto (algo, m, k, p) se parte en tareas de TASK_RUNS corridas. Cada
+# tarea tiene su propio flujo aleatorio derivado de (seed, punto, canal, n° de
+# tarea), independiente de quien la ejecute: con la misma semilla los conteos
+# son identicos para cualquier cantidad de workers.
+TASK_RUNS = 1 << 16
+
+def _p_key(p: float) -> int:
+    return int.from_bytes(struct.pack(">d", float(p)), "big")
+
+def _channel_key(channel: str) -> Tuple[int, ...]:
+    # bsc no agrega nada: mismos flujos (y conteos) que antes de los modelos de canal
+    if is_bsc(channel):
+        return ()
+    return (int.from_bytes(hashlib.sha256(channel.encode()).digest()[:8], "big"),)
+
+def task_rng(seed: int, algo: str, m: int, k: int, p: float, chunk: int,
+             channel: str = "bsc") -> np.random.Generator:
+    key = (0 if algo == "CRC32" else 1, m, k, _p_key(p), chunk) + _channel_key(channel)
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=key))
+
+def run_task(task: tuple) -> dict:
+    algo, m, k, p, runs, seed, chunk, channel = task
+    rng = task_rng(seed, algo, m, k, p, chunk, channel)
+    model = make_channel(channel, p)
+    if algo == "CRC32":
+        return simulate_crc(m, p, runs, rng, model)
+    return simulate_hamming(m, k, p, runs, rng, model)
+
+def _point_tasks(point: tuple, runs: int, seed: int, channel: str) -> List[tuple]:
+    algo, m, k, p = point
+    return [(algo, m, k, p, min(TASK_RUNS, runs - start), seed, chunk, channel)
+            for chunk, start in enumerate(range(0, runs, TASK_RUNS))]
+
+def run_points(points: Sequence[tuple], runs: int, seed: Optional[int], workers: int = 1,
+               channel: str = "bsc") -> Iterator[Tuple[tuple, dict]]:
+    """Simula cada punto (algo, m, k, p); entrega (punto, conteos) en el orden dado."""
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    for _algo, _m, _k, p in points:
+        make_channel(channel, p)  # parámetros inválidos: error antes de lanzar tareas
+    tasks = [_point_tasks(pt, runs, seed, channel) for pt in points]
+    flat = [t for ts in tasks for t in ts]
+    if workers <= 1:
+        results = map(run_task, flat)
+        yield from _merge(points, tasks, results)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        yield from _merge(points, tasks, ex.map(run_task, flat))
+
+def _merge(points, tasks, results) -> Iterator[Tuple[tuple, dict]]:
+    for pt, ts in zip(points, tasks):
+        total = {"ok": 0, "corrected": 0, "uncorrect": 0}
+        for _ in ts:
+            res = next(results)
+            for key in total:
+                total[key] += res[key]
+        yield pt, total
+
+# ===== Barrido adaptativo =====
+# Cada punto corre por lotes hasta que el intervalo de Wilson de ok_rate tiene
+# semiancho <= target (o se llega al tope de corridas). Los puntos con ok_rate
+# obvio (0 o 1) paran en el primer lote; la zona de transición recibe más
+# corridas. Los lotes se parten en tareas de hasta TASK_RUNS corridas con su
+# propio flujo aleatorio, y el tamaño de cada lote solo depende de los conteos
+# anteriores: el resultado es el mismo para cualquier cantidad de workers.
+def wilson_interval(ok: int, n: int, z: float = 1.96) -> Tuple[float, float]:
+    if n <= 0:
+        return 0.0, 1.0
+    ph = ok / n
+    d = 1 + z * z / n
+    c = (ph + z * z / (2 * n)) / d
+    h = z * math.sqrt(ph * (1 - ph) / n + z * z / (4 * n * n)) / d
+    return max(0.0, c - h), min(1.0, c + h)
+
+def _next_batch(ok: int, n: int, target: float, z: float, min_runs: int, max_runs: int) -> int:
+    if n == 0:
+        return min(min_runs, max_runs)
+    lo, hi = wilson_interval(ok, n, z)
+    if (hi - lo) / 2 <= target or n >= max_runs:
+        return 0
+    # corridas estimadas para llegar al target (p suavizado para no dividir por 0); a lo más duplica
+    pt = (ok + 2) / (n + 4)
+    need = int(z * z * pt * (1 - pt) / (target * target)) + 1
+    return min(max(need - n, min_runs), n, max_runs - n)
+
+def run_points_adaptive(points: Sequence[tuple], target: float, max_runs: int, seed: Optional[int],
+                        workers: int = 1, min_runs: int = 1024, z: float = 1.96,
+                        channel: str = "bsc") -> Iterator[Tuple[tuple, dict]]:
+    """Como run_points, pero cada punto corre hasta semiancho de Wilson <= target.
+
+    Los conteos traen además 'runs' (corridas hechas en ese punto)."""
+    if seed is None:
+        seed = np.random.SeedSequence().entropy
+    for _algo, _m, _k, p in points:
+        make_channel(channel, p)
+    totals = [{"ok": 0, "corrected": 0, "uncorrect": 0, "runs": 0} for _ in points]
+    chunks = [0] * len(points)
+    done = [False] * len(points)
+    emitted = 0
+    ex = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while emitted < len(points):
+            tasks, owner = [], []
+            for i, (algo, m, k, p) in enumerate(points):
+                if done[i]:
+                    continue
+                t = totals[i]
+                batch = _next_batch(t["ok"], t["runs"], target, z, min_runs, max_runs)
+                if batch == 0:
+                    done[i] = True
+                    continue
+                for start in range(0, batch, TASK_RUNS):
+                    tasks.append((algo, m, k, p, min(TASK_RUNS, batch - start), seed, chunks[i], channel))
+                    owner.append(i)
+                    chunks[i] += 1
+            results = ex.map(run_task, tasks) if ex is not None else map(run_task, tasks)
+            for i, task, res in zip(owner, tasks, results):
+                totals[i]["runs"] += task[4]
+                for key in ("ok", "corrected", "uncorrect"):
+                    totals[i][key] += res[key]
+            while emitted < len(points) and done[emitted]:
+                yield points[emitted], totals[emitted]
+                emitted += 1
+    finally:
+        if ex is not None:
+            ex.shutdown()
@@ -0,0 +1,50 @@
+# ===== Ruido i.i.d. por saltos geometricos =====
+# En vez de sortear un numero por bit, se sortea la distancia hasta el
+# siguiente flip: con BER p los huecos entre errores son Geometricos(p). El
+# costo es proporcional a la cantidad de flips, no al largo de la trama.
+import math
+import random
+from typing import List, Tuple
+
+import numpy as np
+
+from common.bitvec import BitVec
+
+def flip_positions(nbits: int, p: float, rnd: random.Random = random) -> List[int]:
+    """Posiciones (crecientes) que invierte un canal BSC(p) sobre nbits."""
+    if p <= 0.0 or nbits <= 0:
+        return []
+    if p >= 1.0:
+        return list(range(nbits))
+    log_q = math.log1p(-p)
+    out = []
+    i = -1
+    while True:
+        # bits sin error antes del proximo flip ~ Geometrica(p) - 1
+        i += 1 + int(math.log(1.0 - rnd.random()) / log_q)
+        if i >= nbits:
+            return out
+        out.append(i)
+
+def add_noise(bits: BitVec, p: float, rnd: random.Random = random) -> Tuple[BitVec, List[int]]:
+    """Trama con ruido y las posiciones invertidas."""
+    flips = flip_positions(len(bits), p, rnd)
+    return bits.flipped(flips), flips
+
+def bernoulli_positions(rng: np.random.Generator, total: int, p: float) -> np.ndarray:
+    """Posiciones en [0, total) de flips i.i.d. Bernoulli(p), en orden creciente."""
+    if p <= 0.0 or total <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if p >= 1.0:
+        return np.arange(total, dtype=np.int64)
+    parts = []
+    last = -1
+    while True:
+        # lote con algo de margen sobre lo esperado; se repite si no alcanza
+        want = int(total * p + 4 * math.sqrt(total * p) + 16)
+        pos = last + np.cumsum(rng.geometric(p, size=want))
+        if pos[-1] >= total:
+            parts.append(pos[:np.searchsorted(pos, total)])
+            return np.concatenate(parts)
+        parts.append(pos)
+        last = int(pos[-1])
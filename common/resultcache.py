@@ -0,0 +1,105 @@
+# ===== Caché de resultados del barrido offline =====
+# Cada punto terminado (algo, m, k, p) se agrega como una línea JSON a un
+# archivo, apenas termina. La clave es un hash de (algo, k, m, p, runs, seed,
+# canal, versión del código); la versión es un hash de los módulos que determinan
+# los conteos, así que cambiar el motor invalida solo lo que corresponde.
+# Volver a correr salta los puntos ya hechos, y un barrido interrumpido sigue
+# donde quedó (una última línea cortada a la mitad se ignora).
+import hashlib
+import json
+import os
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple, Union
+
+from common.montecarlo import run_points
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_SOURCES = ("montecarlo.py", "hamming.py", "crc32.py", "noise.py", "channels.py")
+
+def _code_version() -> str:
+    h = hashlib.sha256()
+    for name in _SOURCES:
+        with open(os.path.join(_HERE, name), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+CODE_VERSION = _code_version()
+
+# 'runs' es la cantidad fija de corridas, o un texto que describe el modo
+# adaptativo (p.ej. "wilson:0.005:1.96:1024:1000000")
+Runs = Union[int, str]
+COUNTS = ("ok", "corrected", "uncorrect", "runs")
+
+def point_key(point: tuple, runs: Runs, seed: int, channel: str = "bsc", version: str = CODE_VERSION) -> str:
+    algo, m, k, p = point
+    ident = json.dumps([algo, int(k), int(m), repr(float(p)), runs, int(seed), channel, version])
+    return hashlib.sha256(ident.encode()).hexdigest()
+
+class ResultCache:
+    """Conteos por punto en un archivo JSON Lines de solo-agregar."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                        self.entries[rec["key"]] = rec
+                    except (ValueError, KeyError, TypeError):
+                        continue  # línea incompleta de una corrida interrumpida
+        self._f = None
+
+    def get(self, point: tuple, runs: Runs, seed: int, channel: str = "bsc") -> Optional[dict]:
+        rec = self.entries.get(point_key(point, runs, seed, channel))
+        return None if rec is None else {c: rec["counts"][c] for c in COUNTS if c in rec["counts"]}
+
+    def put(self, point: tuple, runs: Runs, seed: int, counts: dict, channel: str = "bsc") -> None:
+        algo, m, k, p = point
+        rec = {"key": point_key(point, runs, seed, channel), "algo": algo, "k": k, "m": m, "p": p,
+               "runs": runs, "seed": seed, "channel": channel, "version": CODE_VERSION,
+               "counts": {c: counts[c] for c in COUNTS if c in counts}}
+        self.entries[rec["key"]] = rec
+        if self._f is None:
+            # binario: en modo texto seek() solo acepta posiciones dadas por tell()
+            self._f = open(self.path, "a+b")
+            end = self._f.seek(0, os.SEEK_END)
+            if end > 0:
+                # una corrida cortada pudo dejar la última línea sin '\n'
+                self._f.seek(end - 1)
+                if self._f.read(1) != b"\n":
+                    self._f.write(b"\n")
+        self._f.write((json.dumps(rec) + "\n").encode("utf-8"))
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+def run_points_cached(points: Sequence[tuple], runs: Runs, seed: int, workers: int = 1,
+                      cache: Optional[ResultCache] = None,
+                      runner: Optional[Callable[[Sequence[tuple]], Iterator[Tuple[tuple, dict]]]] = None,
+                      channel: str = "bsc") -> Iterator[Tuple[tuple, dict, bool]]:
+    """Como run_points, pero salta los puntos en caché y guarda cada punto nuevo al terminar.
+
+    'runner(puntos)' reemplaza a run_points (p.ej. el barrido adaptativo); 'runs' es
+    entonces la descripción del modo para la clave. Entrega (punto, conteos,
+    vino_de_caché) en el orden dado."""
+    if runner is None:
+        runner = lambda pts: run_points(pts, runs, seed, workers, channel)
+    if cache is None:
+        for pt, res in runner(points):
+            yield pt, res, False
+        return
+    hits = {i: cache.get(pt, runs, seed, channel) for i, pt in enumerate(points)}
+    missing = [pt for i, pt in enumerate(points) if hits[i] is None]
+    fresh = runner(missing) if missing else iter(())
+    for i, pt in enumerate(points):
+        if hits[i] is not None:
+            yield pt, hits[i], True
+            continue
+        _pt, res = next(fresh)
+        cache.put(pt, runs, seed, res, channel)
+        yield pt, res, False
@@ -0,0 +1,123 @@
+# ===== Formato binario de trama =====
+# Alternativa compacta a la línea JSON con 'frame_bits' como texto '0'/'1'
+# (un byte por bit). Una trama binaria es una cabecera fija seguida de los
+# bits empaquetados (MSB primero, como BitVec):
+#
+#   magic  u8   0xB1 (nunca empieza una línea JSON)
+#   ver    u8   versión del formato (1)
+#   algo   u8   0 = CRC32, 1 = HAMMING
+#   flags  u8   campos presentes: K, SEQ, P, BER
+#   k      u16  k de Hamming
+#   msglen u32  msg_ascii_len
+#   seq    u32  número de secuencia
+#   p      f64  p_error del emisor
+#   ber    f64  BER aplicada por el proxy (simulator_ber)
+#   nbits  u32  largo de la trama en bits
+#   payload     ceil(nbits/8) bytes
+#
+# Todo big-endian. El receptor y el proxy distinguen el formato por el primer
+# byte de cada mensaje, así que JSON y binario pueden mezclarse en la misma
+# conexión. Los acks siguen siendo líneas JSON.
+import asyncio
+import struct
+import time
+from typing import Iterable, Optional, Tuple
+
+from common.bitvec import BitVec
+
+MAGIC = 0xB1
+VERSION = 1
+HEADER = struct.Struct(">BBBBHIIddI")
+MAX_PAYLOAD = 1 << 26  # bytes de payload aceptados por trama (64 MiB)
+
+ALGOS = ("CRC32", "HAMMING")
+F_K, F_SEQ, F_P, F_BER = 1, 2, 4, 8
+
+_BER_OFFSET = struct.calcsize(">BBBBHIId")  # byte donde empieza 'ber' en la cabecera
+
+def is_binary(first: int) -> bool:
+    return first == MAGIC
+
+def encode_frame(payload: dict) -> bytes:
+    """dict estilo JSON (frame_bits como str o BitVec) -> trama binaria."""
+    algo = str(payload.get("algo", "")).upper().strip()
+    if algo not in ALGOS:
+        raise ValueError(f"algoritmo no soportado en binario: {algo!r}")
+    frame = payload.get("frame_bits", "")
+    if not isinstance(frame, BitVec):
+        frame = BitVec.from_str(str(frame))
+    flags = 0
+    k = payload.get("k"); seq = payload.get("seq")
+    p = payload.get("p_error"); ber = payload.get("simulator_ber")
+    if k is not None: flags |= F_K
+    if seq is not None: flags |= F_SEQ
+    if p is not None: flags |= F_P
+    if ber is not None: flags |= F_BER
+    head = HEADER.pack(MAGIC, VERSION, ALGOS.index(algo), flags,
+                       int(k or 0), int(payload.get("msg_ascii_len", 0)), int(seq or 0),
+                       float(p or 0.0), float(ber or 0.0), len(frame))
+    return head + frame.to_bytes()
+
+def payload_len(head: bytes) -> int:
+    """Bytes de payload que siguen a la cabecera; ValueError si no es válida."""
+    magic, ver, algo, _flags, _k, _m, _s, _p, _b, nbits = HEADER.unpack_from(head)
+    if magic != MAGIC or ver != VERSION:
+        raise ValueError(f"cabecera binaria inválida (magic={magic:#x}, versión={ver})")
+    if algo >= len(ALGOS):
+        raise ValueError(f"algoritmo desconocido: {algo}")
+    size = (nbits + 7) // 8
+    if size > MAX_PAYLOAD:
+        raise ValueError(f"payload de {size} bytes supera el máximo ({MAX_PAYLOAD})")
+    return size
+
+def header_fields(head: bytes) -> dict:
+    """Campos de la cabecera como dict estilo JSON (sin frame_bits)."""
+    _magic, _ver, algo, flags, k, msglen, seq, p, ber, _nbits = HEADER.unpack_from(head)
+    payload = {"msg_ascii_len": msglen, "algo": ALGOS[algo]}
+    if flags & F_K: payload["k"] = k
+    if flags & F_SEQ: payload["seq"] = seq
+    if flags & F_P: payload["p_error"] = p
+    if flags & F_BER: payload["simulator_ber"] = ber
+    return payload
+
+def decode_frame(buf: bytes) -> dict:
+    """Trama binaria -> dict con las mismas claves que el JSON (frame_bits como BitVec)."""
+    size = payload_len(buf)
+    if len(buf) != HEADER.size + size:
+        raise ValueError("largo de la trama binaria no coincide con la cabecera")
+    payload = header_fields(buf)
+    payload["frame_bits"] = BitVec(buf[HEADER.size:], frame_nbits(buf))
+    return payload
+
+def frame_nbits(buf) -> int:
+    return HEADER.unpack_from(buf)[-1]
+
+def flip_in_place(buf: bytearray, positions: Iterable[int]) -> None:
+    """Invierte bits del payload (0 = primer bit) sin reconstruir la trama."""
+    for i in positions:
+        buf[HEADER.size + (i >> 3)] ^= 0x80 >> (i & 7)
+
+def frame_bit(buf, i: int) -> int:
+    return (buf[HEADER.size + (i >> 3)] >> (7 - (i & 7))) & 1
+
+def set_channel_ber(buf: bytearray, ber: float) -> None:
+    buf[3] |= F_BER
+    struct.pack_into(">d", buf, _BER_OFFSET, ber)
+
+async def read_message(reader: asyncio.StreamReader, marks: Optional[list] = None
+                       ) -> Optional[Tuple[bool, bytes]]:
+    """Siguiente mensaje: (True, trama binaria) o (False, línea JSON con '\\n'); None en EOF.
+
+    Si se pasa 'marks', se le agrega el instante (perf_counter) en que llegó el primer byte."""
+    try:
+        first = await reader.readexactly(1)
+    except asyncio.IncompleteReadError:
+        return None
+    if marks is not None:
+        marks.append(time.perf_counter())
+    if is_binary(first[0]):
+        head = first + await reader.readexactly(HEADER.size - 1)
+        return True, head + await reader.readexactly(payload_len(head))
+    if first == b"\n":
+        return False, first
+    return False, first + await reader.readline()
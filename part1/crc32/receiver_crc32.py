@@ -1,3 +1,9 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.crc32 import crc32_bits
+
 # ===== Colores ANSI =====
 RESET   = "\033[0m"
 BOLD    = "\033[1m"
@@ -15,22 +21,6 @@ def group_every(s: str, n: int) -> str:
         out.append(ch)
     return ''.join(out)
 
-# CRC-32
-def crc32_bits(bits: str) -> int:
-    crc = 0xFFFFFFFF
-    poly = 0x04C11DB7
-    for c in bits:
-        if c not in '01':
-            raise ValueError("Solo bits 0/1")
-        b = 1 if c == '1' else 0
-        top = (crc >> 31) & 1
-        fb = top ^ b
-        crc = ((crc << 1) & 0xFFFFFFFF)
-        if fb:
-            crc ^= poly
-    crc ^= 0xFFFFFFFF
-    return crc
-
 def to_bin32(x: int) -> str:
     return "".join('1' if (x >> i) & 1 else '0' for i in range(31, -1, -1))  # MSB primero
 
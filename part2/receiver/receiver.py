@@ -1,7 +1,27 @@
 import argparse
+import asyncio
 import json
+import multiprocessing
+import os
+import queue
+import re
+import signal
 import socket
-from typing import Tuple, Optional, List
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Tuple, Optional, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.bitvec import BitVec
+from common.crc32 import CRC32Check, crc32_bytes, pack_bits
+from common.hamming import K_LIMIT, StreamDecoder, codec_for, layouts_for_len
+from common import arq, capture, goodput, metrics, wire
 
 RESET   = "\033[0m"
 BOLD    = "\033[1m"
@@ -17,100 +37,28 @@ try:
 except Exception:
     pass
 
-def group_every(s: str, n: int) -> str:
+def group_every(s, n: int) -> str:
+    s = str(s)
     return " ".join(s[i:i+n] for i in range(0, len(s), n))
 
-def ascii_from_bits(bits: str) -> str:
-    out = []
-    for i in range(0, len(bits), 8):
-        byte = bits[i:i+8]
-        if len(byte) < 8:
-            break
-        out.append(chr(int(byte, 2)))
-    return "".join(out)
+def ascii_from_bits(bits: BitVec) -> str:
+    # bytes completos -> latin-1 (equivale a chr(byte))
+    return bits[:len(bits) - len(bits) % 8].to_bytes().decode("latin-1")
 
-def hamming_distance(a: str, b: str) -> int:
+def hamming_distance(a: BitVec, b: BitVec) -> int:
     L = min(len(a), len(b))
-    return sum(1 for i in range(L) if a[i] != b[i]) + abs(len(a) - len(b))
-
-# ========== CRC32 ==========
-def crc32_bits(bits: str) -> int:
-    crc = 0xFFFFFFFF
-    poly = 0x04C11DB7
-    for c in bits:
-        if c not in "01":
-            raise ValueError("Bits inválidos")
-        b = 1 if c == '1' else 0
-        top = (crc >> 31) & 1
-        fb = top ^ b
-        crc = ((crc << 1) & 0xFFFFFFFF)
-        if fb:
-            crc ^= poly
-    crc ^= 0xFFFFFFFF
-    return crc
-
-def to_bin32(x: int) -> str:
-    return "".join('1' if (x >> i) & 1 else '0' for i in range(31, -1, -1))
+    return (a[:L] ^ b[:L]).popcount() + abs(len(a) - len(b))
 
-# ========== Hamming==========
-def is_pow2(x: int) -> bool:
-    return x != 0 and (x & (x - 1)) == 0
-
-def r_for_k(k: int) -> int:
-    r = 0
-    while (k + r + 1) > (1 << r):
-        r += 1
-    return r
-
-def syndrome(block_bits: str) -> int:
-    n = len(block_bits)
-    # cuántas posiciones potencia de 2 <= n
-    r = 0
-    while (1 << r) <= n:
-        r += 1
-    s = 0
-    # calcular paridades (even) incluyendo el bit de paridad
-    for i in range(r):
-        p = 1 << i
-        parity = 0
-        for k in range(1, n+1):
-            if k & p:
-                parity ^= (block_bits[k-1] == '1')
-        if parity == 1:
-            s |= p
-    return s
-
-def extract_data_from_block(block_bits: str) -> str:
-    out = []
-    for i in range(1, len(block_bits)+1):
-        if not is_pow2(i):
-            out.append(block_bits[i-1])
-    return "".join(out)
-
-def correct_block(block_bits: str) -> Tuple[str, bool, bool, Optional[int]]:
-    s = syndrome(block_bits)
-    if s == 0:
-        return block_bits, False, False, None
-    # Intento de corrección de 1 bit
-    n = len(block_bits)
-    if 1 <= s <= n:
-        lst = list(block_bits)
-        lst[s-1] = '0' if lst[s-1] == '1' else '1'
-        fixed = "".join(lst)
-        if syndrome(fixed) == 0:
-            return fixed, True, False, s
-    # no corregible confiablemente
-    return block_bits, False, True, None
+def frame_from_payload(payload: dict) -> BitVec:
+    frame = payload.get("frame_bits", "")
+    return frame if isinstance(frame, BitVec) else BitVec.from_str(str(frame))
 
+# ========== Hamming==========
+@lru_cache(maxsize=4096)
 def infer_k(frame_len: int, msg_bits_len: int) -> Optional[Tuple[int, int, int, int, int]]:
-
+    # los emisores repiten largos: después de la primera trama es una búsqueda en el caché
     candidates = []
-    for k in range(3, 65):
-        r = r_for_k(k)
-        n = k + r
-        if frame_len % n != 0:
-            continue
-        blocks = frame_len // n
+    for k, r, n, blocks in layouts_for_len(frame_len):
         total_data = blocks * k
         if total_data >= msg_bits_len:
             pad = total_data - msg_bits_len
@@ -120,177 +68,1234 @@ def infer_k(frame_len: int, msg_bits_len: int) -> Optional[Tuple[int, int, int,
     pad, _negk, k, r, n, blocks = min(candidates)
     return k, r, n, blocks, pad
 
-# ========== Red ==========
-def recv_line(conn: socket.socket) -> Optional[str]:
-
-    buf = bytearray()
-    while True:
-        chunk = conn.recv(4096)
-        if not chunk:
-            break
-        buf.extend(chunk)
-        if b"\n" in chunk:
-            break
-    if not buf:
-        return None
-    return buf.decode("utf-8", errors="replace").split("\n", 1)[0]
-
-def handle_crc(payload: dict) -> None:
-    frame = payload.get("frame_bits", "")
-    msg_ascii_len = int(payload.get("msg_ascii_len", 0))
-    data_bits_len = msg_ascii_len * 8
+# ========== Decodificación (sin imprimir) ==========
+@dataclass
+class DecodeResult:
+    algo: str
+    verdict: str = "invalid"           # "ok" | "discard" | "invalid"
+    error: Optional[str] = None        # motivo cuando verdict == "invalid"
+    p_error: Any = None
+    frame_len: Optional[int] = None
+    msg_bits_len: int = 0
+    data_bits: Optional[BitVec] = None
+    message: Optional[str] = None
+    # CRC32
+    recv_crc: Optional[BitVec] = None
+    calc_crc: Optional[BitVec] = None
+    crc_distance: int = 0
+    # Hamming
+    k: Optional[int] = None
+    r: Optional[int] = None
+    n: Optional[int] = None
+    blocks: int = 0
+    pad: int = 0
+    k_inferred: bool = False
+    corrected: int = 0
+    uncorrectable: int = 0
+    corrected_positions: List[Tuple[int, int]] = field(default_factory=list)
+    # verificada en flujo: data_bits/message son solo el inicio
+    streamed: bool = False
 
-    print(CYAN + "\n--------------- CRC32 ---------------" + RESET)
+def decode_crc(res: DecodeResult, frame: BitVec) -> None:
+    data_bits_len = res.msg_bits_len
     if len(frame) < data_bits_len + 32:
-        print(RED + "❌ Trama demasiado corta para datos + CRC32." + RESET)
-        print(GRAY + f"len(frame)={len(frame)}, datos esperados={data_bits_len}, crc=32" + RESET)
+        res.error = "short_frame"
         return
 
     data_bits = frame[:data_bits_len]
-    recv_crc_bits = frame[data_bits_len:data_bits_len+32]
-
-    calc_crc = crc32_bits(data_bits)
-    calc_crc_bits = to_bin32(calc_crc)
-
-    print(BOLD + "Datos (bits): " + RESET + group_every(data_bits, 8))
-    print(BOLD + "CRC recibido : " + RESET + group_every(recv_crc_bits, 4))
-    print(BOLD + "CRC calculado: " + RESET + group_every(calc_crc_bits, 4))
+    res.data_bits = data_bits
+    res.recv_crc = frame[data_bits_len:data_bits_len+32]
+    res.calc_crc = BitVec.from_int(crc32_bytes(data_bits.to_bytes(), len(data_bits)), 32)
 
-    if calc_crc_bits == recv_crc_bits:
-        print(GREEN + "✅ Resultado: No se detectaron errores." + RESET)
-        msg = ascii_from_bits(data_bits)
-        print(BOLD + "Mensaje (ASCII): " + RESET + msg)
-        print(GRAY + "Nota: CRC32 detecta todos los errores de 1 bit y todas las ráfagas de hasta 32 bits; no corrige." + RESET)
+    if res.calc_crc == res.recv_crc:
+        res.verdict = "ok"
+        res.message = ascii_from_bits(data_bits)
     else:
-        dist = hamming_distance(calc_crc_bits, recv_crc_bits)
-        print(RED + "❌ Resultado: Se detectaron errores. Verificación no coincide." + RESET)
-        print(BOLD + "Distancia de Hamming (CRC): " + RESET + f"{dist} bit(s)")
-        print(YELLOW + "Acción: descartar trama (CRC es de detección, no corrige)." + RESET)
+        res.verdict = "discard"
+        res.crc_distance = hamming_distance(res.calc_crc, res.recv_crc)
 
-def handle_hamming(payload: dict) -> None:
-    frame = payload.get("frame_bits", "")
-    msg_ascii_len = int(payload.get("msg_ascii_len", 0))
-    msg_bits_len = msg_ascii_len * 8
-
-    print(CYAN + "\n------------- HAMMING -------------" + RESET)
-
-    k = payload.get("k", None)
+def parse_k(k: Any) -> Optional[int]:
+    """k de Hamming (entero en [1, K_LIMIT], o texto con sus dígitos), o None si no es válido."""
     if isinstance(k, str) and k.isdigit():
         k = int(k)
-    elif isinstance(k, int):
-        pass
-    else:
-        k = None
+    elif not isinstance(k, int) or isinstance(k, bool):
+        return None
+    return k if 1 <= k <= K_LIMIT else None
+
+def parse_msg_len(v: Any) -> Optional[int]:
+    """msg_ascii_len en bits (0 si falta), o None si no es un entero >= 0."""
+    if isinstance(v, str) and v.isdigit():
+        return int(v) * 8
+    if isinstance(v, int) and not isinstance(v, bool) and v >= 0:
+        return v * 8
+    return None
+
+def decode_hamming(res: DecodeResult, frame: BitVec, k: Any) -> None:
+    msg_bits_len = res.msg_bits_len
+    if k is not None:
+        k = parse_k(k)
+        if k is None:
+            res.error = "bad_k"
+            return
 
     if k is None:
         inferred = infer_k(len(frame), msg_bits_len)
         if not inferred:
-            print(RED + "❌ No se pudo inferir 'k'. Ajusta el sender para incluir 'k' en el JSON." + RESET)
-            print(GRAY + f"len(frame)={len(frame)}, msg_bits_len={msg_bits_len}" + RESET)
+            res.error = "no_k"
             return
         k, r, n, blocks, pad = inferred
-        print(GRAY + f"(Inferido) k={k}, r={r}, n={n}, bloques={blocks}, pad≈{pad}" + RESET)
+        res.k_inferred = True
     else:
-        r = r_for_k(k)
-        n = k + r
-        if len(frame) % n != 0:
-            print(YELLOW + f"⚠ La longitud de la trama ({len(frame)}) no es múltiplo de n={n}. Intentaré continuar." + RESET)
+        codec = codec_for(k)
+        r, n = codec.r, codec.n
         blocks = len(frame) // n
         pad = max(0, blocks*k - msg_bits_len)
+    res.k, res.r, res.n, res.blocks, res.pad = k, r, n, blocks, pad
+
+    # todos los bloques completos de una vez (un bloque incompleto al final se ignora)
+    dec = codec_for(k).decode(frame.to_numpy()[:blocks*n])
+    res.corrected = int(dec.corrected.sum())
+    res.uncorrectable = int(dec.uncorrectable.sum())
+    res.corrected_positions = [
+        (int(b), int(dec.syndromes[b])) for b in np.flatnonzero(dec.corrected)]
 
-    corrected_count = 0
-    uncorrectable_count = 0
-    corrected_positions: List[Tuple[int,int]] = []
+    res.data_bits = BitVec.from_numpy(dec.data.ravel()[:msg_bits_len])
+    if res.uncorrectable == 0:
+        res.verdict = "ok"
+        res.message = ascii_from_bits(res.data_bits)
+    else:
+        res.verdict = "discard"
 
-    corrected_frame_bits = []
-    data_bits_all = []
+def decode_payload(payload: dict) -> DecodeResult:
+    res = DecodeResult(algo=str(payload.get("algo", "")).upper().strip(),
+                       p_error=payload.get("p_error"))
+    try:
+        frame = frame_from_payload(payload)
+    except ValueError:
+        res.error = "bad_bits"
+        return res
+    res.frame_len = len(frame)
+    msg_bits_len = parse_msg_len(payload.get("msg_ascii_len", 0))
+    if msg_bits_len is None:
+        res.error = "bad_len"
+        return res
+    res.msg_bits_len = msg_bits_len
 
-    for b in range(blocks):
-        blk = frame[b*n:(b+1)*n]
-        if len(blk) < n:
-            # bloque incompleto, ignora
-            continue
-        fixed, did_fix, uncorrectable, pos = correct_block(blk)
-        corrected_frame_bits.append(fixed)
-        if did_fix:
-            corrected_count += 1
-            corrected_positions.append((b, pos if pos is not None else -1))
-        if uncorrectable:
-            uncorrectable_count += 1
-        data_bits_all.append(extract_data_from_block(fixed))
-
-    corrected_frame = "".join(corrected_frame_bits)
-    data_bits_full = "".join(data_bits_all)
-    data_bits = data_bits_full[:msg_bits_len]
-
-    print(BOLD + f"Bloques procesados: " + RESET + f"{blocks} (n={n}, k={k}, r={r})")
-    print(BOLD + "Correcciones SEC: " + RESET + f"{corrected_count}")
-    if corrected_positions:
+    if res.algo == "CRC32":
+        decode_crc(res, frame)
+    elif res.algo == "HAMMING":
+        decode_hamming(res, frame, payload.get("k", None))
+    else:
+        res.error = "unknown_algo"
+    return res
+
+# ========== Tramas grandes en flujo ==========
+# Una trama de más de STREAM_MIN bytes no se junta entera en memoria: se
+# procesa a medida que llegan los bits y solo se guardan el inicio de los
+# datos y los contadores. CRC32 se verifica con CRC32Check; Hamming (con 'k'
+# conocido de antemano) se decodifica bloque a bloque con StreamDecoder.
+STREAM_MIN = 1 << 20    # bytes
+STREAM_CHUNK = 1 << 16  # bytes por lectura mientras se procesa en flujo
+STREAM_KEEP = 64        # bits de datos que se guardan para mostrar
+_FRAME_KEY = re.compile(rb'"frame_bits"\s*:\s*"')
+
+class FrameStream:
+    """Trama (JSON o binaria) que se procesa por trozos; las subclases procesan los bits."""
+
+    def __init__(self, meta: dict):
+        self.meta = meta
+        self.bad_bits = False
+        self.closed = False        # JSON: se vio la comilla que cierra frame_bits
+        self.suffix = bytearray()  # JSON: resto del objeto tras frame_bits
+
+    @staticmethod
+    def for_meta(meta: dict) -> Optional["FrameStream"]:
+        """Procesador en flujo para esos campos, o None si la trama hay que juntarla entera."""
+        algo = str(meta.get("algo", "")).upper().strip()
+        try:
+            if algo == "CRC32":
+                return CRCStream(meta)
+            k = parse_k(meta.get("k"))  # inválido: None, y decode_payload responde bad_k
+            if algo == "HAMMING" and k is not None:
+                return HammingStream(meta, k)
+        except (TypeError, ValueError):
+            pass
+        return None
+
+    @staticmethod
+    def from_header(head: bytes) -> Optional["FrameStream"]:
+        if wire.payload_len(head) <= STREAM_MIN:
+            return None
+        st = FrameStream.for_meta(wire.header_fields(head))
+        if st is not None:
+            st.closed = True  # binaria: no hay resto de JSON que leer
+        return st
+
+    @staticmethod
+    def from_json_head(head: bytes) -> Optional["FrameStream"]:
+        """Inicio de una línea JSON -> procesador en flujo si los campos necesarios van antes de frame_bits."""
+        m = _FRAME_KEY.search(head)
+        if not m:
+            return None
+        prefix = head[:m.start()].decode("utf-8", errors="replace").rstrip().rstrip(",")
+        try:
+            meta = json.loads(prefix + "}")
+        except ValueError:
+            return None
+        if not isinstance(meta, dict) or "msg_ascii_len" not in meta:
+            return None
+        st = FrameStream.for_meta(meta)
+        if st is not None:
+            st.feed_text(head[m.end():])
+        return st
+
+    def feed_text(self, chunk: bytes) -> None:
+        if self.closed:
+            self.suffix += chunk
+            return
+        q = chunk.find(b'"')
+        bits = chunk if q < 0 else chunk[:q]
+        if not self.bad_bits and bits:
+            try:
+                text = bits.decode("ascii")
+                self.feed_bits(pack_bits(text), len(text))
+            except ValueError:  # incluye UnicodeDecodeError
+                self.bad_bits = True
+        if q >= 0:
+            self.closed = True
+            self.suffix += chunk[q + 1:]
+
+    def feed_bits(self, chunk: bytes, nbits: int) -> None:
+        raise NotImplementedError
+
+    def result(self, payload: dict) -> DecodeResult:
+        raise NotImplementedError
+
+    def finish(self) -> Tuple[Optional[dict], Optional[DecodeResult], Optional[str]]:
+        """-> (payload sin frame_bits, resultado, None) o (None, None, error a imprimir)."""
+        payload = dict(self.meta)
+        if self.suffix or not self.closed:
+            rest = bytes(self.suffix).decode("utf-8", errors="replace").strip()
+            try:
+                if not self.closed or not rest.endswith("}"):
+                    raise ValueError("objeto JSON sin cerrar")
+                if rest != "}":
+                    extra = json.loads("{" + rest.lstrip(",").lstrip())
+                    payload.update(extra)
+            except ValueError as e:
+                return None, None, RED + f"❌ JSON inválido: {e}" + RESET
+        res = DecodeResult(algo=str(payload.get("algo", "")).upper().strip(),
+                           p_error=payload.get("p_error"), streamed=True)
+        if self.bad_bits:
+            res.error = "bad_bits"
+            return payload, res, None
+        return payload, self.result(res), None
+
+def stream_msg_len(meta: dict) -> int:
+    # inválido: ValueError, y for_meta deja la trama para decode_payload (que responde bad_len)
+    msg_bits_len = parse_msg_len(meta.get("msg_ascii_len", 0))
+    if msg_bits_len is None:
+        raise ValueError("msg_ascii_len inválido")
+    return msg_bits_len
+
+class CRCStream(FrameStream):
+    def __init__(self, meta: dict):
+        super().__init__(meta)
+        self.check = CRC32Check(stream_msg_len(meta), STREAM_KEEP)
+
+    def feed_bits(self, chunk: bytes, nbits: int) -> None:
+        self.check.update(chunk, nbits)
+
+    def result(self, res: DecodeResult) -> DecodeResult:
+        ck = self.check
+        res.frame_len = ck.nbits
+        res.msg_bits_len = ck.data_bits
+        if not ck.complete:
+            res.error = "short_frame"
+            return res
+        res.data_bits = BitVec.from_int(ck.head, ck.head_bits)
+        res.recv_crc = BitVec.from_int(ck.received(), 32)
+        res.calc_crc = BitVec.from_int(ck.calculated(), 32)
+        if ck.ok():
+            res.verdict = "ok"
+            res.message = ascii_from_bits(res.data_bits)
+        else:
+            res.verdict = "discard"
+            res.crc_distance = hamming_distance(res.calc_crc, res.recv_crc)
+        return res
+
+class HammingStream(FrameStream):
+    def __init__(self, meta: dict, k: int):
+        super().__init__(meta)
+        self.msg_bits_len = stream_msg_len(meta)
+        self.dec = StreamDecoder(k)
+        self.head: List[np.ndarray] = []
+        self.head_bits = 0
+        self.positions: List[Tuple[int, int]] = []
+
+    def feed_bits(self, chunk: bytes, nbits: int) -> None:
+        first = self.dec.blocks
+        out = self.dec.feed(chunk, nbits)
+        if self.head_bits < STREAM_KEEP and len(out.data):
+            take = out.data.ravel()[:STREAM_KEEP - self.head_bits]
+            self.head.append(take)
+            self.head_bits += len(take)
+        if len(self.positions) < 10:
+            for b in np.flatnonzero(out.corrected)[:10 - len(self.positions)]:
+                self.positions.append((first + int(b), int(out.syndromes[b])))
+
+    def result(self, res: DecodeResult) -> DecodeResult:
+        dec = self.dec
+        codec = dec.codec
+        res.frame_len = dec.nbits
+        res.msg_bits_len = self.msg_bits_len
+        res.k, res.r, res.n, res.blocks = codec.k, codec.r, codec.n, dec.blocks
+        res.pad = max(0, dec.blocks * codec.k - self.msg_bits_len)
+        res.corrected, res.uncorrectable = dec.corrected, dec.uncorrectable
+        res.corrected_positions = self.positions
+        head = np.concatenate(self.head) if self.head else np.zeros(0, dtype=np.uint8)
+        res.data_bits = BitVec.from_numpy(head[:self.msg_bits_len])
+        if res.uncorrectable == 0:
+            res.verdict = "ok"
+            res.message = ascii_from_bits(res.data_bits)
+        else:
+            res.verdict = "discard"
+        return res
+
+# ========== Red ==========
+MAX_LINE = 1 << 26  # tope de una línea JSON (64 MiB)
+
+class LineReader:
+    """Lector de líneas (y tramas binarias) sobre un socket; lo leído de más queda para la siguiente."""
+
+    def __init__(self, conn: socket.socket, max_line: int = MAX_LINE):
+        self.conn = conn
+        self.max_line = max_line
+        self.buf = bytearray()
+        self._scanned = 0  # bytes de buf ya revisados sin encontrar '\n'
+        self.started = 0.0  # perf_counter() del primer byte del último mensaje
+
+    def readline(self) -> Optional[bytes]:
+        """Siguiente línea sin el '\n'; la cola sin '\n' al cerrar cuenta como línea; None en EOF."""
+        while True:
+            i = self.buf.find(b"\n", self._scanned)
+            if i >= 0:
+                line = bytes(self.buf[:i])
+                del self.buf[:i+1]
+                self._scanned = 0
+                return line
+            self._scanned = len(self.buf)
+            if len(self.buf) > self.max_line:
+                raise ValueError(f"línea de más de {self.max_line} bytes")
+            chunk = self.conn.recv(65536)
+            if not chunk:
+                if not self.buf:
+                    return None
+                line = bytes(self.buf)
+                self.buf.clear()
+                self._scanned = 0
+                return line
+            self.buf.extend(chunk)
+
+    def read_exact(self, n: int) -> bytes:
+        while len(self.buf) < n:
+            chunk = self.conn.recv(max(65536, n - len(self.buf)))
+            if not chunk:
+                raise ValueError(f"conexión cerrada a mitad de trama binaria ({len(self.buf)}/{n} bytes)")
+            self.buf.extend(chunk)
+        out = bytes(self.buf[:n])
+        del self.buf[:n]
+        self._scanned = 0
+        return out
+
+    def read_message(self) -> Optional[Tuple[str, Any]]:
+        """Siguiente mensaje: ("json", línea), ("bin", trama) o ("stream", FrameStream); None en EOF."""
+        if not self.buf:
+            chunk = self.conn.recv(65536)
+            if not chunk:
+                return None
+            self.buf.extend(chunk)
+        self.started = time.perf_counter()
+        if not wire.is_binary(self.buf[0]):
+            return self._read_json()
+        head = self.read_exact(wire.HEADER.size)
+        st = FrameStream.from_header(head)
+        if st is None:
+            return "bin", head + self.read_exact(wire.payload_len(head))
+        left = wire.frame_nbits(head)
+        while left > 0:
+            chunk = self.read_exact(min(STREAM_CHUNK, (left + 7) // 8))
+            n = min(left, len(chunk) * 8)
+            st.feed_bits(chunk, n)
+            left -= n
+        return "stream", st
+
+    def _read_json(self) -> Tuple[str, Any]:
+        # como readline, pero una línea que pasa de STREAM_MIN se procesa en flujo si se puede
+        while True:
+            if self.buf.find(b"\n", self._scanned) >= 0:
+                return "json", self.readline()
+            self._scanned = len(self.buf)
+            if len(self.buf) > STREAM_MIN:
+                break
+            chunk = self.conn.recv(65536)
+            if not chunk:
+                return "json", self.readline()
+            self.buf.extend(chunk)
+        st = FrameStream.from_json_head(bytes(self.buf))
+        if st is None:
+            return "json", self.readline()
+        self.buf.clear()
+        self._scanned = 0
+        while True:
+            chunk = self.conn.recv(STREAM_CHUNK)
+            if not chunk:
+                return "stream", st
+            i = chunk.find(b"\n")
+            if i >= 0:
+                st.feed_text(chunk[:i])
+                self.buf.extend(chunk[i + 1:])
+                return "stream", st
+            st.feed_text(chunk)
+
+def make_ack(index: int, payload: Optional[dict], res: Optional[DecodeResult], error: Optional[str] = None,
+             extra: Optional[dict] = None) -> bytes:
+    # una línea JSON por trama, en el mismo orden en que llegaron
+    ack = {"type": "ack", "frame": index}
+    if payload is not None and "seq" in payload:
+        ack["seq"] = payload["seq"]
+    if res is None:
+        ack.update(verdict="invalid", error=error)
+    else:
+        ack.update(algo=res.algo, verdict=res.verdict)
+        if res.error:
+            ack["error"] = res.error
+        if res.algo == "HAMMING" and res.k is not None:
+            ack.update(k=res.k, corrected=res.corrected, uncorrectable=res.uncorrectable)
+    if extra:
+        ack.update(extra)
+    return (json.dumps(ack) + "\n").encode("utf-8")
+
+# ========== Consejo de codec (--advise) ==========
+# Por emisor, una ventana de las últimas tramas estima la BER del canal
+# (common.goodput.LiveAdvisor). Cuando cambia la configuración de mayor
+# goodput, el ack lleva "advice": {"algo", "k" (Hamming), "ber", "goodput"};
+# el resto de los acks no cambia. El emisor es el "sid" de la trama si lo
+# trae (por una conexión del pool del proxy pasan tramas de varios
+# emisores); si no, la conexión.
+def advice_for(advisor: Optional[goodput.LiveAdvisor], res: Optional[DecodeResult]) -> Optional[dict]:
+    if advisor is None or res is None or res.error:
+        return None
+    if res.algo == "HAMMING" and res.blocks:
+        advisor.observe_hamming(res.blocks * res.n, res.corrected, res.uncorrectable)
+    elif res.algo == "CRC32":
+        advisor.observe_crc(res.frame_len or 0, res.verdict == "ok")
+    else:
+        return None
+    return advisor.advice(res.msg_bits_len)
+
+# ========== ARQ (tramas con 'sid') ==========
+# Las tramas con "sid" y "seq" son de una sesión de repetición selectiva
+# (common.arq); su ack lleva además cum/sack/nak/dup. Las demás no cambian.
+def ack_extra(out: "Output", payload: Optional[dict], res: Optional[DecodeResult],
+              advice: Optional[dict]) -> Optional[dict]:
+    extra = out.arq_feedback(payload, res)
+    if advice is not None:
+        extra = dict(extra or {}, advice=advice)
+    return extra
+
+# ========== Presentación en consola ==========
+def render_crc(res: DecodeResult) -> List[str]:
+    out = [CYAN + "\n--------------- CRC32 ---------------" + RESET]
+    if res.error == "short_frame":
+        out.append(RED + "❌ Trama demasiado corta para datos + CRC32." + RESET)
+        out.append(GRAY + f"len(frame)={res.frame_len}, datos esperados={res.msg_bits_len}, crc=32" + RESET)
+        return out
+
+    if res.streamed:
+        out.append(GRAY + "(Verificada en flujo: solo se muestra el inicio de los datos)" + RESET)
+        out.append(BOLD + f"Datos (primeros {len(res.data_bits)} de {res.msg_bits_len} bits): " + RESET
+                   + group_every(res.data_bits, 8) + " ...")
+    else:
+        out.append(BOLD + "Datos (bits): " + RESET + group_every(res.data_bits, 8))
+    out.append(BOLD + "CRC recibido : " + RESET + group_every(res.recv_crc, 4))
+    out.append(BOLD + "CRC calculado: " + RESET + group_every(res.calc_crc, 4))
+
+    if res.verdict == "ok":
+        out.append(GREEN + "✅ Resultado: No se detectaron errores." + RESET)
+        out.append(BOLD + "Mensaje (ASCII): " + RESET + res.message + (" ..." if res.streamed else ""))
+        out.append(GRAY + "Nota: CRC32 detecta todos los errores de 1 bit y todas las ráfagas de hasta 32 bits; no corrige." + RESET)
+    else:
+        out.append(RED + "❌ Resultado: Se detectaron errores. Verificación no coincide." + RESET)
+        out.append(BOLD + "Distancia de Hamming (CRC): " + RESET + f"{res.crc_distance} bit(s)")
+        out.append(YELLOW + "Acción: descartar trama (CRC es de detección, no corrige)." + RESET)
+    return out
+
+def render_hamming(res: DecodeResult) -> List[str]:
+    out = [CYAN + "\n------------- HAMMING -------------" + RESET]
+    if res.error == "bad_k":
+        out.append(RED + f"❌ 'k' no es un entero entre 1 y {K_LIMIT}." + RESET)
+        return out
+    if res.error == "no_k":
+        out.append(RED + "❌ No se pudo inferir 'k'. Ajusta el sender para incluir 'k' en el JSON." + RESET)
+        out.append(GRAY + f"len(frame)={res.frame_len}, msg_bits_len={res.msg_bits_len}" + RESET)
+        return out
+    if res.k_inferred:
+        out.append(GRAY + f"(Inferido) k={res.k}, r={res.r}, n={res.n}, bloques={res.blocks}, pad≈{res.pad}" + RESET)
+    elif res.frame_len % res.n != 0:
+        out.append(YELLOW + f"⚠ La longitud de la trama ({res.frame_len}) no es múltiplo de n={res.n}. Intentaré continuar." + RESET)
+
+    data_bits = res.data_bits
+    out.append(BOLD + f"Bloques procesados: " + RESET + f"{res.blocks} (n={res.n}, k={res.k}, r={res.r})")
+    out.append(BOLD + "Correcciones SEC: " + RESET + f"{res.corrected}")
+    if res.corrected_positions:
         # muestra hasta los primeros 10
-        shown = ", ".join(f"b{bi}@{pi}" for bi,pi in corrected_positions[:10])
-        extra = "" if len(corrected_positions)<=10 else f" (+{len(corrected_positions)-10} más)"
-        print(GRAY + f"Posiciones corregidas (bloque@bit): {shown}{extra}" + RESET)
-    print(BOLD + "No corregibles : " + RESET + f"{uncorrectable_count}")
-
-    if uncorrectable_count == 0:
-        print(GREEN + "✅ Resultado: Mensaje recuperado (0 bloques no corregibles)." + RESET)
-        print(BOLD + "Datos (bits): " + RESET + group_every(data_bits, 8))
-        print(BOLD + "Mensaje (ASCII): " + RESET + ascii_from_bits(data_bits))
-        print(GRAY + "Nota: Hamming SEC corrige 1 bit por bloque; 2+ errores en el mismo bloque pueden ser no corregibles." + RESET)
+        shown = ", ".join(f"b{bi}@{pi}" for bi,pi in res.corrected_positions[:10])
+        extra = "" if res.corrected<=10 else f" (+{res.corrected-10} más)"
+        out.append(GRAY + f"Posiciones corregidas (bloque@bit): {shown}{extra}" + RESET)
+    out.append(BOLD + "No corregibles : " + RESET + f"{res.uncorrectable}")
+
+    if res.streamed:
+        out.append(GRAY + "(Decodificada en flujo: solo se muestra el inicio de los datos)" + RESET)
+    if res.uncorrectable == 0:
+        out.append(GREEN + "✅ Resultado: Mensaje recuperado (0 bloques no corregibles)." + RESET)
+        if res.streamed:
+            out.append(BOLD + f"Datos (primeros {len(data_bits)} de {res.msg_bits_len} bits): " + RESET
+                       + group_every(data_bits, 8) + " ...")
+            out.append(BOLD + "Mensaje (ASCII): " + RESET + res.message + " ...")
+        else:
+            out.append(BOLD + "Datos (bits): " + RESET + group_every(data_bits, 8))
+            out.append(BOLD + "Mensaje (ASCII): " + RESET + res.message)
+        out.append(GRAY + "Nota: Hamming SEC corrige 1 bit por bloque; 2+ errores en el mismo bloque pueden ser no corregibles." + RESET)
     else:
-        print(RED + "❌ Resultado: Se detectaron errores no corregibles; descartar mensaje." + RESET)
-        print(BOLD + "Datos (parciales, recortados): " + RESET + group_every(data_bits[:min(len(data_bits), 64)], 8) + (" ..." if len(data_bits)>64 else ""))
-        print(GRAY + "Sugerencia: reduce la probabilidad de error o usa bloques con mayor redundancia." + RESET)
-
-def handle_payload(payload: dict) -> None:
-    algo = str(payload.get("algo", "")).upper().strip()
-    print(CYAN + "--------------------------------------------" + RESET)
-    print(BOLD + "Algoritmo: " + RESET + algo)
-    if "p_error" in payload:
-        print(BOLD + "p_error   : " + RESET + f"{payload.get('p_error')}")
-    print(BOLD + "len(frame): " + RESET + f"{len(payload.get('frame_bits',''))} bits")
-    print(CYAN + "--------------------------------------------" + RESET)
-
-    if algo == "CRC32":
-        handle_crc(payload)
-    elif algo == "HAMMING":
-        handle_hamming(payload)
+        out.append(RED + "❌ Resultado: Se detectaron errores no corregibles; descartar mensaje." + RESET)
+        more = len(data_bits) > 64 or (res.streamed and res.msg_bits_len > len(data_bits))
+        out.append(BOLD + "Datos (parciales, recortados): " + RESET + group_every(data_bits[:min(len(data_bits), 64)], 8) + (" ..." if more else ""))
+        out.append(GRAY + "Sugerencia: reduce la probabilidad de error o usa bloques con mayor redundancia." + RESET)
+    return out
+
+def render_result(res: DecodeResult) -> str:
+    out = [CYAN + "--------------------------------------------" + RESET,
+           BOLD + "Algoritmo: " + RESET + res.algo]
+    if res.p_error is not None:
+        out.append(BOLD + "p_error   : " + RESET + f"{res.p_error}")
+    if res.error == "bad_bits":
+        out.append(RED + "❌ 'frame_bits' contiene caracteres distintos de 0/1." + RESET)
+        return "\n".join(out)
+    if res.error == "bad_len":
+        out.append(RED + "❌ 'msg_ascii_len' no es un entero >= 0." + RESET)
+        return "\n".join(out)
+    out.append(BOLD + "len(frame): " + RESET + f"{res.frame_len} bits")
+    out.append(CYAN + "--------------------------------------------" + RESET)
+
+    if res.algo == "CRC32":
+        out.extend(render_crc(res))
+    elif res.algo == "HAMMING":
+        out.extend(render_hamming(res))
+    else:
+        out.append(RED + "❌ Algoritmo no reconocido en payload." + RESET)
+    return "\n".join(out)
+
+def handle_payload(payload: dict) -> DecodeResult:
+    res = decode_payload(payload)
+    print(render_result(res))
+    return res
+
+# ========== Salida: renderers y escritor en segundo plano ==========
+# Los servidores solo informan qué pasó (resultado de cada trama, avisos de
+# conexión). El formato lo elige --output y el texto se arma y se escribe en
+# un hilo aparte: una consola lenta no frena la decodificación.
+_ANSI = re.compile(r"\033\[[0-9;]*m")
+
+ALGOS = ("CRC32", "HAMMING")
+
+class Counters:
+    """Totales y métricas del receptor (common.metrics); se actualizan en el camino de decodificación."""
+
+    STAGES = ("receive", "parse", "decode", "output")
+
+    def __init__(self, registry: Optional[metrics.Registry] = None):
+        self.registry = r = registry or metrics.Registry()
+        self._frames = r.counter("receiver_frames_total", "Tramas procesadas", ("algo", "verdict"))
+        self.bits = r.counter("receiver_bits_total", "Bits de trama procesados").labels()
+        self.corrected = r.counter("receiver_hamming_corrected_total", "Bloques Hamming corregidos").labels()
+        self.uncorrectable = r.counter("receiver_hamming_uncorrectable_total",
+                                       "Bloques Hamming con error no corregible").labels()
+        self.crc_failures = r.counter("receiver_crc_failures_total", "Tramas CRC32 descartadas").labels()
+        self.connections = r.gauge("receiver_connections", "Conexiones abiertas").labels()
+        self.advice = r.counter("receiver_advice_total", "Consejos de codec enviados en el ack", ("algo",))
+        arq_frames = r.counter("receiver_arq_frames_total", "Tramas ARQ por resultado (new/dup/nak/window)",
+                               ("status",))
+        self.arq = {st: arq_frames.labels(st) for st in ("new", "dup", "nak", "window")}
+        self.arq_sessions = r.gauge("receiver_arq_sessions", "Sesiones ARQ recordadas").labels()
+        stage = r.histogram("receiver_stage_seconds", "Latencia por trama y etapa", ("stage",))
+        self.stage = {name: stage.labels(name) for name in self.STAGES}
+        self._series = {}
+        self._rates = metrics.RateTracker()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        self.stage[stage].observe(seconds)
+
+    def add(self, res: Optional[DecodeResult]) -> None:
+        if res is None:
+            key = ("none", "invalid")
+        else:
+            # el algo lo manda el cliente: los desconocidos comparten una serie
+            algo = res.algo if res.algo in ALGOS else ("other" if res.algo else "none")
+            key = (algo, res.verdict)
+        s = self._series.get(key)
+        if s is None:
+            s = self._series[key] = self._frames.labels(*key)
+        s.inc()
+        if res is None:
+            return
+        self.bits.inc(res.frame_len or 0)
+        if res.corrected:
+            self.corrected.inc(res.corrected)
+        if res.uncorrectable:
+            self.uncorrectable.inc(res.uncorrectable)
+        if res.algo == "CRC32" and res.verdict == "discard":
+            self.crc_failures.inc()
+
+    def as_dict(self) -> dict:
+        verdicts = {"ok": 0, "discard": 0, "invalid": 0}
+        for (_algo, verdict), s in self._frames.series():
+            verdicts[verdict] = verdicts.get(verdict, 0) + s.value
+        return {"frames": sum(verdicts.values()), "bits": self.bits.value, **verdicts,
+                "corrected": self.corrected.value, "uncorrectable": self.uncorrectable.value}
+
+    def rates(self, seconds: float) -> dict:
+        """Resumen periódico: tasas desde la llamada anterior y latencias aproximadas."""
+        c = self.as_dict()
+        out = {"frames_s": round(self._rates.delta("frames", c["frames"]) / seconds, 1),
+               "bits_s": round(self._rates.delta("bits", c["bits"]) / seconds),
+               **c, "crc_failures": self.crc_failures.value}
+        for name in ("decode", "output"):
+            h = self.stage[name]
+            out[f"{name}_p50_ms"] = round(h.quantile(0.5) * 1e3, 3)
+            out[f"{name}_p99_ms"] = round(h.quantile(0.99) * 1e3, 3)
+        return out
+
+class PrettyRenderer:
+    """Salida original en consola (colores, bits agrupados)."""
+
+    def frame(self, addr, index: int, payload: Optional[dict], res: Optional[DecodeResult],
+              err: Optional[str], announce: bool) -> Optional[str]:
+        out = []
+        if index or announce:
+            head = (f"\n↘ Conexión de {addr[0]}:{addr[1]}" if index == 0
+                    else f"\n↘ Trama #{index} de {addr[0]}:{addr[1]}")
+            out.append(YELLOW + head + RESET)
+        out.append(err if err else render_result(res))
+        return "\n".join(out)
+
+    def note(self, text: str) -> Optional[str]:
+        return text
+
+    def banner(self, text: str) -> Optional[str]:
+        return self.note(text)
+
+    def summary(self, counters: Counters) -> str:
+        c = counters.as_dict()
+        return GRAY + ("Totales: " + ", ".join(f"{k}={v}" for k, v in c.items())) + RESET
+
+    def stats(self, rates: dict) -> Optional[str]:
+        return GRAY + ("[stats] " + " ".join(f"{k}={v}" for k, v in rates.items())) + RESET
+
+class JsonRenderer(PrettyRenderer):
+    """Una línea JSON compacta por trama (para guardar o procesar con otras herramientas)."""
+
+    def frame(self, addr, index, payload, res, err, announce):
+        rec = {"peer": f"{addr[0]}:{addr[1]}", "frame": index}
+        if payload is not None and "seq" in payload:
+            rec["seq"] = payload["seq"]
+        if res is None:
+            rec.update(verdict="invalid", error=_ANSI.sub("", err or "").strip())
+        else:
+            rec.update(algo=res.algo, verdict=res.verdict, frame_len=res.frame_len)
+            if res.error:
+                rec["error"] = res.error
+            if res.algo == "HAMMING" and res.k is not None:
+                rec.update(k=res.k, corrected=res.corrected, uncorrectable=res.uncorrectable,
+                           positions=res.corrected_positions[:10])
+            if res.message is not None:
+                rec["message"] = res.message
+            if res.streamed:
+                rec["streamed"] = True
+        return json.dumps(rec, ensure_ascii=False, separators=(",", ":"))
+
+    def note(self, text):
+        return json.dumps({"event": _ANSI.sub("", text).strip()}, ensure_ascii=False, separators=(",", ":"))
+
+    def summary(self, counters):
+        return json.dumps({"summary": counters.as_dict()}, separators=(",", ":"))
+
+    def stats(self, rates):
+        return json.dumps({"stats": rates}, separators=(",", ":"))
+
+class QuietRenderer(PrettyRenderer):
+    """Sin salida por trama: solo contadores (y el resumen al cerrar)."""
+
+    def frame(self, addr, index, payload, res, err, announce):
+        return None
+
+    def note(self, text):
+        return None
+
+    def banner(self, text):
+        return text
+
+RENDERERS = {"pretty": PrettyRenderer, "json": JsonRenderer, "quiet": QuietRenderer}
+
+class BackgroundWriter(threading.Thread):
+    """Arma y escribe la salida en un hilo aparte, juntando varios textos por write()."""
+
+    BATCH = 256
+
+    def __init__(self, stream=None, max_pending: int = 10000, observe=None):
+        super().__init__(name="receiver-output", daemon=True)
+        self.stream = stream or sys.stdout
+        self.q = queue.Queue(maxsize=max_pending)
+        self.observe = observe  # observe(segundos) por cada texto armado
+        self.start()
+
+    def submit(self, fn, *args) -> None:
+        # solo bloquea si hay max_pending salidas sin escribir (memoria acotada)
+        self.q.put((fn, args))
+
+    def run(self) -> None:
+        stop = False
+        while not stop:
+            item = self.q.get()
+            batch = []
+            while True:
+                if item is None:
+                    stop = True
+                    break
+                fn, args = item
+                t0 = time.perf_counter()
+                try:
+                    text = fn(*args)
+                except Exception as e:
+                    text = RED + f"❌ Error armando la salida: {e!r}" + RESET
+                if self.observe is not None:
+                    self.observe(time.perf_counter() - t0)
+                if text is not None:
+                    batch.append(text)
+                if len(batch) >= self.BATCH:
+                    break
+                try:
+                    item = self.q.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                self.stream.write("\n".join(batch) + "\n")
+                self.stream.flush()
+
+    def close(self) -> None:
+        self.q.put(None)
+        self.join()
+
+class Output:
+    """Lo que usan los servidores: contadores + renderer + escritor."""
+
+    def __init__(self, mode: str = "pretty", stream=None, stats_every: float = 0.0, advise=None,
+                 arq_window: int = 1024, worker: Optional[int] = None, capture_path: Optional[str] = None):
+        self.renderer = RENDERERS[mode]()
+        self.worker = worker  # con --workers: sin banner ni totales (los imprime el proceso principal)
+        self.stats_extra = None  # función -> campos extra del resumen periódico
+        self.advise = advise  # fábrica de LiveAdvisor (una por sid o por conexión) o None
+        self.advisors: "OrderedDict[str, goodput.LiveAdvisor]" = OrderedDict()  # por sid, LRU
+        self.arq = arq.ArqSessions(arq_window)
+        self.capture = capture.CaptureWriter(capture_path) if capture_path else None  # --capture (ya creada)
+        self.silent = mode == "quiet"
+        self.counters = Counters()
+        self.writer = BackgroundWriter(stream, observe=self.counters.stage["output"].observe)
+        self.counters.registry.gauge("receiver_output_pending", "Salidas esperando al escritor"
+                                     ).set_function(self.writer.q.qsize)
+        self.counters.arq_sessions.set_function(lambda: len(self.arq.sessions))
+        self.metrics_url = None
+        self.periodic = metrics.Periodic(stats_every, self.stats) if stats_every > 0 else None
+
+    def serve_metrics(self, host: str, port: int) -> None:
+        """Endpoint HTTP /metrics (formato de texto de Prometheus)."""
+        metrics.serve_http(self.counters.registry, host, port)
+        self.metrics_url = f"http://{host}:{port}/metrics"
+
+    def stats(self, seconds: float) -> None:
+        rates = self.counters.rates(seconds)
+        if self.stats_extra is not None:
+            rates.update(self.stats_extra())
+        self.writer.submit(self.renderer.stats, rates)
+
+    def arq_feedback(self, payload: Optional[dict], res: Optional[DecodeResult]) -> Optional[dict]:
+        """Campos ARQ del ack si la trama trae sid y seq; None si no."""
+        if payload is None or "sid" not in payload or not isinstance(payload.get("seq"), int):
+            return None
+        ok = res is not None and res.verdict == "ok" and not res.error
+        fb = self.arq.frame(str(payload["sid"]), payload["seq"], ok)
+        self.counters.arq[fb.pop("status")].inc()
+        return fb
+
+    def record(self, conn: int, kind: str, obj: Any) -> None:
+        """Agrega la trama tal como llegó a la captura (--capture)."""
+        if self.capture is None:
+            return
+        if kind == "stream":
+            self.capture.frame(conn, b"", False, flags=capture.FLAG_STREAMED)  # no se guardó entera
+        else:
+            self.capture.frame(conn, obj, kind == "bin")
+
+    def advisor(self) -> Optional[goodput.LiveAdvisor]:
+        return self.advise() if self.advise is not None else None
+
+    def advisor_for(self, payload: Optional[dict], conn_advisor: Optional[goodput.LiveAdvisor]
+                    ) -> Optional[goodput.LiveAdvisor]:
+        """El de la sesión si la trama trae sid (los más viejos se olvidan); si no, el de la conexión."""
+        if conn_advisor is None or payload is None or "sid" not in payload:
+            return conn_advisor
+        sid = str(payload["sid"])
+        a = self.advisors.get(sid)
+        if a is None:
+            a = self.advisors[sid] = self.advise()
+            if len(self.advisors) > arq.MAX_SESSIONS:
+                self.advisors.popitem(last=False)
+        else:
+            self.advisors.move_to_end(sid)
+        return a
+
+    def advised(self, addr, advice: dict) -> None:
+        self.counters.advice.labels(advice["algo"]).inc()
+        name = "CRC32" if advice["algo"] == "CRC32" else f"HAMMING k={advice['k']}"
+        self.note(CYAN + f"💡 {addr[0]}:{addr[1]}: BER≈{advice['ber']:g} → se aconseja {name} "
+                  f"(goodput {advice['goodput']:.3f})" + RESET)
+
+    def frame(self, addr, index: int, payload: Optional[dict], res: Optional[DecodeResult],
+              err: Optional[str] = None, announce: bool = True) -> None:
+        self.counters.add(res)
+        if not self.silent:
+            self.writer.submit(self.renderer.frame, addr, index, payload, res, err, announce)
+
+    def note(self, text: str) -> None:
+        if not self.silent:
+            self.writer.submit(self.renderer.note, text)
+
+    def banner(self, text: str) -> None:
+        if self.worker is None:
+            self.writer.submit(self.renderer.banner, text)
+
+    def close(self) -> None:
+        if self.periodic is not None:
+            self.periodic.stop()
+        if self.worker is None:
+            self.writer.submit(self.renderer.summary, self.counters)
+        self.writer.close()
+        if self.capture is not None:
+            self.capture.close()
+
+def parse_line(line: str) -> Tuple[Optional[dict], Optional[str]]:
+    """JSON de una trama -> (payload, None) o (None, texto de error a imprimir)."""
+    try:
+        payload = json.loads(line)
+    except Exception as e:
+        return None, (RED + f"❌ JSON inválido: {e}" + RESET + "\n"
+                      + GRAY + f"Contenido recibido (trunc): {line[:200]}..." + RESET)
+    if not isinstance(payload, dict):
+        return None, RED + "❌ JSON inválido: se esperaba un objeto." + RESET
+    return payload, None
+
+def decode_message(kind: str, obj: Any, counters: Optional[Counters] = None
+                   ) -> Tuple[Optional[dict], Optional[DecodeResult], Optional[str]]:
+    """Mensaje leído -> (payload, resultado, None) o (None, None, texto de error)."""
+    t0 = time.perf_counter()
+    if kind == "stream":
+        # en flujo, la decodificación ocurre mientras se recibe; aquí solo se cierra
+        out = obj.finish()
+        if counters is not None:
+            counters.observe("decode", time.perf_counter() - t0)
+        return out
+    if kind == "json":
+        payload, err = parse_line(obj.decode("utf-8", errors="replace").strip())
     else:
-        print(RED + "❌ Algoritmo no reconocido en payload." + RESET)
+        try:
+            payload, err = wire.decode_frame(obj), None
+        except ValueError as e:
+            payload, err = None, RED + f"❌ Trama binaria inválida: {e}" + RESET
+    t1 = time.perf_counter()
+    if counters is not None:
+        counters.observe("parse", t1 - t0)
+    if err:
+        return None, None, err
+    res = decode_payload(payload)
+    if counters is not None:
+        counters.observe("decode", time.perf_counter() - t1)
+    return payload, res, None
+
+async def read_message_async(reader: asyncio.StreamReader, marks: Optional[list] = None
+                             ) -> Optional[Tuple[str, Any]]:
+    """Versión asyncio de LineReader.read_message (el StreamReader usa limit=STREAM_CHUNK).
+
+    Si se pasa 'marks', se le agrega el instante en que llegó el primer byte."""
+    try:
+        first = await reader.readexactly(1)
+    except asyncio.IncompleteReadError:
+        return None
+    if marks is not None:
+        marks.append(time.perf_counter())
+    if wire.is_binary(first[0]):
+        head = first + await reader.readexactly(wire.HEADER.size - 1)
+        st = FrameStream.from_header(head)
+        if st is None:
+            return "bin", head + await reader.readexactly(wire.payload_len(head))
+        left = wire.frame_nbits(head)
+        while left > 0:
+            chunk = await reader.readexactly(min(STREAM_CHUNK, (left + 7) // 8))
+            n = min(left, len(chunk) * 8)
+            st.feed_bits(chunk, n)
+            left -= n
+        return "stream", st
+    if first == b"\n":
+        return "json", first
+    # la línea llega por trozos de hasta STREAM_CHUNK; ninguno pasa del '\n'
+    buf = bytearray(first)
+    st = None
+    while True:
+        try:
+            chunk = await reader.readuntil(b"\n")
+            end = True
+        except asyncio.LimitOverrunError as e:
+            chunk = await reader.readexactly(e.consumed)
+            end = False
+        except asyncio.IncompleteReadError as e:
+            chunk = e.partial
+            end = True
+        if st is not None:
+            st.feed_text(chunk.rstrip(b"\n") if end else chunk)
+            if end:
+                return "stream", st
+            continue
+        buf += chunk
+        if end:
+            return "json", bytes(buf)
+        if len(buf) > MAX_LINE:
+            raise ValueError(f"línea de más de {MAX_LINE} bytes")
+        if len(buf) > STREAM_MIN:
+            st = FrameStream.from_json_head(bytes(buf))
+            if st is not None:
+                buf = None
 
-def serve(host: str, port: int) -> None:
-    print(BOLD + CYAN + "=====================================" + RESET)
-    print(BOLD + CYAN + " RECEPTOR por CAPAS (CRC32 / HAMMING)" + RESET)
-    print(BOLD + CYAN + "=====================================" + RESET)
-    print(GRAY + f"Servidor RECEPTOR escuchando en {host}:{port}" + RESET)
+def print_banner(out: Output, host: str, port: int) -> None:
+    out.banner(BOLD + CYAN + "=====================================" + RESET + "\n"
+               + BOLD + CYAN + " RECEPTOR por CAPAS (CRC32 / HAMMING)" + RESET + "\n"
+               + BOLD + CYAN + "=====================================" + RESET)
+    out.banner(GRAY + f"Servidor RECEPTOR escuchando en {host}:{port}" + RESET)
+    if out.metrics_url:
+        out.banner(GRAY + f"Métricas en {out.metrics_url}" + RESET)
+    if out.advise is not None:
+        out.banner(GRAY + "Consejo de codec en el ack activado (--advise)" + RESET)
+    if out.capture is not None:
+        out.banner(GRAY + f"Capturando tramas en {out.capture.path}" + RESET)
+
+# ========== Servidor simple (una conexión a la vez) ==========
+def serve(host: str, port: int, out: Output, reuse_port: bool = False) -> None:
+    print_banner(out, host, port)
 
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         s.bind((host, port))
         s.listen(5)
         while True:
             conn, addr = s.accept()
             with conn:
-                print(YELLOW + f"\n↘ Conexión de {addr[0]}:{addr[1]}" + RESET)
-                line = recv_line(conn)
-                if not line:
-                    print(RED + "❌ Conexión vacía o cerrada sin datos." + RESET)
-                    continue
-                # intenta parsear JSON
+                out.counters.connections.inc()
+                out.note(YELLOW + f"\n↘ Conexión de {addr[0]}:{addr[1]}" + RESET)
+                reader = LineReader(conn)
+                advisor = out.advisor()
+                cid = out.capture.connection() if out.capture else 0
+                frames = 0
+                while True:
+                    try:
+                        msg = reader.read_message()
+                    except (ValueError, OSError) as e:
+                        out.note(RED + f"❌ Conexión interrumpida: {e}" + RESET)
+                        break
+                    if msg is None:
+                        break
+                    out.counters.observe("receive", time.perf_counter() - reader.started)
+                    kind, obj = msg
+                    if kind == "json" and not obj.strip():
+                        continue
+                    out.record(cid, kind, obj)
+                    payload, res, err = decode_message(kind, obj, out.counters)
+                    advice = advice_for(out.advisor_for(payload, advisor), res)
+                    if err:
+                        ack = make_ack(frames, None, None, "bad_frame" if kind == "bin" else "bad_json")
+                    else:
+                        ack = make_ack(frames, payload, res, extra=ack_extra(out, payload, res, advice))
+                    out.frame(addr, frames, payload, res, err, announce=False)
+                    if advice is not None:
+                        out.advised(addr, advice)
+                    frames += 1
+                    try:
+                        conn.sendall(ack)
+                    except OSError:
+                        pass  # el emisor ya cerró (p.ej. sender.cpp no espera el ack)
+                if frames == 0:
+                    out.note(RED + "❌ Conexión vacía o cerrada sin datos." + RESET)
+                out.counters.connections.inc(-1)
+
+# ========== Servidor asyncio (conexiones concurrentes) ==========
+async def handle_conn_async(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                            slots: asyncio.Semaphore, read_timeout: float, out: Output) -> None:
+    addr = writer.get_extra_info("peername") or ("?", 0)
+    advisor = out.advisor()
+    cid = out.capture.connection() if out.capture else 0
+    frames = 0
+    out.counters.connections.inc()
+    try:
+        async with slots:
+            while True:
+                # timeout por trama: una conexión persistente ociosa se cierra
+                marks = []
                 try:
-                    payload = json.loads(line)
-                except Exception as e:
-                    print(RED + f"❌ JSON inválido: {e}" + RESET)
-                    print(GRAY + f"Contenido recibido (trunc): {line[:200]}..." + RESET)
+                    msg = await asyncio.wait_for(read_message_async(reader, marks), read_timeout)
+                except asyncio.TimeoutError:
+                    if frames == 0:
+                        out.note(RED + f"\n❌ {addr[0]}:{addr[1]} sin datos tras {read_timeout:.0f}s; se cierra." + RESET)
+                    return
+                except asyncio.IncompleteReadError:
+                    out.note(RED + f"\n❌ {addr[0]}:{addr[1]} cerró a mitad de una trama binaria." + RESET)
+                    return
+                except ValueError as e:
+                    out.note(RED + f"\n❌ {addr[0]}:{addr[1]}: {e}" + RESET)
+                    return
+                if msg is None:
+                    break
+                out.counters.observe("receive", time.perf_counter() - marks[0])
+                kind, obj = msg
+                if kind == "json" and not obj.strip():
                     continue
-                handle_payload(payload)
+                out.record(cid, kind, obj)
+                payload, res, err = decode_message(kind, obj, out.counters)
+                advice = advice_for(out.advisor_for(payload, advisor), res)
+                if err:
+                    ack = make_ack(frames, None, None, "bad_frame" if kind == "bin" else "bad_json")
+                else:
+                    ack = make_ack(frames, payload, res, extra=ack_extra(out, payload, res, advice))
+                # una sola salida por trama: las de conexiones concurrentes no se mezclan
+                out.frame(addr, frames, payload, res, err)
+                if advice is not None:
+                    out.advised(addr, advice)
+                frames += 1
+                try:
+                    writer.write(ack)
+                    await writer.drain()
+                except ConnectionError:
+                    pass  # el emisor ya cerró (p.ej. sender.cpp no espera el ack)
+            if frames == 0:
+                out.note(YELLOW + f"\n↘ Conexión de {addr[0]}:{addr[1]}" + RESET + "\n"
+                         + RED + "❌ Conexión vacía o cerrada sin datos." + RESET)
+    except Exception as e:
+        out.note(RED + f"\n❌ Error procesando {addr[0]}:{addr[1]}: {e!r}" + RESET)
+    finally:
+        out.counters.connections.inc(-1)
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except Exception:
+            pass
+
+async def serve_async(host: str, port: int, out: Output, max_conns: int = 64,
+                      read_timeout: float = 30.0, grace: float = 5.0, reuse_port: bool = False) -> None:
+    print_banner(out, host, port)
+    out.banner(GRAY + f"(asyncio) máx. conexiones simultáneas={max_conns}, timeout lectura={read_timeout}s" + RESET)
+    slots = asyncio.Semaphore(max_conns)
+    tasks = set()
+
+    def on_conn(reader, writer):
+        t = asyncio.ensure_future(handle_conn_async(reader, writer, slots, read_timeout, out))
+        tasks.add(t)
+        t.add_done_callback(tasks.discard)
+
+    server = await asyncio.start_server(on_conn, host, port, limit=STREAM_CHUNK, reuse_address=True,
+                                        reuse_port=reuse_port)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C llega como KeyboardInterrupt
+
+    try:
+        await stop.wait()
+    finally:
+        # cierre ordenado: no aceptar más y dar 'grace' segundos a las conexiones en curso
+        server.close()
+        await server.wait_closed()
+        if tasks:
+            out.note(GRAY + f"\nCerrando: esperando {len(tasks)} conexión(es) en curso..." + RESET)
+            _done, pending = await asyncio.wait(tasks, timeout=grace)
+            for t in pending:
+                t.cancel()
+        out.note(GRAY + "Receptor detenido." + RESET)
+
+# ========== Varios procesos (--workers) ==========
+# N procesos hijos escuchan en el mismo puerto con SO_REUSEPORT y el kernel
+# reparte las conexiones entre ellos (por conexión, no por trama). Cada uno
+# decodifica con sus propios contadores y cada REPORT_EVERY segundos manda
+# un snapshot al proceso principal, que los suma (Registry.merge) en un
+# Counters propio: de ahí salen el resumen periódico, /metrics y los totales.
+# El estado ARQ y el consejo de codec quedan por proceso.
+REPORT_EVERY = 0.5  # s
+WORKER_GRACE = 8.0  # s para que los hijos cierren y manden sus últimos contadores
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+def run_server(args, out: Output, reuse_port: bool = False) -> None:
+    if args.server == "simple":
+        serve(args.host, args.port, out, reuse_port)
+    else:
+        asyncio.run(serve_async(args.host, args.port, out, args.max_conns, args.timeout, reuse_port=reuse_port))
+
+def worker_main(index: int, args, advise, q) -> None:
+    signal.signal(signal.SIGTERM, _interrupt)  # el servidor simple cierra como con Ctrl+C
+    out = Output(args.output, advise=advise, arq_window=args.arq_window, worker=index, capture_path=args.capture)
+    report = lambda _s: q.put((index, out.counters.registry.snapshot()))
+    periodic = metrics.Periodic(REPORT_EVERY, report)
+    failed = False
+    try:
+        run_server(args, out, reuse_port=True)
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(RED + f"❌ worker {index}: {e}" + RESET, file=sys.stderr)
+        failed = True
+    finally:
+        periodic.stop()
+        out.close()
+        report(0.0)
+    if failed:
+        sys.exit(1)
+
+def serve_workers(args, advise) -> None:
+    # fork antes de crear hilos (escritor, métricas) en el proceso principal
+    ctx = multiprocessing.get_context("fork")
+    q = ctx.Queue()
+    procs = [ctx.Process(target=worker_main, args=(i, args, advise, q), name=f"receiver-worker-{i}")
+             for i in range(args.workers)]
+    for p in procs:
+        p.start()
+    signal.signal(signal.SIGTERM, _interrupt)
+    out = Output(args.output, stats_every=args.stats_every, advise=advise)
+    latest = {}
+    frames = lambda i: int(sum(latest.get(i, {}).get("receiver_frames_total", {}).values()))
+    out.stats_extra = lambda: {"per_worker": "/".join(str(frames(i)) for i in range(args.workers))}
+    out.counters.registry.gauge("receiver_workers", "Procesos receptores vivos (--workers)"
+                                ).set_function(lambda: sum(p.is_alive() for p in procs))
+    if args.metrics_port:
+        out.serve_metrics(args.metrics_host, args.metrics_port)
+    print_banner(out, args.host, args.port)
+    out.banner(GRAY + f"{args.workers} procesos con SO_REUSEPORT (pid "
+               + ", ".join(str(p.pid) for p in procs) + ")" + RESET)
+    if args.capture:
+        out.banner(GRAY + f"Capturando tramas en {args.capture} (todos los procesos)" + RESET)
+
+    def collect(timeout: float) -> bool:
+        try:
+            index, snap = q.get(timeout=timeout)
+        except queue.Empty:
+            return False
+        latest[index] = snap
+        out.counters.registry.merge(latest.values())
+        return True
+
+    try:
+        while any(p.is_alive() for p in procs):
+            collect(REPORT_EVERY)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()  # SIGTERM: cierre ordenado
+        deadline = time.monotonic() + WORKER_GRACE
+        while any(p.is_alive() for p in procs) and time.monotonic() < deadline:
+            collect(0.1)
+        while collect(0.2):
+            pass
+        for p in procs:
+            if p.is_alive():
+                p.kill()
+            p.join()
+        out.close()
+    if all(p.exitcode for p in procs):
+        sys.exit(1)  # ningún proceso pudo escuchar (p.ej. puerto ocupado)
 
 def main():
     parser = argparse.ArgumentParser(description="Receiver (server) CRC32/Hamming")
     parser.add_argument("--host", default="0.0.0.0", help="Host de escucha (default 0.0.0.0)")
     parser.add_argument("--port", type=int, default=50007, help="Puerto de escucha (default 50007)")
+    parser.add_argument("--server", choices=["async", "simple"], default="async",
+                        help="async: conexiones concurrentes (default); simple: una conexión a la vez")
+    parser.add_argument("--max-conns", type=int, default=64, help="conexiones atendidas a la vez (async)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="procesos que escuchan en el mismo puerto (SO_REUSEPORT); 1 = un solo proceso (default)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="timeout de lectura por conexión en s (async)")
+    parser.add_argument("--output", choices=sorted(RENDERERS), default="pretty",
+                        help="pretty: consola con colores (default); json: una línea JSON por trama; quiet: solo contadores")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="puerto del endpoint HTTP /metrics (Prometheus); 0 = desactivado (default)")
+    parser.add_argument("--metrics-host", default="127.0.0.1", help="host del endpoint de métricas (default 127.0.0.1)")
+    parser.add_argument("--stats-every", type=float, default=0.0,
+                        help="segundos entre líneas de resumen (tramas/s, bits/s, latencias); 0 = sin resumen")
+    parser.add_argument("--advise", action="store_true",
+                        help="estimar la BER por emisor (sid de la trama o, sin sid, la conexión) y aconsejar "
+                             "en el ack el algoritmo/k de mayor goodput; sin sid, por el pool del proxy "
+                             "se mezclan los emisores que comparten conexión")
+    parser.add_argument("--advise-window", type=int, default=64, help="tramas en la ventana de estimación (--advise)")
+    parser.add_argument("--advise-table", default=None,
+                        help="tabla de 'simulator.py goodput' (JSON); sin ella se usa la fórmula cerrada")
+    parser.add_argument("--advise-klist", default=",".join(map(str, goodput.DEFAULT_KLIST)),
+                        help="valores k candidatos sin tabla (default %(default)s)")
+    parser.add_argument("--capture", default=None,
+                        help="agregar cada trama recibida a esta captura binaria (ver part2/tools/replay.py)")
+    parser.add_argument("--arq-window", type=int, default=1024,
+                        help="ventana de recepción por sesión ARQ (tramas con sid y seq)")
     args = parser.parse_args()
-    serve(args.host, args.port)
+    advise = None
+    if args.advise:
+        try:
+            table = goodput.load_table(args.advise_table) if args.advise_table else None
+            klist = tuple(int(k) for k in args.advise_klist.split(",") if k.strip())
+            if any(parse_k(k) is None for k in klist):
+                raise ValueError(f"los k deben estar entre 1 y {K_LIMIT}")
+        except (OSError, ValueError) as e:
+            print(RED + f"❌ --advise: {e}" + RESET); sys.exit(1)
+        advise = lambda: goodput.LiveAdvisor(args.advise_window, table=table, klist=klist)
+    if args.capture:
+        try:
+            capture.create(args.capture, "receiver")  # antes de crear los procesos
+        except (OSError, ValueError) as e:
+            print(RED + f"❌ --capture: {e}" + RESET); sys.exit(1)
+    if args.workers > 1:
+        if not hasattr(socket, "SO_REUSEPORT") or "fork" not in multiprocessing.get_all_start_methods():
+            print(RED + "❌ --workers necesita SO_REUSEPORT y fork (Linux/BSD/macOS)." + RESET); sys.exit(1)
+        serve_workers(args, advise)
+        return
+    out = Output(args.output, stats_every=args.stats_every, advise=advise, arq_window=args.arq_window,
+                 capture_path=args.capture)
+    if args.metrics_port:
+        out.serve_metrics(args.metrics_host, args.metrics_port)
+    try:
+        run_server(args, out)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        out.close()
 
 if __name__ == "__main__":
     main()
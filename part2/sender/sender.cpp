@@ -90,6 +90,28 @@ static string apply_noise(const string& bits, double p){
     return out;
 }
 
+// ---------- Formato binario (ver common/wire.py) ----------
+static void put_be(string& out, uint64_t v, int nbytes){
+    for(int i=nbytes-1;i>=0;--i) out.push_back(char((v>>(8*i))&0xFFu));
+}
+static string binary_frame(int alg, int k, size_t msg_len, double p, const string& bits){
+    // cabecera: magic, version, algo, flags, k, msglen, seq, p, ber, nbits
+    string out;
+    out.push_back(char(0xB1)); out.push_back(char(1));
+    out.push_back(char(alg==1?0:1));
+    out.push_back(char(4 | (alg==2?1:0)));  // flags: P y, en Hamming, K
+    put_be(out, (uint64_t)k, 2);
+    put_be(out, (uint64_t)msg_len, 4);
+    put_be(out, 0, 4);
+    uint64_t pbits; memcpy(&pbits, &p, sizeof(pbits));
+    put_be(out, pbits, 8);
+    put_be(out, 0, 8);
+    put_be(out, (uint64_t)bits.size(), 4);
+    string packed((bits.size()+7)/8, '\0');
+    for(size_t i=0;i<bits.size();++i) if(bits[i]=='1') packed[i>>3] |= char(0x80 >> (i&7));
+    return out + packed;
+}
+
 // ---------- Sockets ----------
 static bool send_line(const string& host, int port, const string& line){
     int sock = socket(AF_INET, SOCK_STREAM, 0);
@@ -104,7 +126,10 @@ static bool send_line(const string& host, int port, const string& line){
 }
 
 // ---------- main ----------
-int main(){
+int main(int argc, char** argv){
+    // --bin: enviar la trama en formato binario en vez de JSON
+    bool bin_mode=false;
+    for(int i=1;i<argc;++i) if(string(argv[i])=="--bin") bin_mode=true;
 
     ios::sync_with_stdio(false);
     cin.tie(nullptr);
@@ -175,13 +200,19 @@ int main(){
     cout<<BOLD<<"Trama sin ruido: "<<RESET<<group_every(frame_bits,8)<<"\n";
     cout<<BOLD<<"Trama con ruido: "<<RESET<<group_every(noisy,8)<<"\n";
     cout<<BOLD<<"Destino socket:  "<<RESET<<host<<":"<<port<<"\n";
-    cout<<CYAN<<"--------------------------------------------\n"<<RESET;
 
-    ostringstream oss;
-    oss<<"{\"msg_ascii_len\":"<<msg.size()
-       <<",\"algo\":\""<<(alg==1?"CRC32":"HAMMING")<<"\""
-       <<",\"frame_bits\":\""<<noisy<<"\"}\n";
-    string line=oss.str();
+    string line;
+    if(bin_mode){
+        line = binary_frame(alg, k, msg.size(), p, noisy);
+    }else{
+        ostringstream oss;
+        oss<<"{\"msg_ascii_len\":"<<msg.size()
+           <<",\"algo\":\""<<(alg==1?"CRC32":"HAMMING")<<"\""
+           <<",\"frame_bits\":\""<<noisy<<"\"}\n";
+        line=oss.str();
+    }
+    cout<<BOLD<<"Formato:         "<<RESET<<(bin_mode?"binario":"JSON")<<" ("<<line.size()<<" bytes)\n";
+    cout<<CYAN<<"--------------------------------------------\n"<<RESET;
 
     bool ok = send_line(host, port, line);
     if(ok) cout<<GREEN<<"✅ Trama enviada por socket.\n"<<RESET;
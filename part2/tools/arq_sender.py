@@ -0,0 +1,141 @@
+# ===== Emisor con repetición selectiva (ARQ) =====
+# Envía 'count' mensajes de m bits como tramas JSON con "sid" y "seq" por una
+# conexión (directo al receptor o a través del proxy) y reenvía según los
+# acks: cum/sack confirman, nak pide reenvío inmediato y cada trama tiene su
+# temporizador (common.arq). Con --follow-advice adopta el codec que aconseja
+# el receptor (--advise); los reenvíos usan el codec vigente en ese momento.
+#
+# Solo formato JSON: la cabecera binaria (common.wire) no tiene lugar para sid.
+import argparse, asyncio, json, os, sys, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(HERE, "..", "..")))
+sys.path.insert(0, HERE)
+from common import arq
+from common.bitvec import BitVec
+import simulator as sim
+
+RESET="\033[0m"; BOLD="\033[1m"; GREEN="\033[32m"; RED="\033[31m"; CYAN="\033[36m"; YELLOW="\033[33m"; GRAY="\033[90m"
+
+def frame_line(sid: str, seq: int, bits: BitVec, algo: str, k: int):
+    """Línea JSON de la trama y su largo en bits de canal."""
+    payload = {"sid": sid, "seq": seq, "msg_ascii_len": len(bits) // 8, "algo": algo}
+    if algo == "CRC32":
+        frame = bits + sim.bin32(sim.crc32_bits(bits))
+    else:
+        frame, _pad, _r = sim.ham_enc_stream(bits, k)
+        payload["k"] = k
+    payload["frame_bits"] = frame.to_str()
+    return (json.dumps(payload) + "\n").encode(), len(frame)
+
+async def send_all(host: str, port: int, count: int, m: int, algo: str, k: int, window: int,
+                   rto: float, max_tries: int, follow: bool) -> dict:
+    reader, writer = await asyncio.open_connection(host, port)
+    sid = os.urandom(6).hex()
+    snd = arq.SelectiveRepeatSender(count, window, max_tries, arq.RttEstimator(rto))
+    cfg = {"algo": algo, "k": k}
+    data = {}  # seq -> bits del mensaje (el mismo en cada reenvío)
+    stats = {"sid": sid, "channel_bits": 0, "closed": False}
+
+    def send(seq: int):
+        if seq not in data:
+            data[seq] = sim.rand_bits(m)
+        line, nbits = frame_line(sid, seq, data[seq], cfg["algo"], cfg["k"])
+        writer.write(line)
+        stats["channel_bits"] += nbits
+        snd.sent(seq, time.perf_counter())
+
+    start = time.perf_counter()
+    while not snd.done:
+        while snd.can_send():
+            send(snd.take())
+        await writer.drain()
+        deadline = snd.next_deadline()
+        timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+        try:
+            line = await asyncio.wait_for(reader.readline(), timeout)
+        except asyncio.TimeoutError:
+            line = None
+        now = time.perf_counter()
+        if line == b"":
+            stats["closed"] = True
+            break
+        if line:
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            if msg.get("sid", sid) != sid:
+                continue
+            for seq in snd.ack(msg, now):
+                send(seq)
+            advice = msg.get("advice")
+            if follow and advice and (advice["algo"], advice.get("k", 0)) != (cfg["algo"], cfg["k"]):
+                cfg.update(algo=advice["algo"], k=int(advice.get("k", 0)))
+                name = "CRC32" if cfg["algo"] == "CRC32" else f"HAMMING k={cfg['k']}"
+                print(CYAN + f"💡 BER≈{advice['ber']:g}: se cambia a {name}" + RESET)
+        for seq in snd.expired(now):
+            send(seq)
+        for seq in [s for s in data if s not in snd.pending]:
+            del data[seq]
+    elapsed = time.perf_counter() - start
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except (ConnectionError, OSError):
+        pass
+    delivered = len(snd.acked)
+    stats.update(elapsed=elapsed, delivered=delivered, lost=len(snd.lost), unresolved=count - delivered - len(snd.lost),
+                 transmissions=snd.transmissions, retransmissions=dict(snd.retransmissions),
+                 srtt=snd.rtt.srtt, rto=snd.rtt.rto,
+                 goodput_bps=delivered * m / elapsed if elapsed > 0 else 0.0,
+                 efficiency=delivered * m / stats["channel_bits"] if stats["channel_bits"] else 0.0)
+    return stats
+
+def print_report(s: dict, m: int) -> None:
+    print(BOLD + "\n========== RESUMEN ARQ ==========" + RESET)
+    if s["closed"]:
+        print(RED + "❌ La conexión se cerró antes de terminar." + RESET)
+    col = GREEN if not s["lost"] and not s["unresolved"] else YELLOW
+    print(col + f"Entregadas: {s['delivered']}  perdidas: {s['lost']}  sin resolver: {s['unresolved']}" + RESET)
+    rt = s["retransmissions"]
+    print(f"Transmisiones: {s['transmissions']}  (reenvíos: {rt['timeout']} por timeout, {rt['nak']} por nak)")
+    srtt = "-" if s["srtt"] is None else f"{s['srtt'] * 1e3:.2f} ms"
+    print(f"Tiempo: {s['elapsed']:.3f} s  srtt={srtt}  rto={s['rto'] * 1e3:.1f} ms")
+    print(f"Goodput: {s['goodput_bps'] / 1e3:.1f} kbit/s de datos  "
+          f"eficiencia={s['efficiency']:.3f} (bits de datos entregados / bits de trama enviados)")
+    print(GRAY + f"sid={s['sid']}, m={m} bits por mensaje" + RESET)
+
+def main():
+    ap = argparse.ArgumentParser(description="Emisor con repetición selectiva (tramas JSON con sid/seq)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=50006, help="proxy (o el receptor directo)")
+    ap.add_argument("--count", type=int, default=200, help="mensajes a entregar")
+    ap.add_argument("--msg-bytes", type=int, default=32)
+    ap.add_argument("--algo", choices=["CRC32", "HAMMING"], default="CRC32")
+    ap.add_argument("--k", type=int, default=11, help="bits de datos por bloque Hamming")
+    ap.add_argument("--window", type=int, default=32, help="tramas sin confirmar como máximo")
+    ap.add_argument("--rto", type=float, default=0.5, help="timeout inicial (s); luego se ajusta con el RTT")
+    ap.add_argument("--max-tries", type=int, default=0, help="intentos por trama antes de darla por perdida (0 = sin tope)")
+    ap.add_argument("--follow-advice", action="store_true", help="usar el codec que aconseja el receptor (--advise)")
+    ap.add_argument("--json", action="store_true", help="imprimir el resumen como JSON")
+    args = ap.parse_args()
+    if args.count < 0 or args.msg_bytes < 1 or args.window < 1 or args.rto <= 0:
+        print(RED + "Parámetros inválidos." + RESET); sys.exit(1)
+    m = args.msg_bytes * 8
+    k = args.k if args.algo == "HAMMING" else 0
+    try:
+        stats = asyncio.run(send_all(args.host, args.port, args.count, m, args.algo, k, args.window,
+                                     args.rto, args.max_tries, args.follow_advice))
+    except (ConnectionError, OSError) as e:
+        print(RED + f"❌ No se pudo conectar a {args.host}:{args.port}: {e}" + RESET); sys.exit(1)
+    except KeyboardInterrupt:
+        return
+    if args.json:
+        print(json.dumps(stats))
+    else:
+        print_report(stats, m)
+    sys.exit(0 if not stats["closed"] and not stats["lost"] else 2)
+
+if __name__ == "__main__":
+    main()
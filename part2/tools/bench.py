@@ -0,0 +1,287 @@
+# ===== Benchmarks: codecs, ruido, lectura de líneas y extremo a extremo =====
+# Mide el costo por megabit de cada pieza del camino de una trama (CRC32,
+# Hamming codificar/decodificar para varios k, ruido, lectura del socket) y el
+# throughput/latencia de emisores -> proxy -> receptor por loopback. Guarda
+# todo en JSON para comparar corridas entre commits (--compare).
+import argparse, asyncio, json, os, platform, socket, subprocess, sys, threading, time
+from collections import Counter, deque
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, "..", ".."))
+RECEIVER = os.path.join(ROOT, "part2", "receiver", "receiver.py")
+SIMULATOR = os.path.join(HERE, "simulator.py")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(RECEIVER))
+from common.bitvec import BitVec
+from common.crc32 import CRC32Check
+from common.hamming import StreamDecoder
+from common.noise import add_noise
+from common import wire
+import receiver
+import simulator as sim
+
+RESET="\033[0m"; BOLD="\033[1m"; GREEN="\033[32m"; RED="\033[31m"; CYAN="\033[36m"; YELLOW="\033[33m"; GRAY="\033[90m"
+
+# ===== Medición =====
+def best_time(fn, min_time=0.2, repeat=3) -> float:
+    """Mejor tiempo por llamada (s): se calibra cuántas llamadas hacen falta y se toma la mejor ronda."""
+    n = 1
+    while True:
+        t = time.perf_counter()
+        for _ in range(n): fn()
+        dt = time.perf_counter() - t
+        if dt >= min_time / repeat: break
+        n *= 2
+    best = dt / n
+    for _ in range(repeat - 1):
+        t = time.perf_counter()
+        for _ in range(n): fn()
+        best = min(best, (time.perf_counter() - t) / n)
+    return best
+
+def entry(bench: str, nbits: int, sec: float, **params) -> dict:
+    mbit = nbits / 1e6
+    return {"bench": bench, **params, "bits": nbits, "sec_per_call": sec,
+            "ms_per_mbit": sec * 1e3 / mbit, "mbit_s": mbit / sec}
+
+# ===== Codecs y ruido =====
+def chunks_of(data: bytes, nbits: int, size: int = 1 << 16):
+    out = []
+    for i in range(0, len(data), size):
+        out.append((data[i:i + size], min(size * 8, nbits - i * 8)))
+    return out
+
+def bench_codecs(sizes, klist, ps, min_time=0.2, repeat=3):
+    rows = []
+    for m in sizes:
+        bits = sim.rand_bits(m)
+        frame = bits + sim.bin32(sim.crc32_bits(bits))
+        rows.append(entry("crc32_bits", m, best_time(lambda: sim.crc32_bits(bits), min_time, repeat)))
+        parts = chunks_of(frame.to_bytes(), len(frame))
+        def crc_stream():
+            chk = CRC32Check(m)
+            for data, n in parts: chk.update(data, n)
+            return chk.ok()
+        rows.append(entry("crc32_stream", m, best_time(crc_stream, min_time, repeat)))
+        for k in klist:
+            code, pad, _r = sim.ham_enc_stream(bits, k)
+            noisy, _ = add_noise(code, 0.001)
+            rows.append(entry("ham_enc_stream", m, best_time(lambda: sim.ham_enc_stream(bits, k), min_time, repeat), k=k))
+            rows.append(entry("ham_dec_stream", m, best_time(lambda: sim.ham_dec_stream(noisy, k, pad), min_time, repeat), k=k))
+            parts_k = chunks_of(noisy.to_bytes(), len(noisy))
+            def ham_stream():
+                dec = StreamDecoder(k)
+                for data, n in parts_k: dec.feed(data, n)
+            rows.append(entry("ham_stream_decode", m, best_time(ham_stream, min_time, repeat), k=k))
+        for p in ps:
+            rows.append(entry("add_noise", m, best_time(lambda: add_noise(frame, p), min_time, repeat), p=p))
+        rows.extend(bench_recv(frame, min_time, repeat))
+    return rows
+
+def _pump(sock: socket.socket, data: bytes, times: int):
+    try:
+        for _ in range(times): sock.sendall(data)
+    finally:
+        sock.close()
+
+def bench_recv(frame: BitVec, min_time=0.2, repeat=3):
+    """LineReader (servidor simple) leyendo tramas JSON y binarias de un socketpair."""
+    payload = {"msg_ascii_len": (len(frame) - 32) // 8, "algo": "CRC32", "frame_bits": frame.to_str()}
+    msgs = {"recv_line": (json.dumps(payload) + "\n").encode(), "recv_bin": wire.encode_frame(payload)}
+    rows = []
+    for name, data in msgs.items():
+        times = max(1, (4 << 20) // len(data))  # ~4 MiB por ronda
+        def once():
+            a, b = socket.socketpair()
+            t = threading.Thread(target=_pump, args=(a, data, times)); t.start()
+            reader = receiver.LineReader(b)
+            got = 0
+            while reader.read_message() is not None: got += 1
+            t.join(); b.close()
+            assert got == times, (got, times)
+        sec = best_time(once, min_time, repeat) / times
+        rows.append(entry(name, len(frame), sec, bytes=len(data)))
+    return rows
+
+# ===== Extremo a extremo (loopback) =====
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_port(port: int, proc: subprocess.Popen, timeout=30.0) -> None:
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if proc.poll() is not None:
+            raise RuntimeError(f"el proceso terminó al arrancar (código {proc.returncode})")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"nadie escucha en el puerto {port} tras {timeout}s")
+
+def e2e_frame(algo: str, m: int, k: int, fmt: str) -> bytes:
+    bits = sim.rand_bits(m)
+    payload = {"msg_ascii_len": m // 8, "algo": algo}
+    if algo == "CRC32":
+        frame = bits + sim.bin32(sim.crc32_bits(bits))
+    else:
+        frame, _pad, _r = sim.ham_enc_stream(bits, k)
+        payload["k"] = k
+    payload["frame_bits"] = frame.to_str()
+    return wire.encode_frame(payload) if fmt == "bin" else (json.dumps(payload) + "\n").encode()
+
+async def e2e_client(port: int, data: bytes, frames: int, window: int, lat: list, verdicts: Counter):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    sent = deque()
+    slots = asyncio.Semaphore(window)
+
+    async def acks():
+        for _ in range(frames):
+            line = await reader.readline()
+            if not line: break
+            lat.append(time.perf_counter() - sent.popleft())
+            verdicts[json.loads(line).get("verdict")] += 1
+            slots.release()
+
+    task = asyncio.ensure_future(acks())
+    for _ in range(frames):
+        await slots.acquire()
+        sent.append(time.perf_counter())
+        writer.write(data)
+        await writer.drain()
+    await task
+    writer.close()
+
+async def e2e_drive(port, data, clients, frames, window):
+    lat = []; verdicts = Counter()
+    t = time.perf_counter()
+    await asyncio.gather(*(e2e_client(port, data, frames, window, lat, verdicts) for _ in range(clients)))
+    return time.perf_counter() - t, lat, verdicts
+
+def bench_e2e(clients=8, frames=500, window=32, m=1024, algo="CRC32", k=11, fmt="json", ber=0.01, direct=False,
+              workers=1):
+    rport = free_port()
+    procs = [subprocess.Popen([sys.executable, RECEIVER, "--host", "127.0.0.1", "--port", str(rport), "--output", "quiet",
+                               "--workers", str(workers)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)]
+    try:
+        wait_port(rport, procs[0])
+        port = rport
+        if not direct:
+            port = free_port()
+            procs.append(subprocess.Popen([sys.executable, SIMULATOR, "proxy", "--listen", "127.0.0.1", "--lport", str(port),
+                                           "--dport", str(rport), "--ber", str(ber), "--pool", str(max(4, workers))],
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+            wait_port(port, procs[1])
+        data = e2e_frame(algo, m, k, fmt)
+        seconds, lat, verdicts = asyncio.run(e2e_drive(port, data, clients, frames, window))
+    finally:
+        for p in procs:
+            p.terminate()
+            try: p.wait(5)
+            except subprocess.TimeoutExpired: p.kill()
+    lat_ms = np.array(lat) * 1e3
+    return {"clients": clients, "frames": len(lat), "window": window, "bits": m, "algo": algo,
+            "k": k if algo == "HAMMING" else None, "format": fmt, "ber": None if direct else ber,
+            "via_proxy": not direct, "workers": workers, "seconds": seconds, "frames_s": len(lat) / seconds,
+            "p50_ms": float(np.percentile(lat_ms, 50)) if len(lat) else None,
+            "p99_ms": float(np.percentile(lat_ms, 99)) if len(lat) else None,
+            "verdicts": dict(verdicts)}
+
+# ===== Reporte =====
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+def row_key(r: dict) -> tuple:
+    return (r["bench"], r["bits"], r.get("k"), r.get("p"))
+
+def print_rows(rows, base=None):
+    old = {row_key(r): r for r in (base or {}).get("codecs", [])}
+    print(BOLD + f"{'bench':<18}{'bits':>9}{'k/p':>8}{'ms/Mbit':>12}{'Mbit/s':>10}" + ("   vs base" if old else "") + RESET)
+    for r in rows:
+        kp = r.get("k", r.get("p", ""))
+        line = f"{r['bench']:<18}{r['bits']:>9}{str(kp):>8}{r['ms_per_mbit']:>12.3f}{r['mbit_s']:>10.1f}"
+        b = old.get(row_key(r))
+        if b:
+            ratio = r["mbit_s"] / b["mbit_s"]
+            line += (GREEN if ratio >= 1.05 else RED if ratio <= 0.95 else GRAY) + f"   x{ratio:.2f}" + RESET
+        print(line)
+
+def print_e2e(e, base=None):
+    print(BOLD + "\nExtremo a extremo" + RESET + GRAY + (" (emisores → proxy → receptor)" if e["via_proxy"] else " (emisores → receptor)") + RESET)
+    print(f"{e['clients']} clientes x {e['frames'] // max(1, e['clients'])} tramas {e['algo']} de {e['bits']} bits ({e['format']}), ventana {e['window']}"
+          + (f", receptor con {e['workers']} procesos" if e.get("workers", 1) > 1 else ""))
+    ms = lambda v: "n/a" if v is None else f"{v:.2f} ms"  # sin acks no hay latencias
+    line = f"{e['frames_s']:.0f} tramas/s, latencia p50 {ms(e['p50_ms'])}, p99 {ms(e['p99_ms'])}, veredictos {e['verdicts']}"
+    b = (base or {}).get("e2e")
+    if b and b.get("frames_s"):
+        same = all(b.get(key, 1 if key == "workers" else None) == e[key]
+                   for key in ("clients", "window", "bits", "algo", "format", "via_proxy", "workers"))
+        line += GRAY + f"  (base: {b['frames_s']:.0f} tramas/s, x{e['frames_s'] / b['frames_s']:.2f}"
+        line += ")" if same else ", otra configuración)"
+        line += RESET
+    print(line)
+
+def parse_ints(text): return [int(x) for x in text.split(",") if x.strip()]
+def parse_floats(text): return [float(x) for x in text.split(",") if x.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de codecs, ruido y throughput extremo a extremo")
+    parser.add_argument("--only", choices=["codecs", "e2e"], help="correr solo una parte")
+    parser.add_argument("--quick", action="store_true", help="corrida corta (tamaños y tiempos reducidos)")
+    parser.add_argument("--sizes", default="1024,65536,1048576", help="bits de datos por trama (codecs)")
+    parser.add_argument("--klist", default="4,8,11,26", help="valores k de Hamming")
+    parser.add_argument("--ps", default="0.001,0.01", help="BER para add_noise")
+    parser.add_argument("--min-time", type=float, default=0.3, help="segundos mínimos por medición")
+    parser.add_argument("--clients", type=int, default=8, help="emisores concurrentes (e2e)")
+    parser.add_argument("--frames", type=int, default=500, help="tramas por emisor (e2e)")
+    parser.add_argument("--window", type=int, default=32, help="tramas sin ack por emisor (e2e)")
+    parser.add_argument("--e2e-bits", type=int, default=1024, help="bits de datos por trama (e2e)")
+    parser.add_argument("--algo", choices=["CRC32", "HAMMING"], default="CRC32", help="algoritmo de las tramas (e2e)")
+    parser.add_argument("--k", type=int, default=11, help="k de Hamming (e2e)")
+    parser.add_argument("--format", choices=["json", "bin"], default="json", help="formato de las tramas (e2e)")
+    parser.add_argument("--ber", type=float, default=0.01, help="BER del proxy (e2e)")
+    parser.add_argument("--direct", action="store_true", help="e2e sin proxy, directo al receptor")
+    parser.add_argument("--receiver-workers", type=int, default=1, help="--workers del receptor (e2e)")
+    parser.add_argument("--out", default="bench.json", help="archivo JSON de resultados")
+    parser.add_argument("--compare", help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+    if args.quick:
+        args.sizes = "1024,65536"; args.klist = "4,11"; args.min_time = 0.1; args.frames = min(args.frames, 100)
+
+    base = None
+    if args.compare:
+        with open(args.compare) as f: base = json.load(f)
+
+    print(BOLD + CYAN + "======================================" + RESET)
+    print(BOLD + CYAN + "  BENCHMARKS (codecs / extremo a extremo)" + RESET)
+    print(BOLD + CYAN + "======================================" + RESET)
+    result = {"meta": {"commit": git_commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "python": platform.python_version(), "numpy": np.__version__,
+                       "platform": platform.platform(), "cpus": os.cpu_count(), "args": vars(args)}}
+    if base:
+        print(GRAY + f"Comparando con {args.compare} (commit {base.get('meta', {}).get('commit')})" + RESET)
+
+    if args.only != "e2e":
+        result["codecs"] = bench_codecs(parse_ints(args.sizes), parse_ints(args.klist), parse_floats(args.ps),
+                                        args.min_time)
+        print_rows(result["codecs"], base)
+    if args.only != "codecs":
+        result["e2e"] = bench_e2e(args.clients, args.frames, args.window, args.e2e_bits, args.algo, args.k,
+                                  args.format, args.ber, args.direct, args.receiver_workers)
+        print_e2e(result["e2e"], base)
+
+    with open(args.out, "w") as f:
+        json.dump(result, f, indent=2)
+    print(GREEN + f"\nListo → {args.out}" + RESET)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# ===== Repetición de capturas =====
+# Lee una captura (common/capture.py; --capture del proxy o del receptor) con
+# mmap y vuelve a enviar sus tramas a un proxy o a un receptor:
+#   --speed X   con los tiempos originales, escalados (1 = igual, 2 = el doble de rápido)
+#   --rate N    a N tramas/s parejas
+#   --max       lo más rápido posible (hasta --window tramas sin ack por conexión)
+# Cada conexión de la captura se repite como una conexión, con sus tramas en
+# el mismo orden, y se cierra después de su última trama (y su ack). Con
+# --apply-flips las tramas de una captura del proxy salen con los flips que
+# aplicó el proxy, o sea como las recibió el receptor: sirve para repetir
+# directo contra el receptor sin sortear ruido nuevo.
+import argparse, asyncio, json, os, sys, time
+from collections import Counter, deque
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common import capture
+
+RESET="\033[0m"; BOLD="\033[1m"; GREEN="\033[32m"; RED="\033[31m"; CYAN="\033[36m"; YELLOW="\033[33m"; GRAY="\033[90m"
+
+class ReplayConn:
+    """Una conexión de la captura: escribe sus tramas en orden y lee un ack por trama."""
+
+    def __init__(self, reader, writer, window: int, lat: list, verdicts: Counter):
+        self.reader = reader
+        self.writer = writer
+        self.slots = asyncio.Semaphore(window)
+        self.sent = deque()  # (instante de envío, ocupa un lugar de la ventana) de cada trama sin ack
+        self.last = False    # ya se envió su última trama
+        self.task = asyncio.ensure_future(self._acks(lat, verdicts))
+
+    async def _acks(self, lat, verdicts):
+        try:
+            while self.sent or not self.last:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                held = False
+                if self.sent:
+                    t, held = self.sent.popleft()
+                    lat.append(time.perf_counter() - t)
+                try:
+                    verdicts[json.loads(line).get("verdict")] += 1
+                except ValueError:
+                    verdicts["?"] += 1
+                if held:
+                    self.slots.release()
+        except ConnectionError:
+            pass
+        finally:
+            self.writer.close()
+
+    def finish(self) -> None:
+        self.last = True
+        if not self.sent:
+            self.task.cancel()  # no hay acks pendientes: cerrar ya
+
+def _skip(rec: capture.Record, apply: bool) -> bool:
+    # sin bytes (en flujo) o, con --apply-flips, descartada por el proxy: el receptor no la vio
+    return bool(rec.flags & capture.FLAG_STREAMED or (apply and rec.flags & capture.FLAG_DROPPED))
+
+async def replay(cap: capture.CaptureReader, host: str, port: int, speed: float = 1.0, rate: float = 0.0,
+                 window: int = 32, apply: bool = False, repeat: int = 1, ack_timeout: float = 10.0) -> dict:
+    """speed > 0: tiempos originales / speed; rate > 0: tramas/s fijas; ambos 0: sin pausas."""
+    first = None; last_ts = None; last_index = {}
+    for i, rec in enumerate(cap.records()):
+        first = rec.ts if first is None else min(first, rec.ts)
+        last_ts = rec.ts if last_ts is None else max(last_ts, rec.ts)
+        if not _skip(rec, apply):
+            last_index[rec.conn] = i  # última trama que se envía de cada conexión
+    duration = (last_ts - first) / 1e9 if first is not None else 0.0
+    lat = []; lag = []; verdicts = Counter()
+    conns = {}
+    stalls = skipped = frames = nbytes = 0
+    t0 = time.perf_counter()
+    for rep in range(repeat):
+        offset = rep * duration * 1.001  # la siguiente vuelta empieza después de la anterior
+        for i, rec in enumerate(cap.records()):
+            if _skip(rec, apply):
+                skipped += 1
+                continue
+            if speed > 0 or rate > 0:
+                target = t0 + ((offset + (rec.ts - first) / 1e9) / speed if speed > 0 else frames / rate)
+                delay = target - time.perf_counter()
+                if delay > 0.001:
+                    await asyncio.sleep(delay)
+                lag.append(max(0.0, time.perf_counter() - target))
+            key = (rep, rec.conn)
+            conn = conns.get(key)
+            if conn is None:
+                r, w = await asyncio.open_connection(host, port, limit=1 << 26)
+                conn = conns[key] = ReplayConn(r, w, window, lat, verdicts)
+            try:
+                held = await asyncio.wait_for(conn.slots.acquire(), ack_timeout)
+            except asyncio.TimeoutError:
+                # acks que no llegan (p.ej. el proxy descarta tramas): se sigue igual, y el
+                # ack de esta trama, si llega, no devuelve un lugar que no se tomó
+                held = False
+                stalls += 1
+            data = capture.apply_flips(rec) if apply else bytes(rec.data)
+            conn.writer.write(data if rec.binary else data + b"\n")
+            conn.sent.append((time.perf_counter(), held))
+            frames += 1
+            nbytes += len(data)
+            if conn.writer.transport.get_write_buffer_size() > 1 << 20:
+                await conn.writer.drain()
+            if i == last_index[rec.conn]:
+                conn.finish()
+    sent_s = time.perf_counter() - t0
+    tasks = [c.task for c in conns.values()]
+    if tasks:
+        _done, pending = await asyncio.wait(tasks, timeout=ack_timeout)
+        for t in pending:
+            t.cancel()
+    elapsed = time.perf_counter() - t0
+    lat_ms = np.array(lat) * 1e3
+    lag_ms = np.array(lag) * 1e3
+    return {"frames": frames, "skipped": skipped, "connections": len(conns), "bytes": nbytes,
+            "seconds": elapsed, "send_seconds": sent_s, "capture_seconds": duration * repeat,
+            "frames_s": frames / elapsed if elapsed > 0 else 0.0,
+            "mbytes_s": nbytes / elapsed / 1e6 if elapsed > 0 else 0.0,
+            "acks": len(lat), "missing_acks": sum(len(c.sent) for c in conns.values()), "stalls": stalls,
+            "p50_ms": float(np.percentile(lat_ms, 50)) if len(lat) else None,
+            "p99_ms": float(np.percentile(lat_ms, 99)) if len(lat) else None,
+            "lag_p99_ms": float(np.percentile(lag_ms, 99)) if len(lag) else None,
+            "verdicts": dict(verdicts)}
+
+def print_info(path: str, s: dict) -> None:
+    print(BOLD + f"Captura {path}" + RESET + GRAY + f" (origen: {s['source']})" + RESET)
+    print(f"{s['frames']} tramas en {s['connections']} conexiones, {s['bytes'] / 1e6:.2f} MB, {s['seconds']:.3f} s")
+    print(f"binarias={s['bin']} descartadas por el proxy={s['dropped']} en flujo (sin bytes)={s['streamed']} "
+          f"flips={s['flips']}")
+
+def print_report(r: dict, mode: str) -> None:
+    print(BOLD + f"\n========== REPETICIÓN ({mode}) ==========" + RESET)
+    print(f"{r['frames']} tramas en {r['connections']} conexiones ({r['skipped']} salteadas), "
+          f"{r['seconds']:.3f} s (captura: {r['capture_seconds']:.3f} s)")
+    print(f"{r['frames_s']:.0f} tramas/s, {r['mbytes_s']:.2f} MB/s")
+    if r["acks"]:
+        print(f"latencia p50 {r['p50_ms']:.2f} ms, p99 {r['p99_ms']:.2f} ms, veredictos {r['verdicts']}")
+    if r["lag_p99_ms"] is not None:
+        print(GRAY + f"atraso respecto del horario p99: {r['lag_p99_ms']:.2f} ms" + RESET)
+    if r["missing_acks"] or r["stalls"]:
+        print(YELLOW + f"acks faltantes: {r['missing_acks']} (ventanas trabadas: {r['stalls']})" + RESET)
+
+def main():
+    ap = argparse.ArgumentParser(description="Repetir una captura de tramas contra el proxy o el receptor")
+    ap.add_argument("capture", help="archivo de --capture (proxy o receptor)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=50006, help="proxy (50006) o receptor (50007)")
+    timing = ap.add_mutually_exclusive_group()
+    timing.add_argument("--speed", type=float, default=1.0, help="tiempos originales / speed (default 1)")
+    timing.add_argument("--rate", type=float, default=0.0, help="tramas/s fijas")
+    timing.add_argument("--max", action="store_true", help="sin pausas, lo más rápido posible")
+    ap.add_argument("--window", type=int, default=32, help="tramas sin ack por conexión")
+    ap.add_argument("--apply-flips", action="store_true", help="enviar las tramas con los flips que aplicó el proxy")
+    ap.add_argument("--repeat", type=int, default=1, help="vueltas a la captura")
+    ap.add_argument("--ack-timeout", type=float, default=10.0, help="espera máxima por acks (s)")
+    ap.add_argument("--info", action="store_true", help="solo mostrar el contenido de la captura")
+    ap.add_argument("--json", action="store_true", help="imprimir el resultado como JSON")
+    args = ap.parse_args()
+    try:
+        cap = capture.CaptureReader(args.capture)
+    except (OSError, ValueError) as e:
+        print(RED + f"❌ {e}" + RESET); sys.exit(1)
+    if args.info:
+        print_info(args.capture, capture.summary(cap)); return
+    if args.window < 1 or args.repeat < 1 or args.speed <= 0 or args.rate < 0:
+        print(RED + "Parámetros inválidos." + RESET); sys.exit(1)
+    if args.max:
+        speed, rate, mode = 0.0, 0.0, "máx. velocidad"
+    elif args.rate:
+        speed, rate, mode = 0.0, args.rate, f"{args.rate:g} tramas/s"
+    else:
+        speed, rate, mode = args.speed, 0.0, f"x{args.speed:g}"
+    try:
+        result = asyncio.run(replay(cap, args.host, args.port, speed, rate, args.window, args.apply_flips,
+                                    args.repeat, args.ack_timeout))
+    except (ConnectionError, OSError) as e:
+        print(RED + f"❌ {args.host}:{args.port}: {e}" + RESET); sys.exit(1)
+    except KeyboardInterrupt:
+        return
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print_report(result, mode)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,25 @@
-import argparse, csv, random, math, json, socket, sys, time
+import argparse, asyncio, csv, random, json, os, sys, time
+from statistics import NormalDist
+
 import matplotlib.pyplot as plt
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from common.bitvec import BitVec
+from common.channels import is_bsc, make_channel
+from common.crc32 import crc32_bytes
+from common.hamming import codec_for
+from common.estimate import METHODS, estimate_points
+from common.goodput import ARQ_MODES, CostModel
+from common.montecarlo import run_points_adaptive, wilson_interval
+from common.resultcache import ResultCache, run_points_cached
+from common.noise import flip_positions
+from common import capture, goodput, metrics, wire
 
 RESET="\033[0m"; BOLD="\033[1m"; GREEN="\033[32m"; RED="\033[31m"; CYAN="\033[36m"; YELLOW="\033[33m"; GRAY="\033[90m"
 
-def group_every(s: str, n: int) -> str:
+def group_every(s, n: int) -> str:
+    s=str(s)
     if n<=0: return s
     out=[]; 
     for i,ch in enumerate(s):
@@ -12,138 +28,114 @@ def group_every(s: str, n: int) -> str:
     return "".join(out)
 
 # ===== Enlace: CRC32 =====
-def crc32_bits(bits: str) -> int:
-    crc = 0xFFFFFFFF
-    poly = 0x04C11DB7
-    for c in bits:
-        b = 1 if c=='1' else 0
-        top = (crc >> 31) & 1
-        fb  = top ^ b
-        crc = ((crc << 1) & 0xFFFFFFFF)
-        if fb: crc ^= poly
-    crc ^= 0xFFFFFFFF
-    return crc
-
-def bin32(x: int) -> str:
-    return "".join('1' if (x>>i)&1 else '0' for i in range(31,-1,-1))
+def crc32_bits(bits: BitVec) -> int:
+    return crc32_bytes(bits.to_bytes(), len(bits))
+
+def bin32(x: int) -> BitVec:
+    return BitVec.from_int(x, 32)
 
 # ===== Enlace: Hamming SEC =====
-def is_pow2(x: int) -> bool:
-    return x!=0 and (x & (x-1))==0
-
-def r_for_k(k: int) -> int:
-    r=0
-    while k + r + 1 > (1<<r): r+=1
-    return r
-
-def ham_enc_block(data: str) -> str:
-    k=len(data); r=r_for_k(k); n=k+r
-    code=[0]*(n+1)  # 1-indexed
-    j=0
-    for i in range(1,n+1):
-        if not is_pow2(i):
-            code[i]=1 if data[j]=='1' else 0; j+=1
-    for i in range(r):
-        p=1<<i; par=0
-        for kpos in range(1,n+1):
-            if kpos & p: par ^= code[kpos]
-        code[p]=par
-    return "".join('1' if x else '0' for x in code[1:])
-
-def ham_enc_stream(bits: str, k: int):
+def ham_enc_stream(bits: BitVec, k: int):
     pad=(k - (len(bits)%k))%k
-    bits = bits + "0"*pad
-    r=r_for_k(k); out=[]
-    for i in range(0,len(bits),k):
-        out.append(ham_enc_block(bits[i:i+k]))
-    return "".join(out), pad, r
-
-def ham_syndrome(code: str) -> int:
-    n=len(code); r=0
-    while (1<<r)<=n: r+=1
-    s=0
-    for i in range(r):
-        p=1<<i; par=0
-        for kpos in range(1,n+1):
-            if kpos & p: par ^= int(code[kpos-1])
-        if par==1: s |= p
-    return s
-
-def ham_dec_stream(code: str, k: int, pad: int):
-    r=r_for_k(k); n=k+r
-    corrected=0; uncorrect=0; data=[]
-    for i in range(0,len(code),n):
-        cw=list(code[i:i+n])
-        s=ham_syndrome("".join(cw))
-        if s!=0:
-            pos=s
-            if 1<=pos<=n:
-                cw[pos-1] = '0' if cw[pos-1]=='1' else '1'
-                if ham_syndrome("".join(cw))==0:
-                    corrected+=1
-                else:
-                    uncorrect+=1
-            else:
-                uncorrect+=1
-        for j in range(1,n+1):
-            if not is_pow2(j): data.append(cw[j-1])
+    codec=codec_for(k)
+    code=codec.encode((bits + BitVec.zeros(pad)).to_numpy())
+    return BitVec.from_numpy(code), pad, codec.r
+
+def ham_dec_stream(code: BitVec, k: int, pad: int):
+    codec=codec_for(k)
+    blocks=len(code)//codec.n  # un bloque incompleto al final se ignora
+    dec=codec.decode(code.to_numpy()[:blocks*codec.n])
+    data=dec.data.ravel()
     if pad: data=data[:-pad]
-    return "".join(data), corrected, uncorrect
-
-# ===== Ruido =====
-def add_noise(bits: str, p: float) -> str:
-    L=list(bits)
-    for i,ch in enumerate(L):
-        if random.random()<p: L[i]='0' if ch=='1' else '1'
-    return "".join(L)
-
-def hamming_distance(a: str, b: str) -> int:
-    n=min(len(a),len(b))
-    return sum(1 for i in range(n) if a[i]!=b[i])
+    return BitVec.from_numpy(data), int(dec.corrected.sum()), int(dec.uncorrectable.sum())
 
 # ===== Datos aleatorios =====
-def rand_bits(n: int) -> str:
+def rand_bits(n: int) -> BitVec:
     import secrets
-    return "".join('1' if (secrets.randbits(1)) else '0' for _ in range(n))
+    return BitVec.from_int(secrets.randbits(n), n) if n else BitVec()
 
 # ===== Experimentos offline =====
-def run_offline(runs: int, sizes, ps, klist):
-    rows=[]
-    print(CYAN + BOLD + "\n=== Simulación OFFLINE ===" + RESET)
+def offline_points(sizes, ps, klist):
+    # orden histórico de filas: por m, por p, CRC32 y luego cada k
     for m in sizes:
         for p in ps:
-            # CRC32
-            ok=0
-            for _ in range(runs):
-                data = rand_bits(m)
-                frame = data + bin32(crc32_bits(data))
-                noisy = add_noise(frame, p)
-                recv_data = noisy[:-32]
-                ok += (bin32(crc32_bits(recv_data)) == noisy[-32:])
-            rows.append({
-                "algo":"CRC32","k":0,"m_bits":m,"p_error":p,"runs":runs,
-                "ok_rate": ok/runs, "corrected_avg":0.0, "uncorrect_avg":0.0
-            })
-            print(f"CRC32 m={m:4d} p={p:0.4f} → ok={rows[-1]['ok_rate']:.4f}")
-
-            # HAMMING
+            yield ("CRC32", m, 0, p)
             for k in klist:
-                ok=0; corrected=0; uncorrect=0
-                for _ in range(runs):
-                    data = rand_bits(m)
-                    frame, pad, r = ham_enc_stream(data, k)
-                    noisy = add_noise(frame, p)
-                    dec, c, u = ham_dec_stream(noisy, k, pad)
-                    ok += (u==0 and dec==data)
-                    corrected += c; uncorrect += u
-                rows.append({
-                    "algo":"HAMMING","k":k,"m_bits":m,"p_error":p,"runs":runs,
-                    "ok_rate": ok/runs,
-                    "corrected_avg": corrected/runs,
-                    "uncorrect_avg": uncorrect/runs
-                })
-                print(f"HAM(k={k:2d}) m={m:4d} p={p:0.4f} → ok={rows[-1]['ok_rate']:.4f}, "
-                      f"corr_avg={rows[-1]['corrected_avg']:.3f}, uncor_avg={rows[-1]['uncorrect_avg']:.3f}")
+                yield ("HAMMING", m, k, p)
+
+def run_offline(runs: int, sizes, ps, klist, seed=None, workers: int = 1, cache_path=None,
+                adaptive=None, min_runs=1024, confidence=0.95, estimate=None, channel="bsc"):
+    # motor por lotes; los puntos se reparten en tareas entre 'workers' procesos.
+    # Con cache_path (y semilla fija) cada punto se guarda al terminar y los ya hechos se saltan.
+    # Con adaptive=semiancho, 'runs' es el tope por punto y cada punto para cuando su
+    # intervalo de confianza (Wilson) es así de angosto.
+    # 'channel' es el modelo de canal (common/channels.py); p es su BER promedio.
+    rows=[]; hits=0
+    z = NormalDist().inv_cdf(0.5 + confidence/2)
+    if estimate:
+        if not is_bsc(channel):
+            raise ValueError("--estimate supone errores independientes: solo con --channel bsc")
+        return run_estimate(runs, sizes, ps, klist, seed, workers, estimate, z)
+    cache = ResultCache(cache_path) if cache_path and seed is not None else None
+    print(CYAN + BOLD + "\n=== Simulación OFFLINE ===" + RESET)
+    if not is_bsc(channel):
+        print(GRAY + f"Canal: {make_channel(channel, 0.0).describe()} (p = BER promedio)" + RESET)
+    if cache is not None:
+        print(GRAY + f"Caché: {cache_path} ({len(cache.entries)} puntos guardados)" + RESET)
+    runner = None; spec = runs
+    if adaptive:
+        print(GRAY + f"Adaptativo: semiancho ≤ {adaptive} ({confidence:.0%}), entre {min_runs} y {runs} corridas por punto" + RESET)
+        runner = lambda pts: run_points_adaptive(pts, adaptive, runs, seed, workers, min_runs, z, channel)
+        spec = f"wilson:{adaptive!r}:{z!r}:{min_runs}:{runs}"
+    try:
+        points = list(offline_points(sizes, ps, klist))
+        for (algo, m, k, p), res, cached in run_points_cached(points, spec, seed, workers, cache, runner, channel):
+            rows.append(offline_row(algo, m, k, p, res.get("runs", runs), res, cached, z, channel))
+            hits += cached
+    finally:
+        if cache is not None: cache.close()
+    if cache is not None:
+        print(GRAY + f"{hits} de {len(rows)} puntos desde la caché" + RESET)
+    if adaptive and rows:
+        total = sum(r["runs"] for r in rows)
+        print(GRAY + f"Corridas simuladas: {total} ({total / (runs * len(rows)):.1%} de {runs} fijas por punto)" + RESET)
+    return rows
+
+def offline_row(algo, m, k, p, runs, res, cached=False, z=1.96, channel="bsc"):
+    lo, hi = wilson_interval(res["ok"], runs, z)
+    row={
+        "algo":algo,"k":k,"m_bits":m,"p_error":p,"channel":channel,"runs":runs,
+        "ok_rate": res["ok"]/runs,
+        "corrected_avg": res["corrected"]/runs,
+        "uncorrect_avg": res["uncorrect"]/runs,
+        "ok_lo": lo, "ok_hi": hi
+    }
+    tag = GRAY + " (caché)" + RESET if cached else ""
+    if algo=="CRC32":
+        print(f"CRC32 m={m:4d} p={p:0.4f} → ok={row['ok_rate']:.4f} ±{(hi-lo)/2:.4f} ({runs} corridas)" + tag)
+    else:
+        print(f"HAM(k={k:2d}) m={m:4d} p={p:0.4f} → ok={row['ok_rate']:.4f} ±{(hi-lo)/2:.4f} ({runs} corridas), "
+              f"corr_avg={row['corrected_avg']:.3f}, uncor_avg={row['uncorrect_avg']:.3f}" + tag)
+    return row
+
+def run_estimate(runs, sizes, ps, klist, seed, workers, method, z):
+    # BER muy baja: cerrado (analytic) o por estratos de w errores (is), ver common/estimate.py
+    rows=[]
+    print(CYAN + BOLD + f"\n=== Estimación OFFLINE ({method}) ===" + RESET)
+    if method == "is":
+        print(GRAY + f"{runs} tramas simuladas por estrato (cantidad de errores)" + RESET)
+    for (algo, m, k, p), est in estimate_points(list(offline_points(sizes, ps, klist)), method, runs, seed, workers, z):
+        rows.append({
+            "algo":algo,"k":k,"m_bits":m,"p_error":p,"channel":"bsc","runs":est["runs"],
+            "ok_rate": est["ok_rate"],
+            "corrected_avg": est["corrected_avg"],
+            "uncorrect_avg": est["uncorrect_avg"],
+            "ok_lo": est["ok_lo"], "ok_hi": est["ok_hi"],
+            "fail_rate": est["fail_rate"], "method": method
+        })
+        name = "CRC32    " if algo=="CRC32" else f"HAM(k={k:2d})"
+        print(f"{name} m={m:4d} p={p:.1e} → fail={est['fail_rate']:.3e} "
+              f"[{1-est['ok_hi']:.3e}, {1-est['ok_lo']:.3e}]")
     return rows
 
 def plot_rows(rows, outpng="plots.png"):
@@ -158,71 +150,397 @@ def plot_rows(rows, outpng="plots.png"):
         xs=[x["p_error"] for x in arr]
         ys=[x["ok_rate"] for x in arr]
         label = f"{algo}" + (f"(k={k})" if algo=="HAMMING" else "") + f", m={m}"
-        plt.plot(xs, ys, marker="o", label=label)
+        if all("ok_lo" in x for x in arr):
+            # barras de error: intervalo de confianza de ok_rate
+            yerr=[[y-float(x["ok_lo"]) for x,y in zip(arr,ys)], [float(x["ok_hi"])-y for x,y in zip(arr,ys)]]
+            plt.errorbar(xs, ys, yerr=yerr, marker="o", capsize=3, label=label)
+        else:
+            plt.plot(xs, ys, marker="o", label=label)
+    ps=[r["p_error"] for r in rows if r["p_error"] > 0]
+    if ps and max(ps) / min(ps) > 100:
+        plt.xscale("log")  # BER en varias décadas
     plt.xlabel("Probabilidad de error por bit")
     plt.ylabel("Tasa de recepción correcta (ok_rate)")
-    plt.title("Curvas de desempeño por tamaño (offline)")
+    channel = rows[0].get("channel", "bsc")
+    plt.title("Curvas de desempeño por tamaño (offline)" + ("" if is_bsc(channel) else f", canal {channel}"))
     plt.grid(True)
     plt.legend()
     plt.savefig(outpng, dpi=160, bbox_inches="tight")
+    if "fail_rate" in rows[0]:
+        plot_fail(groups, outpng)
+
+def plot_fail(groups, outpng):
+    # con BER muy baja ok_rate es ~1 en todas las curvas; la tasa de falla en log-log sí se ve
+    plt.figure()
+    for (algo,k,m), arr in groups.items():
+        arr = sorted((x for x in arr if x["p_error"] > 0 and x["fail_rate"] > 0), key=lambda x: x["p_error"])
+        label = f"{algo}" + (f"(k={k})" if algo=="HAMMING" else "") + f", m={m}"
+        plt.loglog([x["p_error"] for x in arr], [x["fail_rate"] for x in arr], marker="o", label=label)
+    plt.xlabel("Probabilidad de error por bit")
+    plt.ylabel("Tasa de falla (1 - ok_rate)")
+    plt.title("Tasa de falla por tamaño (estimación)")
+    plt.grid(True, which="both", alpha=0.4)
+    plt.legend()
+    base, ext = os.path.splitext(outpng)
+    plt.savefig(f"{base}_fail{ext or '.png'}", dpi=160, bbox_inches="tight")
+
+# ===== Goodput (bits útiles por bit transmitido) =====
+# Sobre las filas del barrido offline: tasa de código, goodput con su
+# intervalo (lineal en ok_rate) y la mejor configuración por (m, p), ver
+# common/goodput.py.
+def goodput_rows(rows, model: CostModel):
+    out=[]
+    for r in rows:
+        g = goodput.evaluate(r["algo"], r["m_bits"], r["k"], r["ok_rate"], model)
+        g["goodput_lo"] = goodput.evaluate(r["algo"], r["m_bits"], r["k"], r["ok_lo"], model)["goodput"]
+        g["goodput_hi"] = goodput.evaluate(r["algo"], r["m_bits"], r["k"], r["ok_hi"], model)["goodput"]
+        out.append({**r, **g})
+    return out
+
+def print_recommendations(table):
+    print(CYAN + BOLD + "\n=== Configuración recomendada (máximo goodput) ===" + RESET)
+    for e in table:
+        name = "CRC32" if e["algo"]=="CRC32" else f"HAM(k={e['k']})"
+        warn = "" if e["meets_loss"] else YELLOW + " (ninguna cumple --max-loss)" + RESET
+        print(f"m={e['m']:4d} p={e['p']:<8g} → {name:10s} goodput={e['goodput']:.4f} "
+              f"(tasa {e['rate']:.3f}, ok={e['ok_rate']:.4f})" + warn)
+
+def plot_goodput(rows, outpng):
+    sizes = sorted({r["m_bits"] for r in rows})
+    fig, axes = plt.subplots(1, len(sizes), figsize=(5*len(sizes), 4), squeeze=False, sharey=True)
+    for ax, m in zip(axes[0], sizes):
+        curves = {}
+        for r in rows:
+            if r["m_bits"] == m:
+                curves.setdefault((r["algo"], r["k"]), []).append(r)
+        for (algo,k), arr in curves.items():
+            arr = sorted(arr, key=lambda x: x["p_error"])
+            ys = [x["goodput"] for x in arr]
+            yerr = [[max(0.0, y-x["goodput_lo"]) for x,y in zip(arr,ys)], [max(0.0, x["goodput_hi"]-y) for x,y in zip(arr,ys)]]
+            ax.errorbar([x["p_error"] for x in arr], ys, yerr=yerr, marker="o", capsize=2,
+                        label="CRC32" if algo=="CRC32" else f"HAM(k={k})")
+        ps = [r["p_error"] for r in rows if r["p_error"] > 0]
+        if ps and max(ps) / min(ps) > 100:
+            ax.set_xscale("log")
+        ax.set_title(f"m={m}")
+        ax.set_xlabel("Probabilidad de error por bit")
+        ax.grid(True, alpha=0.5)
+    axes[0][0].set_ylabel("Goodput (bits útiles / bit transmitido)")
+    axes[0][-1].legend(fontsize="small")
+    fig.savefig(outpng, dpi=160, bbox_inches="tight")
 
 # ===== Proxy (canal con ruido) =====
-def proxy_once(client_sock, addr, dest_host, dest_port, ber):
+# Clientes atendidos en paralelo (asyncio). Las tramas se reenvían por un pool
+# de conexiones persistentes al receptor; colas acotadas frenan a los emisores
+# cuando el receptor va más lento. El ack de cada trama vuelve al cliente.
+# Las tramas binarias (common.wire) se modifican en el lugar, sin parsear JSON.
+# Con un modelo de canal (--channel) cada trama se sortea sola, desde el
+# estado estacionario: el estado de Gilbert–Elliott no pasa de una trama a otra.
+_CHANNEL_RNG = np.random.default_rng()
+
+def channel_flips(channel, nbits: int, bit_at) -> list:
+    """Posiciones que cambian en la trama; en un borrado solo cambian los bits en 1."""
+    if is_bsc(channel.describe()):
+        return flip_positions(nbits, channel.p)
+    pos = channel.positions(_CHANNEL_RNG, nbits).tolist()
+    return [i for i in pos if bit_at(i)] if channel.erases else pos
+
+def apply_channel(line: str, ber: float, channel=None):
+    """Línea JSON -> (bytes a reenviar, bits de la trama o None, flips aplicados)."""
     try:
-        buf=b""
+        pkt = json.loads(line)
+        if isinstance(pkt, dict) and "frame_bits" in pkt:
+            original_bits = BitVec.from_str(pkt["frame_bits"])
+            flips = channel_flips(channel or make_channel("bsc", ber), len(original_bits), original_bits.__getitem__)
+            noisy_bits = original_bits.flipped(flips)
+            pkt["frame_bits"] = noisy_bits.to_str()
+            pkt["simulator_ber"] = ber
+            return (json.dumps(pkt) + "\n").encode("utf-8"), len(original_bits), flips
+    except Exception:
+        pass
+    # Si no es JSON válido, reenvía tal cual
+    return (line + "\n").encode("utf-8"), None, []
+
+def apply_channel_bin(frame: bytes, ber: float, channel=None):
+    """Trama binaria -> (trama con ruido, bits de la trama, flips): solo se tocan los bytes afectados."""
+    buf = bytearray(frame)
+    nbits = wire.frame_nbits(buf)
+    flips = channel_flips(channel or make_channel("bsc", ber), nbits, lambda i: wire.frame_bit(buf, i))
+    wire.flip_in_place(buf, flips)
+    wire.set_channel_ber(buf, ber)
+    return bytes(buf), nbits, flips
+
+def channel_report(addr, ber, nbits, flips, channel="bsc") -> str:
+    out=[GRAY + f"↘ Recibido de {addr[0]}:{addr[1]}" + RESET]
+    if nbits is not None:
+        hd = len(flips)
+        flips_pct = (hd/nbits)*100.0 if nbits>0 else 0.0
+        out.append(CYAN + "Canal con ruido (proxy)" + RESET + ("" if channel == "bsc" else GRAY + f" [{channel}]" + RESET))
+        out.append(f"BER objetivo: {ber:.4f} | flips aplicados: {hd} / {nbits} ({flips_pct:.2f}%)")
+        out.append("→ reenviado al receptor.")
+    else:
+        out.append("Trama no-JSON o sin 'frame_bits' → reenviada sin cambios.")
+    return "\n".join(out) + "\n"
+
+# Fallas de trama completa (para probar ARQ): además del ruido por bit, el
+# proxy puede descartar una trama (no se reenvía y el emisor no recibe ack),
+# descartar el ack, o entregar la trama como ruido puro (cada bit invertido
+# con prob. 1/2). Cada una con su probabilidad por trama.
+FAULTS = ("drop", "drop_ack", "corrupt")
+CORRUPT_CHANNEL = make_channel("bsc", 0.5)
+
+def fault(faults, kind: str) -> bool:
+    return bool(faults) and random.random() < faults.get(kind, 0.0)
+
+# BER medida por trama (flips / bits)
+BER_BUCKETS = (0.0, 1e-4, 5e-4, 1e-3, 2e-3, 5e-3, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+class ProxyMetrics:
+    """Contadores e histogramas del proxy (common.metrics)."""
+
+    def __init__(self):
+        self.registry = r = metrics.Registry()
+        frames = r.counter("proxy_frames_total", "Tramas reenviadas", ("format",))
+        self.frames = {f: frames.labels(f) for f in ("json", "bin", "raw")}
+        self.bits = r.counter("proxy_bits_total", "Bits de trama que pasaron por el canal").labels()
+        self.flips = r.counter("proxy_flips_total", "Bits invertidos por el canal").labels()
+        self.lost = r.counter("proxy_lost_total", "Tramas sin ack del receptor (conexión caída)").labels()
+        faults = r.counter("proxy_faults_total", "Fallas inyectadas (--drop, --drop-ack, --corrupt)", ("kind",))
+        self.faults = {f: faults.labels(f) for f in FAULTS}
+        self.clients = r.gauge("proxy_clients", "Clientes conectados").labels()
+        self.ber = r.histogram("proxy_applied_ber", "BER aplicada por trama (flips / bits)",
+                               buckets=BER_BUCKETS).labels()
+        stage = r.histogram("proxy_stage_seconds", "Latencia por trama y etapa", ("stage",))
+        self.stage = {name: stage.labels(name) for name in ("receive", "channel", "upstream")}
+        self._rates = metrics.RateTracker()
+
+    def frame(self, fmt: str, nbits, flips) -> None:
+        self.frames[fmt].inc()
+        if nbits:
+            self.bits.inc(nbits)
+            self.flips.inc(len(flips))
+            self.ber.observe(len(flips) / nbits)
+
+    def summary(self, seconds: float) -> str:
+        frames = sum(s.value for s in self.frames.values())
+        bits = self.bits.value
+        up = self.stage["upstream"]
+        parts = {"frames_s": round(self._rates.delta("frames", frames) / seconds, 1),
+                 "bits_s": round(self._rates.delta("bits", bits) / seconds),
+                 "frames": frames, "flips": self.flips.value,
+                 "ber": round(self.flips.value / bits, 6) if bits else 0.0,
+                 "lost": self.lost.value,
+                 **{f: c.value for f, c in self.faults.items() if c.value},
+                 "upstream_p50_ms": round(up.quantile(0.5) * 1e3, 3),
+                 "upstream_p99_ms": round(up.quantile(0.99) * 1e3, 3)}
+        return GRAY + "[stats] " + " ".join(f"{k}={v}" for k, v in parts.items()) + RESET
+
+class UpstreamPool:
+    """Conexiones persistentes al receptor. Cada una envía tramas en orden y
+    empareja los acks por orden de llegada (hasta 'window' en vuelo)."""
+
+    def __init__(self, host, port, size=4, queue_size=256, window=32):
+        self.host=host; self.port=port; self.size=size; self.window=window
+        self.queue=asyncio.Queue(maxsize=queue_size)  # (bytes, future del ack)
+        self.tasks=[]
+
+    def start(self):
+        self.tasks=[asyncio.ensure_future(self._worker(i)) for i in range(self.size)]
+
+    async def stop(self):
+        for t in self.tasks: t.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def send(self, data: bytes) -> asyncio.Future:
+        fut=asyncio.get_running_loop().create_future()
+        await self.queue.put((data, fut))  # bloquea si la cola está llena
+        return fut
+
+    async def _worker(self, idx):
+        delay=0.2
         while True:
-            chunk = client_sock.recv(4096)
-            if not chunk: break
-            buf += chunk
-            if b"\n" in buf: break
-        line = buf.decode("utf-8", errors="ignore").strip()
-        if not line:
-            return
-        original_bits=None; noisy_bits=None
-        try:
-            pkt = json.loads(line)
-            if isinstance(pkt, dict) and "frame_bits" in pkt:
-                original_bits = pkt["frame_bits"]
-                noisy_bits = add_noise(original_bits, ber)
-                pkt["frame_bits"] = noisy_bits
-                pkt["simulator_ber"] = ber
-                out = json.dumps(pkt) + "\n"
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError as e:
+                print(RED + f"Upstream #{idx}: no se pudo conectar a {self.host}:{self.port} ({e}); reintento." + RESET)
+                await asyncio.sleep(delay); delay=min(delay*2, 5.0)
+                continue
+            delay=0.2
+            inflight=asyncio.Queue(maxsize=self.window)
+            acks=asyncio.ensure_future(self._read_acks(reader, inflight))
+            item=None
+            try:
+                while True:
+                    item = await self._unless_closed(self.queue.get(), acks)
+                    data, fut = item
+                    await self._unless_closed(inflight.put(fut), acks)
+                    item=None
+                    writer.write(data)
+                    await writer.drain()
+            except (ConnectionError, OSError) as e:
+                print(RED + f"Upstream #{idx}: {e}; reconectando." + RESET)
+            finally:
+                acks.cancel()
+                writer.close()
+                # lo que quedó en vuelo se pierde: se avisa al cliente
+                while not inflight.empty():
+                    f=inflight.get_nowait()
+                    if not f.done(): f.set_result(None)
+                if item is not None and not item[1].done():
+                    item[1].set_result(None)
+
+    @staticmethod
+    async def _unless_closed(coro, acks):
+        # espera 'coro' salvo que el lector de acks termine antes (conexión caída)
+        if acks.done():
+            coro.close()
+            raise ConnectionError("el receptor cerró la conexión")
+        task=asyncio.ensure_future(coro)
+        await asyncio.wait({task, acks}, return_when=asyncio.FIRST_COMPLETED)
+        if not task.done():
+            task.cancel()
+            raise ConnectionError("el receptor cerró la conexión")
+        return task.result()
+
+    async def _read_acks(self, reader, inflight):
+        while True:
+            line = await reader.readline()
+            if not line:
+                return  # el worker da por perdidas las tramas en vuelo
+            fut = await inflight.get()
+            if not fut.done(): fut.set_result(line)
+
+def client_ack(ack: bytes, index: int) -> bytes:
+    # el "frame" del receptor cuenta las tramas de la conexión del pool, que
+    # mezcla clientes: se reemplaza por el número de trama de este cliente
+    try:
+        msg = json.loads(ack)
+    except ValueError:
+        return ack
+    if not isinstance(msg, dict) or "frame" not in msg:
+        return ack
+    msg["frame"] = index
+    return (json.dumps(msg)+"\n").encode()
+
+async def proxy_client(reader, writer, pool: UpstreamPool, ber, window=32, stats: ProxyMetrics = None, channel=None,
+                       faults=None, capture_to: capture.CaptureWriter = None):
+    addr = writer.get_extra_info("peername") or ("?", 0)
+    cid = capture_to.connection() if capture_to else 0
+    stats = stats or ProxyMetrics()
+    channel = channel or make_channel("bsc", ber)
+    name = channel.describe()
+    pending=asyncio.Queue(maxsize=window)  # (future del ack, instante de envío, nº de trama), en orden de llegada
+
+    async def relay():
+        while True:
+            item = await pending.get()
+            if item is None: return
+            fut, sent, index = item
+            ack = await fut
+            if ack is None:
+                stats.lost.inc()
+                ack = (json.dumps({"type":"ack","frame":index,"verdict":"lost","error":"upstream"})+"\n").encode()
             else:
-                out = line + "\n"
-        except Exception:
-            # Si no es JSON válido, reenvía tal cual
-            out = line + "\n"
-
-        # Conectar a destino y enviar
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as ds:
-            ds.connect((dest_host, dest_port))
-            ds.sendall(out.encode("utf-8"))
-
-        print(GRAY + f"↘ Recibido de {addr[0]}:{addr[1]}" + RESET)
-        if original_bits is not None:
-            hd = hamming_distance(original_bits, noisy_bits)
-            flips_pct = (hd/len(original_bits))*100.0 if len(original_bits)>0 else 0.0
-            print(CYAN + "Canal con ruido (proxy)" + RESET)
-            print(f"BER objetivo: {ber:.4f} | flips aplicados: {hd} / {len(original_bits)} ({flips_pct:.2f}%)")
-            print("→ reenviado al receptor.")
-        else:
-            print("Trama no-JSON o sin 'frame_bits' → reenviada sin cambios.")
-        print()
+                ack = client_ack(ack, index)
+                stats.stage["upstream"].observe(time.perf_counter() - sent)
+                if fault(faults, "drop_ack"):
+                    stats.faults["drop_ack"].inc()
+                    continue
+            try:
+                writer.write(ack); await writer.drain()
+            except ConnectionError:
+                pass  # el emisor ya cerró (p.ej. sender.cpp)
+
+    relayer=asyncio.ensure_future(relay())
+    stats.clients.inc()
+    frames = 0  # tramas de este cliente (incluye las descartadas): el "frame" de sus acks
+    try:
+        while True:
+            marks=[]
+            msg = await wire.read_message(reader, marks)
+            if msg is None: break
+            t0 = time.perf_counter()
+            stats.stage["receive"].observe(t0 - marks[0])
+            binary, raw = msg
+            if not binary and not raw.strip(): continue
+            index = frames
+            frames += 1
+            if fault(faults, "drop"):
+                stats.faults["drop"].inc()
+                if capture_to: capture_to.frame(cid, raw, binary, flags=capture.FLAG_DROPPED)
+                print(GRAY + f"✂ Trama de {addr[0]}:{addr[1]} descartada por el proxy (--drop)" + RESET)
+                continue
+            ch = channel
+            if fault(faults, "corrupt"):
+                stats.faults["corrupt"].inc()
+                ch = CORRUPT_CHANNEL
+            if binary:
+                out, nbits, flips = apply_channel_bin(raw, ber, ch)
+            else:
+                line = raw.decode("utf-8", errors="ignore").strip()
+                if not line: continue
+                out, nbits, flips = apply_channel(line, ber, ch)
+            if capture_to: capture_to.frame(cid, raw, binary, flips)
+            sent = time.perf_counter()
+            stats.stage["channel"].observe(sent - t0)
+            stats.frame("bin" if binary else ("json" if nbits is not None else "raw"), nbits, flips)
+            fut = await pool.send(out)
+            await pending.put((fut, sent, index))
+            print(channel_report(addr, ber, nbits, flips, name if ch is channel else "corrupt"))
+    except (ConnectionError, ValueError, asyncio.IncompleteReadError) as e:
+        print(RED + f"Cliente {addr[0]}:{addr[1]}: {e}" + RESET)
     finally:
-        client_sock.close()
+        stats.clients.inc(-1)
+        await pending.put(None)
+        await relayer
+        writer.close()
+
+async def run_proxy_async(listen_host, listen_port, dest_host, dest_port, ber, pool_size=4, queue_size=256, window=32,
+                          stats: ProxyMetrics = None, channel=None, faults=None, capture_to=None):
+    stats = stats or ProxyMetrics()
+    pool=UpstreamPool(dest_host, dest_port, pool_size, queue_size, window)
+    stats.registry.gauge("proxy_upstream_queue", "Tramas esperando conexión al receptor").set_function(pool.queue.qsize)
+    pool.start()
+    server = await asyncio.start_server(lambda r,w: proxy_client(r, w, pool, ber, window, stats, channel, faults,
+                                                                    capture_to),
+                                        listen_host, listen_port, limit=1<<26, reuse_address=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await pool.stop()
 
-def run_proxy(listen_host, listen_port, dest_host, dest_port, ber):
+def run_proxy(listen_host, listen_port, dest_host, dest_port, ber, pool_size=4, queue_size=256, window=32,
+              metrics_host="127.0.0.1", metrics_port=0, stats_every=0.0, channel="bsc", faults=None,
+              capture_path=None):
+    model = make_channel(channel, ber)
     print(BOLD+CYAN+"======================================"+RESET)
     print(BOLD+CYAN+"  SIMULADOR DE CANAL (Proxy con ruido)"+RESET)
     print(BOLD+CYAN+"======================================"+RESET)
-    print(GRAY + f"Escuchando en {listen_host}:{listen_port} → destino {dest_host}:{dest_port}, BER={ber}" + RESET)
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        s.bind((listen_host, listen_port))
-        s.listen(5)
-        while True:
-            conn, addr = s.accept()
-            proxy_once(conn, addr, dest_host, dest_port, ber)
+    print(GRAY + f"Escuchando en {listen_host}:{listen_port} → destino {dest_host}:{dest_port}, BER={ber}, canal={model.describe()}" + RESET)
+    print(GRAY + f"Pool upstream={pool_size} conexiones, cola={queue_size}, ventana={window}" + RESET)
+    if faults and any(faults.values()):
+        print(GRAY + "Fallas por trama: " + ", ".join(f"{k}={v}" for k, v in faults.items() if v) + RESET)
+    capture_to = None
+    if capture_path:
+        capture.create(capture_path, "proxy")
+        capture_to = capture.CaptureWriter(capture_path)
+        print(GRAY + f"Capturando tramas en {capture_path}" + RESET)
+    stats = ProxyMetrics()
+    if metrics_port:
+        metrics.serve_http(stats.registry, metrics_host, metrics_port)
+        print(GRAY + f"Métricas en http://{metrics_host}:{metrics_port}/metrics" + RESET)
+    periodic = metrics.Periodic(stats_every, lambda dt: print(stats.summary(dt))) if stats_every > 0 else None
+    try:
+        asyncio.run(run_proxy_async(listen_host, listen_port, dest_host, dest_port, ber, pool_size, queue_size, window,
+                                    stats, model, faults, capture_to))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if periodic is not None: periodic.stop()
+        if capture_to is not None:
+            capture_to.close()
+            print(GRAY + f"Captura: {capture_to.frames} tramas → {capture_path}" + RESET)
 
 # ===== CLI =====
 def parse_list_of_ints(text: str):
@@ -235,15 +553,46 @@ def main():
     parser = argparse.ArgumentParser(description="Simulador (offline/proxy) para CRC32 y Hamming SEC")
     sub = parser.add_subparsers(dest="mode", required=True)
 
+    # opciones del barrido (offline y goodput)
+    sweep = argparse.ArgumentParser(add_help=False)
+    sweep.add_argument("--runs", type=int, default=10000, help="iteraciones por punto (tope por punto con --adaptive)")
+    sweep.add_argument("--adaptive", type=float, default=None, metavar="SEMIANCHO",
+                       help="correr cada punto por lotes hasta que el intervalo de ok_rate tenga este semiancho (ej. 0.005)")
+    sweep.add_argument("--min-runs", type=int, default=1024, help="primer lote por punto con --adaptive")
+    sweep.add_argument("--confidence", type=float, default=0.95, help="nivel de confianza de los intervalos (Wilson)")
+    sweep.add_argument("--estimate", choices=METHODS, default=None,
+                       help="BER muy baja: analytic (fórmula cerrada) o is (estratos por cantidad de errores; --runs por estrato)")
+    sweep.add_argument("--sizes", type=str, default="64,256,1024", help="tamaños m en bits, separados por coma")
+    sweep.add_argument("--ps", type=str, default="0.0,0.001,0.005,0.01,0.02,0.05", help="probabilidades de error por bit, separadas por coma")
+    sweep.add_argument("--klist", type=str, default="11", help="valores k para Hamming (ej. 4,8,11)")
+    sweep.add_argument("--seed", type=int, default=1234)
+    sweep.add_argument("--workers", type=int, default=1, help="procesos para el barrido (mismo resultado con cualquier valor)")
+    sweep.add_argument("--cache", type=str, default=None, metavar="PATH",
+                       help="archivo de caché (p.ej. offline_cache.jsonl): cada punto se guarda al terminar "
+                            "y los ya hechos se saltan; sin esta opción no se usa caché")
+    sweep.add_argument("--no-cache", action="store_true", help="simular todo sin leer ni escribir la caché (anula --cache)")
+    sweep.add_argument("--channel", type=str, default="bsc", metavar="SPEC",
+                       help="modelo de canal: bsc, ge:len=8,eb=0.5 (Gilbert–Elliott), burst:len=16 o erasure; la BER es el promedio")
+
     # offline
-    p_off = sub.add_parser("offline", help="Correr simulaciones offline y graficar resultados")
-    p_off.add_argument("--runs", type=int, default=10000, help="iteraciones por punto")
-    p_off.add_argument("--sizes", type=str, default="64,256,1024", help="tamaños m en bits, separados por coma")
-    p_off.add_argument("--ps", type=str, default="0.0,0.001,0.005,0.01,0.02,0.05", help="probabilidades de error por bit, separadas por coma")
-    p_off.add_argument("--klist", type=str, default="11", help="valores k para Hamming (ej. 4,8,11)")
+    p_off = sub.add_parser("offline", parents=[sweep], help="Correr simulaciones offline y graficar resultados")
     p_off.add_argument("--outcsv", type=str, default="results.csv")
     p_off.add_argument("--outpng", type=str, default="plots.png")
-    p_off.add_argument("--seed", type=int, default=1234)
+
+    # goodput
+    p_good = sub.add_parser("goodput", parents=[sweep],
+                            help="Goodput por configuración y tabla con la mejor (algo, k) por tamaño y BER")
+    p_good.set_defaults(ps="0,1e-5,1e-4,0.001,0.003,0.01,0.03", klist=",".join(map(str, goodput.DEFAULT_KLIST)))
+    p_good.add_argument("--arq", choices=ARQ_MODES, default="sr",
+                        help="costo de retransmitir: sr (repetición selectiva), sw (stop-and-wait) o none (sin reintentos)")
+    p_good.add_argument("--overhead", type=int, default=0, help="bits extra por intento (cabecera, ack)")
+    p_good.add_argument("--rtt-bits", type=int, default=0, help="espera por intento con --arq sw, en bits de canal")
+    p_good.add_argument("--max-tries", type=int, default=0, help="intentos por trama (0 = hasta que llegue bien)")
+    p_good.add_argument("--max-loss", type=float, default=1.0,
+                        help="pérdida residual máxima aceptable al recomendar (ej. 1e-3 con --arq none)")
+    p_good.add_argument("--outcsv", type=str, default="goodput.csv")
+    p_good.add_argument("--outpng", type=str, default="goodput.png")
+    p_good.add_argument("--table", type=str, default="goodput_table.json", help="tabla de recomendaciones (JSON)")
 
     # proxy
     p_prox = sub.add_parser("proxy", help="Actuar como canal con ruido entre sender y receiver")
@@ -252,10 +601,22 @@ def main():
     p_prox.add_argument("--dest", type=str, default="127.0.0.1", help="IP destino (receiver)")
     p_prox.add_argument("--dport", type=int, default=50007, help="Puerto destino (receiver)")
     p_prox.add_argument("--ber", type=float, default=0.01, help="probabilidad de flip por bit")
+    p_prox.add_argument("--channel", type=str, default="bsc", metavar="SPEC",
+                        help="modelo de canal: bsc, ge:len=8,eb=0.5 (Gilbert–Elliott), burst:len=16 o erasure; la BER es el promedio")
+    p_prox.add_argument("--drop", type=float, default=0.0, help="prob. de descartar una trama entera (sin ack)")
+    p_prox.add_argument("--drop-ack", type=float, default=0.0, help="prob. de descartar el ack de una trama")
+    p_prox.add_argument("--corrupt", type=float, default=0.0, help="prob. de entregar una trama como ruido puro")
+    p_prox.add_argument("--pool", type=int, default=4, help="conexiones persistentes hacia el receptor")
+    p_prox.add_argument("--queue", type=int, default=256, help="tramas en cola antes de frenar a los emisores")
+    p_prox.add_argument("--window", type=int, default=32, help="tramas sin ack por conexión")
+    p_prox.add_argument("--metrics-port", type=int, default=0, help="puerto del endpoint HTTP /metrics (0 = desactivado)")
+    p_prox.add_argument("--metrics-host", type=str, default="127.0.0.1", help="host del endpoint de métricas")
+    p_prox.add_argument("--stats-every", type=float, default=0.0, help="segundos entre líneas de resumen (0 = sin resumen)")
+    p_prox.add_argument("--capture", default=None, help="agregar cada trama (original + flips) a esta captura (replay.py)")
 
     args = parser.parse_args()
 
-    if args.mode == "offline":
+    if args.mode in ("offline", "goodput"):
         random.seed(args.seed)
         sizes = parse_list_of_ints(args.sizes)
         ps    = parse_list_of_floats(args.ps)
@@ -264,23 +625,46 @@ def main():
         print(BOLD+CYAN+"======================================"+RESET)
         print(BOLD+CYAN+"  SIMULACIONES OFFLINE (CRC32/Hamming)"+RESET)
         print(BOLD+CYAN+"======================================"+RESET)
-        print(GRAY+f"runs={args.runs}, sizes={sizes}, ps={ps}, klist={klist}, seed={args.seed}"+RESET)
+        print(GRAY+f"runs={args.runs}, sizes={sizes}, ps={ps}, klist={klist}, seed={args.seed}, workers={args.workers}"+RESET)
 
-        rows = run_offline(args.runs, sizes, ps, klist)
+        try:
+            rows = run_offline(args.runs, sizes, ps, klist, args.seed, args.workers,
+                               None if args.no_cache else args.cache,
+                               args.adaptive, args.min_runs, args.confidence, args.estimate, args.channel)
+        except ValueError as e:
+            print(RED+f"{e}"+RESET); sys.exit(1)
 
-        if rows:
-            with open(args.outcsv,"w",newline="") as f:
-                w=csv.DictWriter(f, fieldnames=list(rows[0].keys()))
-                w.writeheader(); w.writerows(rows)
-            plot_rows(rows, args.outpng)
-            print(GREEN+f"\nListo → {args.outcsv} y {args.outpng}"+RESET)
-        else:
+        if not rows:
             print(RED+"No se generaron filas de resultados."+RESET)
+            return
+        outputs = [args.outcsv, args.outpng]
+        if args.mode == "goodput":
+            model = CostModel(args.arq, args.overhead, args.rtt_bits, args.max_tries)
+            rows = goodput_rows(rows, model)
+            table = goodput.recommend(rows, args.max_loss)
+            goodput.save_table(args.table, table, model, args.channel, args.max_loss)
+            print_recommendations(table)
+            outputs.append(args.table)
+        with open(args.outcsv,"w",newline="") as f:
+            w=csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+            w.writeheader(); w.writerows(rows)
+        if args.mode == "goodput":
+            plot_goodput(rows, args.outpng)
+        else:
+            plot_rows(rows, args.outpng)
+        print(GREEN+f"\nListo → {', '.join(outputs[:-1])} y {outputs[-1]}"+RESET)
 
     elif args.mode == "proxy":
-        if not (0.0 <= args.ber <= 1.0):
-            print(RED+"BER invalido. Debe estar en [0,1]."+RESET); sys.exit(1)
-        run_proxy(args.listen, args.lport, args.dest, args.dport, args.ber)
+        faults = {"drop": args.drop, "drop_ack": args.drop_ack, "corrupt": args.corrupt}
+        if not all(0.0 <= v <= 1.0 for v in (args.ber, *faults.values())):
+            print(RED+"BER/probabilidad invalida. Debe estar en [0,1]."+RESET); sys.exit(1)
+        try:
+            make_channel(args.channel, args.ber)
+            if args.capture: capture.create(args.capture, "proxy")
+        except (OSError, ValueError) as e:
+            print(RED+f"{e}"+RESET); sys.exit(1)
+        run_proxy(args.listen, args.lport, args.dest, args.dport, args.ber, args.pool, args.queue, args.window,
+                  args.metrics_host, args.metrics_port, args.stats_every, args.channel, faults, args.capture)
 
 if __name__ == "__main__":
     main()